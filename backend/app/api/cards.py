@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from app.db.database import SessionLocal
+from app.db.database import catalog_pointer, get_db, get_read_db, run_db
+from app.db.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, paginate
 from app.models.models import Card as CardModel
-from app.schemas.schemas import Card
+from app.schemas.schemas import Card, CardBatch, CardBatchRequest, CardFacets, CardSuggestion
+from app.services.card_serializer import card_payload_cache, card_payloads, dumps, encode_card, encode_cards, join_json
+from app.services.card_query import QuerySyntaxError, normalize_query, query_filter
+from app.services.columnar_catalog import CatalogFilter, catalog_store, sql_facets
+from app.services.result_cache import CachedResult, result_cache
+from app.services.autocomplete import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, name_index
 from app.services.scryfall_client import update_card_database
+from app.services.search import ranked_search, text_filter
 
 router = APIRouter(
     prefix="/cards",
@@ -13,62 +20,231 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependency für Datenbank-Sessions
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Maximale Anzahl von IDs je Batch-Anfrage
+CARD_BATCH_MAX_IDS = 5000
 
 @router.get("/", response_model=List[Card])
-def get_cards(
+async def get_cards(
+    response: Response,
+    q: Optional[str] = None,
     name: Optional[str] = None,
     card_type: Optional[str] = None,
     rarity: Optional[str] = None,
     set_name: Optional[str] = None,
     mana_cost: Optional[int] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Karten mit optionalen Filtern abrufen, sortiert nach Name und ID
+
+    `name` und `card_type` werden über den Volltextindex gesucht: jedes Wort
+    muss als Wortanfang vorkommen (z.B. "light bo" findet "Lightning Bolt").
+
+    `q` nimmt eine Suchanfrage im Stil von Scryfall entgegen, z.B.
+    `t:creature c:rg cmc>=3 r:rare o:"draw a card" s:neo` (siehe card_query).
+
+    Für die nächste Seite den Header `X-Next-Cursor` als `cursor` übergeben;
+    `skip` (Offset) wird weiterhin unterstützt.
+
+    Häufige Anfragen werden fertig serialisiert zwischengespeichert (bis zum nächsten Sync).
+    """
+    cache_key = result_cache.make_key(
+        "cards",
+        q=normalize_query(q) if q else None,
+        name=name.strip().lower() if name else None,
+        card_type=card_type.strip().lower() if card_type else None,
+        rarity=rarity or None,
+        set_name=set_name or None,
+        mana_cost=mana_cost,
+        cursor=cursor or None,
+        skip=skip,
+        limit=limit,
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached.body, media_type="application/json", headers=cached.headers)
+
+    def load(db: Session) -> CachedResult:
+        # Nur Sortierschlüssel lesen, die Karten selbst kommen kodiert aus dem card_serializer
+        cards = db.query(CardModel.id, CardModel.name)
+        
+        # Filter anwenden
+        if q:
+            try:
+                condition = query_filter(db, q)
+            except QuerySyntaxError as e:
+                raise HTTPException(status_code=400, detail=f"Ungültige Suchanfrage: {str(e)}")
+            if condition is not None:
+                cards = cards.filter(condition)
+        condition = text_filter(db, {"name": name, "type": card_type})
+        if condition is not None:
+            cards = cards.filter(condition)
+        if rarity:
+            cards = cards.filter(CardModel.rarity == rarity)
+        if set_name:
+            cards = cards.filter(CardModel.set_name == set_name)
+        if mana_cost is not None:
+            if mana_cost >= 5:
+                cards = cards.filter(CardModel.cmc >= 5)
+            else:
+                cards = cards.filter(CardModel.cmc == mana_cost)
+        
+        page = paginate(cards, (CardModel.name, CardModel.id), response, cursor=cursor, skip=skip, limit=limit)
+        
+        headers = {}
+        if NEXT_CURSOR_HEADER in response.headers:
+            headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+        return CachedResult(body=encode_cards(db, [row.id for row in page]), headers=headers)
+
+    result = await run_db(db, load)
+    result_cache.set(cache_key, result)
+    return Response(content=result.body, media_type="application/json", headers=result.headers)
+
+@router.get("/cache/stats")
+def result_cache_stats():
+    """
+    Trefferstatistik und Belegung des Ergebnis-Caches für Kartensuchen
+    und des Caches der kodierten Einzelkarten
+    """
+    return {**result_cache.stats(), "card_payloads": card_payload_cache.stats()}
+
+@router.get("/facets", response_model=CardFacets)
+async def get_card_facets(
+    name: Optional[str] = None,
+    card_type: Optional[str] = None,
+    rarity: Optional[str] = None,
+    set_code: Optional[str] = None,
+    set_name: Optional[str] = None,
+    cmc_min: Optional[float] = None,
+    cmc_max: Optional[float] = None,
+    colors: Optional[str] = None,
+    color_mode: Literal["include", "exact", "within"] = "include",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=0, le=100),
+    db: Session = Depends(get_read_db)
 ):
     """
-    Karten mit optionalen Filtern abrufen
-    """
-    cards = db.query(CardModel)
-    
-    # Filter anwenden
-    if name:
-        cards = cards.filter(CardModel.name.ilike(f"%{name}%"))
-    if card_type:
-        cards = cards.filter(CardModel.type.ilike(f"%{card_type}%"))
-    if rarity:
-        cards = cards.filter(CardModel.rarity == rarity)
-    if set_name:
-        cards = cards.filter(CardModel.set_name == set_name)
-    if mana_cost is not None:
-        if mana_cost >= 5:
-            cards = cards.filter(CardModel.cmc >= 5)
-        else:
-            cards = cards.filter(CardModel.cmc == mana_cost)
-    
-    return cards.offset(skip).limit(limit).all()
+    Gefilterte Karten samt Anzahl je Seltenheit, Manawert, Set und Farbe
+
+    Wird aus dem spaltenbasierten Katalog im Speicher beantwortet, sofern NumPy
+    verfügbar ist, sonst per GROUP BY in der Datenbank. `colors` z.B. "rg" oder
+    "c" (farblos); `color_mode` include, exact oder within.
+
+    Anders als bei /cards/ sucht `name` (wie `card_type`) eine Teilzeichenkette
+    ohne Volltextindex: "bolt" findet auch "Thunderbolt", "light bo" dagegen
+    nicht "Lightning Bolt".
+    """
+    filters = CatalogFilter(
+        name=name, card_type=card_type, rarity=rarity, set_code=set_code, set_name=set_name,
+        cmc_min=cmc_min, cmc_max=cmc_max, colors=colors, color_mode=color_mode,
+    )
+    catalog = catalog_store.current
+
+    def load(db: Session):
+        try:
+            if catalog is not None:
+                total, ids, facets = catalog.search(filters, skip=skip, limit=limit)
+                engine = "columnar"
+            else:
+                total, ids, facets = sql_facets(db, filters, skip=skip, limit=limit)
+                engine = "sql"
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Ungültiger Filter: {str(e)}")
+
+        # Karten der Seite kodiert aus dem card_serializer, Reihenfolge beibehalten
+        payloads = card_payloads(db, ids)
+        return (
+            b'{"total":' + dumps(total) + b',"engine":' + dumps(engine) + b',"facets":' + dumps(facets)
+            + b',"cards":' + join_json(payloads[card_id] for card_id in ids if card_id in payloads) + b"}"
+        )
+
+    return Response(content=await run_db(db, load), media_type="application/json")
+
+@router.get("/search", response_model=List[Card])
+async def search_cards(
+    q: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Volltextsuche über Name, Typzeile und Regeltext, nach Relevanz sortiert
+
+    Treffer im Namen zählen stärker als in der Typzeile, diese stärker als im Regeltext.
+    """
+    def load(db: Session) -> bytes:
+        cards = ranked_search(db, q)
+        if cards is None:
+            return b"[]"
+        ids = [card_id for card_id, in cards.with_entities(CardModel.id).offset(skip).limit(limit)]
+        return encode_cards(db, ids)
+
+    return Response(content=await run_db(db, load), media_type="application/json")
+
+@router.get("/autocomplete", response_model=List[CardSuggestion])
+async def autocomplete_cards(
+    q: str,
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Namensvorschläge für die Eingabe im Deck-Builder (nur ID und Name)
+
+    Wird aus einem Index im Speicher beantwortet, der nach jedem Sync neu aufgebaut wird.
+    """
+    if not name_index.is_built:
+        await run_db(db, name_index.rebuild)
+    return name_index.suggest(q, limit)
+
+@router.get("/autocomplete/stats")
+def autocomplete_stats():
+    """
+    Kennzahlen des Autovervollständigungs-Index (Anzahl Namen, Speicherbedarf, Aufbauzeit)
+    """
+    return name_index.stats()
+
+@router.post("/batch", response_model=CardBatch)
+async def get_cards_batch(request: CardBatchRequest, db: Session = Depends(get_read_db)):
+    """
+    Viele Karten auf einmal anhand ihrer IDs abrufen (z.B. für geteilte Decks)
+
+    `cards` folgt der Reihenfolge von `ids` (Duplikate inklusive), unbekannte IDs
+    stehen dort als `null` und zusätzlich in `missing`. Gelesen wird in Blöcken
+    per IN-Abfrage; bereits kodierte Karten kommen aus dem Cache.
+    """
+    if len(request.ids) > CARD_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Höchstens {CARD_BATCH_MAX_IDS} IDs je Anfrage")
+    payloads = await run_db(db, card_payloads, request.ids)
+    cards = join_json(payloads.get(card_id, b"null") for card_id in request.ids)
+    missing = [card_id for card_id in dict.fromkeys(request.ids) if card_id not in payloads]
+    return Response(content=b'{"cards":' + cards + b',"missing":' + dumps(missing) + b"}", media_type="application/json")
 
 @router.get("/{card_id}", response_model=Card)
-def get_card(card_id: str, db: Session = Depends(get_db)):
+async def get_card(card_id: str, db: Session = Depends(get_read_db)):
     """
     Einzelne Karte anhand der ID abrufen
     """
-    card = db.query(CardModel).filter(CardModel.id == card_id).first()
+    card = await run_db(db, encode_card, card_id)
     if card is None:
         raise HTTPException(status_code=404, detail="Karte nicht gefunden")
-    return card
+    return Response(content=card, media_type="application/json")
 
 @router.post("/update-database/")
 def update_database(db: Session = Depends(get_db)):
     """
     Datenbank mit aktuellen Karten von Scryfall aktualisieren
+
+    Schreibt direkt in den aktiven Katalog und ist daher im Blue/Green-Betrieb
+    gesperrt; dort aktualisiert POST /sync/cards über eine Katalogkopie.
     """
+    if catalog_pointer is not None:
+        raise HTTPException(
+            status_code=409,
+            detail="Im Blue/Green-Betrieb nicht verfügbar, bitte POST /sync/cards verwenden",
+        )
     try:
         result = update_card_database(db)
         return {"message": f"Datenbank erfolgreich aktualisiert. {result['added']} Karten hinzugefügt, {result['updated']} aktualisiert."}
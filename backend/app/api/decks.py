@@ -1,11 +1,25 @@
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query as QueryParam, Response, status
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, run_db
+from app.db.pagination import MAX_PAGE_SIZE, paginate
 from app.models.models import Deck, DeckCard, Card
 from app.schemas.schemas import Deck as DeckSchema
-from app.schemas.schemas import DeckCreate, DeckUpdate, DeckWithCards
+from app.schemas.schemas import (
+    DeckCardDelta, DeckCardOperation, DeckCreate, DeckSimulation, DeckSimulationRequest, DeckStats, DeckUpdate,
+    DeckWithCards,
+)
+from app.services.card_serializer import encode_deck
+from app.services.deck_simulator import (
+    SIMULATION_MAX_SAMPLES, SIMULATION_TIME_LIMIT, SimulationError, SimulationSettings, load_main_deck, simulate_deck,
+)
+from app.services.deck_stats import deck_stats
+from app.services.deck_editing import (
+    CardNotInDeckError, UnknownCardsError, add_deck_card, apply_contents, apply_operations,
+    check_cards_exist, contents_from_items, current_contents, touch_deck,
+)
 
 router = APIRouter(
     prefix="/decks",
@@ -13,76 +27,136 @@ router = APIRouter(
     responses={404: {"description": "Deck nicht gefunden"}}
 )
 
+def deck_query(db: Session) -> Query:
+    """
+    Decks mit allen für die Antwort nötigen Beziehungen vorab laden
+
+    Deck-Karten samt Karte und Set kommen in einer SELECT-IN-Abfrage, die Farben
+    in einer weiteren; die Zahl der Abfragen hängt damit nicht von der Deckgröße ab.
+    """
+    return db.query(Deck).options(
+        selectinload(Deck.deck_cards)
+        .joinedload(DeckCard.card)
+        .options(joinedload(Card.set), selectinload(Card.colors))
+    )
+
+def check_cards(db: Session, card_ids: List[str]) -> None:
+    """Alle Karten mit einer Abfrage prüfen, 404 mit der ersten fehlenden ID"""
+    try:
+        check_cards_exist(db, card_ids)
+    except UnknownCardsError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Karte mit ID {e.card_ids[0]} nicht gefunden"
+        )
+
+def load_deck(db: Session, deck_id: int) -> Deck:
+    """Deck nach dem Schreiben vollständig (eager) neu laden"""
+    return deck_query(db).populate_existing().filter(Deck.id == deck_id).one()
+
 @router.get("/", response_model=List[DeckSchema])
-def get_decks(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db)
+async def get_decks(
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = QueryParam(0, ge=0),
+    limit: int = QueryParam(100, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
     """
-    Alle Decks abrufen
+    Alle Decks abrufen, sortiert nach ID
+
+    Für die nächste Seite den Header `X-Next-Cursor` als `cursor` übergeben.
     """
-    decks = db.query(Deck).offset(skip).limit(limit).all()
-    return decks
+    def load(db: Session) -> List[DeckSchema]:
+        page = paginate(deck_query(db), (Deck.id,), response, cursor=cursor, skip=skip, limit=limit)
+        return [DeckSchema.model_validate(deck, from_attributes=True) for deck in page]
+
+    return await run_db(db, load)
 
 @router.get("/{deck_id}", response_model=DeckWithCards)
-def get_deck(deck_id: int, db: Session = Depends(get_db)):
+async def get_deck(deck_id: int, db: Session = Depends(get_read_db)):
     """
     Ein einzelnes Deck mit allen Karten abrufen
     """
-    deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    deck = await run_db(db, encode_deck, deck_id)
     if deck is None:
         raise HTTPException(status_code=404, detail="Deck nicht gefunden")
-    
-    # Karten mit laden
-    deck_cards = db.query(DeckCard).filter(DeckCard.deck_id == deck_id).all()
-    for deck_card in deck_cards:
-        deck_card.card = db.query(Card).filter(Card.id == deck_card.card_id).first()
-    
-    return deck
+    return Response(content=deck, media_type="application/json")
+
+@router.get("/{deck_id}/stats", response_model=DeckStats)
+async def get_deck_stats(deck_id: int, include_sideboard: bool = False, db: Session = Depends(get_read_db)):
+    """
+    Manakurve, Farbverteilung, farbige Mana-Symbole und Kartentypen eines Decks
+
+    Länder zählen nicht zur Manakurve; "C" in `colors` steht für farblose Karten.
+    Das Ergebnis wird bis zur nächsten Änderung des Decks zwischengespeichert.
+    """
+    stats = await run_db(db, deck_stats, deck_id, include_sideboard)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Deck nicht gefunden")
+    return stats
+
+@router.post("/{deck_id}/simulate", response_model=DeckSimulation)
+def simulate(deck_id: int, request: DeckSimulationRequest, db: Session = Depends(get_db)):
+    """
+    Wahrscheinlichkeiten für Starthand, Land-Drops und "Karte X bis Zug N ausspielbar"
+
+    Exakte Werte (hypergeometrisch, ohne Mulligan) sowie, sofern NumPy installiert
+    ist, eine Simulation mit London-Mulligan. Stichprobengröße und Laufzeit sind
+    durch SIMULATION_MAX_SAMPLES und SIMULATION_TIME_LIMIT nach oben begrenzt.
+    """
+    if not db.query(Deck.id).filter(Deck.id == deck_id).first():
+        raise HTTPException(status_code=404, detail="Deck nicht gefunden")
+    if request.keep_min_lands > request.keep_max_lands:
+        raise HTTPException(status_code=400, detail="keep_min_lands darf nicht größer als keep_max_lands sein")
+
+    settings = SimulationSettings(
+        turns=request.turns,
+        on_the_draw=request.on_the_draw,
+        keep_min_lands=request.keep_min_lands,
+        keep_max_lands=request.keep_max_lands,
+        max_mulligans=request.max_mulligans,
+        samples=min(request.samples, SIMULATION_MAX_SAMPLES),
+        time_limit=min(request.time_limit or SIMULATION_TIME_LIMIT, SIMULATION_TIME_LIMIT),
+        seed=request.seed,
+        targets=[(target.card_id, target.turn) for target in request.targets],
+    )
+    try:
+        result = simulate_deck(load_main_deck(db, deck_id), settings)
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"deck_id": deck_id, **result}
 
 @router.post("/", response_model=DeckSchema, status_code=status.HTTP_201_CREATED)
 def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
     """
     Neues Deck erstellen
+
+    Alle Karten werden vorab geprüft; bei unbekannten Karten wird nichts angelegt.
     """
-    # Deck-Objekt erstellen
+    contents = contents_from_items(deck.cards)
+    check_cards(db, [card_id for card_id, _ in contents])
+
+    # Deck und Karten in einer Transaktion anlegen
     db_deck = Deck(
         name=deck.name,
         description=deck.description,
         format=deck.format
     )
     db.add(db_deck)
-    db.commit()
-    db.refresh(db_deck)
-    
-    # Karten zum Deck hinzufügen
-    for card_item in deck.cards:
-        # Überprüfen, ob die Karte existiert
-        db_card = db.query(Card).filter(Card.id == card_item.card_id).first()
-        if db_card is None:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Karte mit ID {card_item.card_id} nicht gefunden"
-            )
-        
-        # Karte zum Deck hinzufügen
-        db_deck_card = DeckCard(
-            deck_id=db_deck.id,
-            card_id=card_item.card_id,
-            quantity=card_item.quantity,
-            is_sideboard=card_item.is_sideboard
-        )
-        db.add(db_deck_card)
+    db.flush()
+    apply_contents(db, db_deck, contents)
     
     db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    return load_deck(db, db_deck.id)
 
 @router.put("/{deck_id}", response_model=DeckSchema)
 def update_deck(deck_id: int, deck: DeckUpdate, db: Session = Depends(get_db)):
     """
     Deck aktualisieren
+
+    Übergebene Karten ersetzen den Inhalt des Decks; geschrieben werden nur
+    die Unterschiede zum bisherigen Inhalt.
     """
     db_deck = db.query(Deck).filter(Deck.id == deck_id).first()
     if db_deck is None:
@@ -96,33 +170,38 @@ def update_deck(deck_id: int, deck: DeckUpdate, db: Session = Depends(get_db)):
     if deck.format is not None:
         db_deck.format = deck.format
     
-    # Karten aktualisieren, falls vorhanden
+    # Karten abgleichen, falls vorhanden
     if deck.cards is not None:
-        # Alle vorhandenen Karten entfernen
-        db.query(DeckCard).filter(DeckCard.deck_id == deck_id).delete()
-        
-        # Neue Karten hinzufügen
-        for card_item in deck.cards:
-            # Überprüfen, ob die Karte existiert
-            db_card = db.query(Card).filter(Card.id == card_item.card_id).first()
-            if db_card is None:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Karte mit ID {card_item.card_id} nicht gefunden"
-                )
-            
-            # Karte zum Deck hinzufügen
-            db_deck_card = DeckCard(
-                deck_id=db_deck.id,
-                card_id=card_item.card_id,
-                quantity=card_item.quantity,
-                is_sideboard=card_item.is_sideboard
-            )
-            db.add(db_deck_card)
+        contents = contents_from_items(deck.cards)
+        check_cards(db, [card_id for card_id, _ in contents])
+        apply_contents(db, db_deck, contents)
     
     db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    return load_deck(db, db_deck.id)
+
+@router.patch("/{deck_id}/cards", response_model=DeckSchema)
+def patch_deck_cards(deck_id: int, operations: List[DeckCardOperation], db: Session = Depends(get_db)):
+    """
+    Deck-Inhalt schrittweise ändern (für den Deck-Builder)
+
+    Erwartet eine Liste von Operationen, die der Reihe nach angewendet werden, z.B.
+    `[{"op": "add", "card_id": "...", "quantity": 2}, {"op": "remove", "card_id": "..."}]`.
+    `remove` ohne `quantity` entfernt den Eintrag ganz, `replace` setzt die Anzahl.
+    Entweder werden alle Operationen übernommen oder keine.
+    """
+    db_deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    if db_deck is None:
+        raise HTTPException(status_code=404, detail="Deck nicht gefunden")
+
+    check_cards(db, [operation.card_id for operation in operations if operation.op != "remove"])
+    try:
+        contents = apply_operations(current_contents(db, deck_id), operations)
+    except CardNotInDeckError as e:
+        raise HTTPException(status_code=404, detail=f"Karte {str(e)} nicht im Deck gefunden")
+    apply_contents(db, db_deck, contents)
+
+    db.commit()
+    return load_deck(db, db_deck.id)
 
 @router.delete("/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_deck(deck_id: int, db: Session = Depends(get_db)):
@@ -138,50 +217,41 @@ def delete_deck(deck_id: int, db: Session = Depends(get_db)):
     db.commit()
     return None
 
-@router.post("/{deck_id}/cards/{card_id}", response_model=DeckSchema)
+@router.post("/{deck_id}/cards/{card_id}", response_model=DeckCardDelta)
 def add_card_to_deck(
     deck_id: int, 
     card_id: str, 
-    quantity: int = 1, 
+    quantity: int = QueryParam(1, ge=1), 
     is_sideboard: bool = False, 
     db: Session = Depends(get_db)
 ):
     """
-    Karte zum Deck hinzufügen oder Anzahl aktualisieren
+    Karte zum Deck hinzufügen oder Anzahl erhöhen
+
+    Atomar per Upsert auf (deck_id, card_id, is_sideboard); gleichzeitige Aufrufe
+    addieren ihre Anzahl. Gibt nur den geänderten Eintrag mit neuer Anzahl zurück.
     """
-    # Überprüfen, ob das Deck existiert
-    db_deck = db.query(Deck).filter(Deck.id == deck_id).first()
-    if db_deck is None:
+    # Deck-Zeitstempel setzen und dabei prüfen, ob das Deck existiert
+    updated_at = touch_deck(db, deck_id)
+    if updated_at is None:
         raise HTTPException(status_code=404, detail="Deck nicht gefunden")
-    
-    # Überprüfen, ob die Karte existiert
-    db_card = db.query(Card).filter(Card.id == card_id).first()
-    if db_card is None:
+
+    entry = add_deck_card(db, deck_id, card_id, quantity, is_sideboard)
+    if entry is None:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Karte nicht gefunden")
     
-    # Überprüfen, ob die Karte bereits im Deck ist
-    db_deck_card = db.query(DeckCard).filter(
-        DeckCard.deck_id == deck_id,
-        DeckCard.card_id == card_id,
-        DeckCard.is_sideboard == is_sideboard
-    ).first()
-    
-    if db_deck_card:
-        # Anzahl aktualisieren
-        db_deck_card.quantity += quantity
-    else:
-        # Neue Karte zum Deck hinzufügen
-        db_deck_card = DeckCard(
-            deck_id=deck_id,
-            card_id=card_id,
-            quantity=quantity,
-            is_sideboard=is_sideboard
-        )
-        db.add(db_deck_card)
-    
     db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    entry_id, total = entry
+    return DeckCardDelta(
+        id=entry_id,
+        deck_id=deck_id,
+        card_id=card_id,
+        is_sideboard=is_sideboard,
+        quantity=total,
+        added=quantity,
+        updated_at=updated_at,
+    )
 
 @router.delete("/{deck_id}/cards/{card_id}", response_model=DeckSchema)
 def remove_card_from_deck(
@@ -210,6 +280,6 @@ def remove_card_from_deck(
     
     # Karte aus dem Deck entfernen
     db.delete(db_deck_card)
+    db_deck.updated_at = datetime.utcnow()
     db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    return load_deck(db, db_deck.id)
@@ -0,0 +1,89 @@
+"""
+HTTP-Caching für Katalog-Endpunkte (/cards, /sets)
+
+Katalogdaten ändern sich nur durch einen Sync. Das ETag einer Antwort setzt
+sich daher aus der Katalog-Generation und der angefragten URL zusammen und
+kann vor dem Aufruf des Endpunkts berechnet werden: Passt `If-None-Match`,
+wird direkt mit 304 geantwortet, ohne Datenbankzugriff und Serialisierung.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.db.database import ReadSessionLocal
+from app.services.catalog_events import catalog_generation
+
+logger = logging.getLogger(__name__)
+
+# Wie lange Browser und Proxys eine Antwort ohne Rückfrage verwenden dürfen (Sekunden)
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+CATALOG_PREFIXES = ("/cards", "/sets")
+# Laufzeitwerte, die sich unabhängig vom Katalog ändern
+UNCACHED_PATHS = ("/cards/autocomplete/stats", "/cards/cache/stats")
+
+
+def is_catalog_path(path: str) -> bool:
+    if path in UNCACHED_PATHS:
+        return False
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in CATALOG_PREFIXES)
+
+
+def catalog_etag(generation: int, path: str, query: str) -> str:
+    """Starkes ETag aus Generation und URL"""
+    digest = hashlib.sha1(f"{path}?{query}".encode("utf-8")).hexdigest()[:16]
+    return f'"c{generation}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Vergleich nach RFC 9110 für If-None-Match (schwacher Vergleich, "*" passt immer)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CatalogCacheMiddleware(BaseHTTPMiddleware):
+    """Setzt ETag und Cache-Control für Katalog-Anfragen und beantwortet If-None-Match mit 304"""
+
+    def __init__(self, app, session_factory: Callable[[], Session] = ReadSessionLocal, max_age: int = CATALOG_MAX_AGE):
+        super().__init__(app)
+        self.session_factory = session_factory
+        self.max_age = max_age
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method not in ("GET", "HEAD") or not is_catalog_path(request.url.path):
+            return await call_next(request)
+
+        try:
+            generation = catalog_generation.value
+            if catalog_generation.is_stale():
+                generation = await run_in_threadpool(catalog_generation.refresh, self.session_factory)
+        except Exception as e:
+            logger.error(f"Katalog-Generation konnte nicht gelesen werden: {str(e)}")
+            return await call_next(request)
+
+        etag = catalog_etag(generation, request.url.path, request.url.query)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.max_age}"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        # Hat ein Sync die Generation während der Anfrage geändert, kein ETag vergeben
+        if response.status_code == 200 and catalog_generation.value == generation:
+            response.headers.update(headers)
+        return response
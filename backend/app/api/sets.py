@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.db.database import SessionLocal
+from app.db.database import get_read_db, run_db
 from app.models.models import Set as SetModel
 from app.schemas.schemas import Set
+from app.services.card_serializer import SET_COLUMNS, dumps, encode_sets, set_payload
 
 router = APIRouter(
     prefix="/sets",
@@ -12,27 +14,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependency für Datenbank-Sessions
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/", response_model=List[Set])
-def get_sets(db: Session = Depends(get_db)):
+async def get_sets(db: Session = Depends(get_read_db)):
     """
     Alle verfügbaren Sets abrufen
     """
-    return db.query(SetModel).all()
+    body = await run_db(db, lambda db: encode_sets(db.execute(select(*SET_COLUMNS))))
+    return Response(content=body, media_type="application/json")
 
 @router.get("/{set_code}", response_model=Set)
-def get_set(set_code: str, db: Session = Depends(get_db)):
+async def get_set(set_code: str, db: Session = Depends(get_read_db)):
     """
     Einzelnes Set anhand des Codes abrufen
     """
-    set_obj = db.query(SetModel).filter(SetModel.code == set_code).first()
-    if set_obj is None:
+    row = await run_db(db, lambda db: db.execute(select(*SET_COLUMNS).where(SetModel.code == set_code)).first())
+    if row is None:
         raise HTTPException(status_code=404, detail="Set nicht gefunden")
-    return set_obj
+    return Response(content=dumps(set_payload(row)), media_type="application/json")
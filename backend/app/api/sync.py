@@ -1,8 +1,12 @@
+import json
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
-from app.scripts.sync_cards import sync_database
+from app.models.models import SyncRun
+from app.scripts.sync_cards import get_active_run, sync_database
 
 router = APIRouter(
     prefix="/sync",
@@ -10,25 +14,106 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+def describe_run(run: SyncRun):
+    """Sync-Lauf inkl. Fortschritt (Prozent, Karten/s, ETA) als Dictionary"""
+    now = datetime.utcnow()
+    end = run.finished_at or now
+    result = {
+        "id": run.id,
+        "status": run.status,
+        "stage": run.stage,
+        "source_updated_at": run.source_updated_at,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "updated_at": run.updated_at.isoformat() if run.updated_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "duration_seconds": round((end - run.started_at).total_seconds(), 1) if run.started_at else None,
+        "stage_durations": json.loads(run.stage_durations) if run.stage_durations else {},
+        "cards_processed": run.cards_processed or 0,
+        "checkpoint_index": run.checkpoint_index or 0,
+        "byte_offset": run.byte_offset or 0,
+        "bytes_total": run.bytes_total,
+        "added": run.cards_added or 0,
+        "updated": run.cards_updated or 0,
+        "removed": run.cards_removed or 0,
+        "unchanged": run.cards_unchanged or 0,
+        "error": run.error,
+        "percent": None,
+        "cards_per_second": None,
+        "eta_seconds": None,
+    }
+
+    if run.status == "completed":
+        result["percent"] = 100.0
+        return result
+
+    # Fortschritt über Kartenlimit (Testmodus) oder gelesene Bytes der Bulk-Datei
+    if run.stage == "cards":
+        if run.card_limit:
+            fraction = min((run.cards_processed or 0) / run.card_limit, 1.0)
+        elif run.bytes_total:
+            fraction = min((run.byte_offset or 0) / run.bytes_total, 1.0)
+        else:
+            fraction = None
+
+        if fraction is not None:
+            result["percent"] = round(fraction * 100, 1)
+
+        # Rate seit Beginn der Phase (bei fortgesetzten Läufen seit dem Neustart)
+        if run.stage_started_at and run.status == "running":
+            elapsed = (now - run.stage_started_at).total_seconds()
+            done_entries = (run.checkpoint_index or 0) - (run.stage_start_index or 0)
+            if elapsed > 0 and done_entries > 0:
+                result["cards_per_second"] = round(done_entries / elapsed, 1)
+
+            if fraction is not None and run.bytes_total and elapsed > 0:
+                start_fraction = (run.stage_start_offset or 0) / run.bytes_total
+                if run.card_limit:
+                    start_fraction = 0.0
+                progress = fraction - start_fraction
+                if progress > 0:
+                    result["eta_seconds"] = round(elapsed * (1.0 - fraction) / progress, 1)
+
+    return result
+
 @router.post("/cards", status_code=status.HTTP_202_ACCEPTED)
-async def sync_cards(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def sync_cards(
+    background_tasks: BackgroundTasks,
+    limit: Optional[int] = None,
+    force: bool = False,
+    db: Session = Depends(get_db)
+):
     """
     Synchronisiert die Karten-Datenbank mit der Scryfall-API.
     Diese Operation wird im Hintergrund ausgeführt.
+
+    Mit `limit` kann die Anzahl der importierten Karten begrenzt werden (z.B. zum Testen).
+    Ein abgebrochener Lauf wird ab dem letzten Checkpoint fortgesetzt. Hat sich die
+    Bulk-Datei seit dem letzten Import nicht geändert, werden die Karten nur mit
+    `force` erneut verarbeitet.
     """
+    if get_active_run(db) is not None:
+        raise HTTPException(status_code=409, detail="Synchronisierung läuft bereits")
+
     # Synchronisierung im Hintergrund starten
-    background_tasks.add_task(sync_database)
-    
+    background_tasks.add_task(sync_database, limit=limit, force=force)
+
     return {"message": "Synchronisierung gestartet. Dies kann einige Minuten dauern."}
 
 @router.get("/status")
-async def sync_status():
+def sync_status(db: Session = Depends(get_db)):
     """
     Gibt den Status der letzten Synchronisierung zurück.
+
+    `last_sync` ist der Abschlusszeitpunkt des letzten erfolgreichen Laufs,
+    `current` der Fortschritt des aktuellen bzw. zuletzt abgebrochenen Laufs.
     """
-    try:
-        with open("last_sync.txt", "r") as f:
-            last_sync = f.read().strip()
-        return {"last_sync": last_sync}
-    except FileNotFoundError:
-        return {"last_sync": None}
+    last_completed = db.query(SyncRun).filter(
+        SyncRun.status == "completed"
+    ).order_by(SyncRun.id.desc()).first()
+    latest = db.query(SyncRun).order_by(SyncRun.id.desc()).first()
+
+    return {
+        "last_sync": last_completed.finished_at.isoformat() if last_completed and last_completed.finished_at else None,
+        "current": describe_run(latest) if latest is not None and latest.status != "completed" else None,
+        "last_run": describe_run(last_completed) if last_completed is not None else None,
+    }
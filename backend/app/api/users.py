@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
 from app.db.database import get_db
+from app.db.pagination import MAX_PAGE_SIZE, paginate
 from app.models.models import User, UserRole
 from app.schemas.schemas import UserCreate, User as UserSchema, UserUpdate, Token
+from app.auth.password_pool import PasswordPoolBusy
 from app.auth.auth import (
-    authenticate_user, create_access_token, get_password_hash,
-    ACCESS_TOKEN_EXPIRE_MINUTES, get_current_active_user, get_current_admin_user
+    authenticate_user, create_access_token, hash_password,
+    ACCESS_TOKEN_EXPIRE_MINUTES, Principal, get_current_active_user, get_current_admin_user, principal_cache
 )
 
 router = APIRouter(
@@ -18,9 +21,14 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Registriert einen neuen Benutzer"""
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Zu viele Anmeldungen gleichzeitig, bitte später erneut versuchen",
+        headers={"Retry-After": "1"},
+    )
+
+def _check_new_user(db: Session, user: UserCreate) -> None:
     # Überprüfen, ob Benutzername bereits existiert
     db_user_by_username = db.query(User).filter(User.username == user.username).first()
     if db_user_by_username:
@@ -30,12 +38,12 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user_by_email = db.query(User).filter(User.email == user.email).first()
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="E-Mail bereits registriert")
-    
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     # Erstelle den ersten Benutzer als Admin
     is_first_user = db.query(User).count() == 0
     
     # Neuen Benutzer erstellen
-    hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -48,10 +56,28 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
+@router.post("/register", response_model=UserSchema)
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    """
+    Registriert einen neuen Benutzer
+
+    Datenbankzugriffe laufen kurz im Standard-Threadpool, das Hashing im
+    Passwort-Pool; ist dieser ausgelastet, antwortet der Endpunkt mit 503.
+    """
+    await run_in_threadpool(_check_new_user, db, user)
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
+
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    """Erstellt ein Token für einen authentifizierten Benutzer"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    """Erstellt ein Token für einen authentifizierten Benutzer (503, wenn der Passwort-Pool ausgelastet ist)"""
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,18 +113,17 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     return {"access_token": access_token, "token_type": "bearer", "is_admin": is_admin}
 
 @router.get("/me", response_model=UserSchema)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
+def read_users_me(current_user: Principal = Depends(get_current_active_user)):
     """Gibt Informationen über den aktuellen Benutzer zurück"""
     return current_user
 
 @router.get("/", response_model=List[UserSchema])
-def read_users(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
-    """Gibt eine Liste aller Benutzer zurück (nur für Administratoren)"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+def read_users(response: Response, cursor: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(100, ge=0, le=MAX_PAGE_SIZE), current_user: Principal = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+    """Gibt eine Liste aller Benutzer zurück (nur für Administratoren), Folgeseite über `X-Next-Cursor`"""
+    return paginate(db.query(User), (User.id,), response, cursor=cursor, skip=skip, limit=limit)
 
 @router.get("/{user_id}", response_model=UserSchema)
-def read_user(user_id: int, current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+def read_user(user_id: int, current_user: Principal = Depends(get_current_admin_user), db: Session = Depends(get_db)):
     """Gibt Informationen über einen bestimmten Benutzer zurück (nur für Administratoren)"""
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user is None:
@@ -106,7 +131,7 @@ def read_user(user_id: int, current_user: User = Depends(get_current_admin_user)
     return db_user
 
 @router.put("/{user_id}", response_model=UserSchema)
-def update_user(user_id: int, user: UserUpdate, current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+def update_user(user_id: int, user: UserUpdate, current_user: Principal = Depends(get_current_admin_user), db: Session = Depends(get_db)):
     """Aktualisiert einen Benutzer (nur für Administratoren)"""
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user is None:
@@ -134,11 +159,13 @@ def update_user(user_id: int, user: UserUpdate, current_user: User = Depends(get
         db_user.role = user.role
     
     db.commit()
+    # Zwischengespeicherte Anmeldungen verwerfen (Rolle, Status oder Name können sich geändert haben)
+    principal_cache.invalidate_user(user_id)
     db.refresh(db_user)
     return db_user
 
 @router.delete("/{user_id}", response_model=UserSchema)
-def delete_user(user_id: int, current_user: User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
+def delete_user(user_id: int, current_user: Principal = Depends(get_current_admin_user), db: Session = Depends(get_db)):
     """Löscht einen Benutzer (nur für Administratoren)"""
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user is None:
@@ -150,4 +177,5 @@ def delete_user(user_id: int, current_user: User = Depends(get_current_admin_use
     
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate_user(user_id)
     return db_user
@@ -1,11 +1,18 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.auth.password_pool import password_pool
 from app.db.database import get_db
 from app.models.models import User, UserRole
 from app.schemas.schemas import TokenData
@@ -15,12 +22,91 @@ SECRET_KEY = "YOUR_SECRET_KEY_HERE"  # In Produktion sollte dies in einer .env-D
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Passwort-Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Passwort-Hashing; Hashes mit weniger Runden werden bei der Anmeldung erneuert
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS
+)
 
 # OAuth2 mit Password Flow
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Zwischenspeicher für angemeldete Benutzer (Sekunden bzw. Anzahl Tokens)
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Unveränderlicher Schnappschuss eines angemeldeten Benutzers"""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class PrincipalCache:
+    """
+    LRU-Cache je Token mit kurzer Gültigkeit
+
+    Ändert sich Rolle oder Aktiv-Status eines Benutzers, werden über
+    `invalidate_user` alle Einträge dieses Benutzers sofort verworfen
+    (nur in diesem Prozess, andere Worker nach Ablauf von `ttl`).
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def set(self, token: str, principal: Principal) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [token for token, (_, principal) in self._entries.items() if principal.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
 def verify_password(plain_password, hashed_password):
     """Überprüft, ob das eingegebene Passwort mit dem gehashten Passwort übereinstimmt"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -29,17 +115,38 @@ def get_password_hash(password):
     """Erstellt einen Hash für das Passwort"""
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    """Erstellt einen Hash für das Passwort im Passwort-Pool (PasswordPoolBusy, wenn ausgelastet)"""
+    return await password_pool.run(pwd_context.hash, password)
+
 def get_user(db: Session, username: str):
     """Holt einen Benutzer aus der Datenbank anhand des Benutzernamens"""
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    """Authentifiziert einen Benutzer anhand von Benutzername und Passwort"""
-    user = get_user(db, username)
+def _store_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(user)
+
+async def authenticate_user(db: Session, username: str, password: str):
+    """
+    Authentifiziert einen Benutzer anhand von Benutzername und Passwort
+
+    Die Prüfung läuft im Passwort-Pool. Entspricht der gespeicherte Hash nicht
+    mehr den Einstellungen von `pwd_context` (z.B. BCRYPT_ROUNDS erhöht), wird
+    er dabei neu berechnet und gespeichert.
+
+    Raises:
+        PasswordPoolBusy: Wenn der Passwort-Pool ausgelastet ist
+    """
+    user = await run_in_threadpool(get_user, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_pool.run(pwd_context.verify_and_update, password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        await run_in_threadpool(_store_password_hash, db, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -53,8 +160,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Holt den aktuellen Benutzer anhand des JWT-Tokens"""
+def decode_token(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    Dekodiert das JWT-Token (einmal je Anfrage, FastAPI speichert das Ergebnis der Dependency)
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Ungültige Anmeldeinformationen",
@@ -62,41 +171,56 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username, role=role)
     except JWTError:
         raise credentials_exception
-    user = get_user(db, username=token_data.username)
-    if user is None:
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
-    return user
+    return TokenData(username=username, role=payload.get("role"), user_id=payload.get("user_id"))
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    token_data: TokenData = Depends(decode_token),
+    db: Session = Depends(get_db)
+):
+    """
+    Holt den aktuellen Benutzer anhand des JWT-Tokens
+
+    Der Benutzer wird als unveränderlicher Schnappschuss je Token für kurze Zeit
+    zwischengespeichert (siehe PrincipalCache), so dass nicht jede Anfrage die
+    Datenbank abfragt. Der Cache liegt im Prozess: `principal_cache.invalidate_user`
+    wirkt nur im eigenen Worker, in anderen Workern gilt eine Änderung von Rolle
+    oder Aktiv-Status erst nach bis zu PRINCIPAL_CACHE_TTL Sekunden.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    user = await run_in_threadpool(get_user, db, token_data.username)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Ungültige Anmeldeinformationen",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal = Principal.from_user(user)
+    principal_cache.set(token, principal)
+    return principal
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     """Überprüft, ob der aktuelle Benutzer aktiv ist"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inaktiver Benutzer")
     return current_user
 
-async def get_current_admin_user(current_user: User = Depends(get_current_user), token: str = Depends(oauth2_scheme)):
+async def get_current_admin_user(
+    current_user: Principal = Depends(get_current_user),
+    token_data: TokenData = Depends(decode_token)
+):
     """Überprüft, ob der aktuelle Benutzer ein Administrator ist"""
-    # Überprüfe die Rolle im Token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        role = payload.get("role")
-        
-        # Überprüfe sowohl die Rolle im Token als auch in der Datenbank
-        if role != UserRole.ADMIN.value or current_user.role != UserRole.ADMIN:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Nicht genügend Berechtigungen"
-            )
-        return current_user
-    except JWTError:
+    # Überprüfe sowohl die Rolle im Token als auch in der Datenbank
+    if token_data.role != UserRole.ADMIN or current_user.role != UserRole.ADMIN:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Ungültige Anmeldeinformationen",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Nicht genügend Berechtigungen"
         )
+    return current_user
@@ -0,0 +1,85 @@
+"""
+Eigener Thread-Pool für Passwort-Hashing und -Prüfung
+
+bcrypt ist absichtlich langsam. Liefe es in synchronen Endpunkten, würde eine
+Welle von Anmeldungen den Standard-Threadpool belegen, den alle anderen
+synchronen Routen (Kartensuche, Decks) teilen. Hier läuft es stattdessen in
+einem kleinen, festen Pool; ist dessen Warteschlange voll, wird die Anfrage
+sofort mit 503 abgewiesen statt sich anzustauen.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Anzahl Aufträge, die zusätzlich zu den laufenden warten dürfen
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Alle Worker sind belegt und die Warteschlange ist voll"""
+
+
+class PasswordPool:
+    """Begrenzter Executor; `run` wartet asynchron, ohne einen Thread zu blockieren"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def _done(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Führt `fn(*args)` im Pool aus
+
+        Raises:
+            PasswordPoolBusy: Wenn bereits `workers + queue_size` Aufträge offen sind
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise PasswordPoolBusy("Passwort-Pool ausgelastet")
+            self._pending += 1
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BaseException:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_pool = PasswordPool()
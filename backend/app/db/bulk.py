@@ -0,0 +1,136 @@
+"""
+Bulk-Upsert für Katalogtabellen
+
+Schreibt ganze Batches gemappter Zeilen mit einem einzigen vorbereiteten
+`INSERT ... ON CONFLICT DO UPDATE` Statement (SQLite und PostgreSQL) statt
+einer Abfrage pro Zeile.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Table, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, Color, Set, card_colors
+
+# Maximale Anzahl von Parametern in einer IN-Klausel (SQLite-Limit ist 999)
+IN_CHUNK_SIZE = 500
+
+_INSERT_BY_DIALECT = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def dialect_insert(db: Session, table: Table):
+    """Gibt die dialektspezifische insert()-Funktion zurück oder None"""
+    dialect_name = db.get_bind(clause=table).dialect.name
+    return _INSERT_BY_DIALECT.get(dialect_name)
+
+
+def upsert_rows(
+    db: Session,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+) -> int:
+    """
+    Fügt Zeilen ein oder aktualisiert sie bei Konflikt auf den Schlüsselspalten
+
+    Args:
+        db: Datenbank-Session
+        table: Zieltabelle
+        rows: Gemappte Zeilen (alle mit denselben Schlüsseln)
+        conflict_columns: Spalten des Primär- bzw. Unique-Schlüssels
+        update_columns: Zu aktualisierende Spalten (Standard: alle außer den Schlüsseln)
+
+    Returns:
+        Anzahl der geschriebenen Zeilen
+    """
+    if not rows:
+        return 0
+
+    if update_columns is None:
+        update_columns = [key for key in rows[0] if key not in conflict_columns]
+
+    insert = dialect_insert(db, table)
+    if insert is None:
+        # Fallback für andere Datenbanken: Update, bei Fehlschlag Insert
+        for row in rows:
+            condition = [table.c[col] == row[col] for col in conflict_columns]
+            values = {col: row[col] for col in update_columns}
+            result = db.execute(update(table).where(*condition).values(**values)) if values else None
+            if result is None or result.rowcount == 0:
+                exists = db.execute(select(table.c[conflict_columns[0]]).where(*condition)).first()
+                if exists is None:
+                    db.execute(table.insert().values(**row))
+        return len(rows)
+
+    stmt = insert(table)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={col: stmt.excluded[col] for col in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+
+    # executemany: ein vorbereitetes Statement für den ganzen Batch
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def existing_ids(db: Session, column, ids: Sequence[Any]) -> set:
+    """Gibt die Teilmenge der IDs zurück, die bereits in der Datenbank existieren"""
+    found = set()
+    for chunk in _chunks(list(ids), IN_CHUNK_SIZE):
+        found.update(db.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def upsert_sets(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Sets per Bulk-Upsert schreiben"""
+    return upsert_rows(db, Set.__table__, rows, ["code"])
+
+
+def upsert_cards(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Karten per Bulk-Upsert schreiben"""
+    return upsert_rows(db, Card.__table__, rows, ["id"])
+
+
+def upsert_colors(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Farben per Bulk-Upsert schreiben"""
+    return upsert_rows(db, Color.__table__, rows, ["code"])
+
+
+def replace_card_colors(db: Session, colors_by_card: Dict[str, Sequence[str]]) -> int:
+    """
+    Ersetzt die Farbzuordnungen der angegebenen Karten
+
+    Args:
+        db: Datenbank-Session
+        colors_by_card: Farbcodes je Karten-ID
+
+    Returns:
+        Anzahl der geschriebenen Zuordnungen
+    """
+    if not colors_by_card:
+        return 0
+
+    card_ids = list(colors_by_card)
+    for chunk in _chunks(card_ids, IN_CHUNK_SIZE):
+        db.execute(delete(card_colors).where(card_colors.c.card_id.in_(chunk)))
+
+    rows = [
+        {"card_id": card_id, "color_code": color_code}
+        for card_id, color_codes in colors_by_card.items()
+        for color_code in dict.fromkeys(color_codes)
+    ]
+    return upsert_rows(db, card_colors, rows, ["card_id", "color_code"], update_columns=[])
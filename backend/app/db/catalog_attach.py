@@ -0,0 +1,97 @@
+"""
+Blue/Green-Katalog für SQLite: Kartendaten in einer eigenen Datei
+
+Mit CATALOG_BLUE_GREEN=true liegen die Katalogtabellen (Sets, Farben, Karten,
+Suchindex) nicht in der Hauptdatenbank, sondern in einer Katalogdatei, die
+jede Verbindung beim Auschecken aus dem Pool als Schema `catalog` einbindet
+(ATTACH). Da SQLite unqualifizierte Tabellennamen auch in eingebundenen
+Datenbanken sucht, funktionieren alle Abfragen und Joins mit `deck_cards`
+unverändert. Benutzer und Decks bleiben in der Hauptdatenbank.
+
+Welche Katalogdatei aktiv ist, steht in einer Zeigerdatei neben der
+Hauptdatenbank (`<datenbank>.catalog`), die per `os.replace` atomar ersetzt
+wird. Verbindungen, die gerade eine Anfrage bedienen, lesen bis zum Ende den
+alten Katalog; beim nächsten Auschecken wird der neue eingebunden, auch in
+anderen Prozessen.
+"""
+
+import os
+import threading
+from typing import Callable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CATALOG_SCHEMA = "catalog"
+
+# Tabellen in der Katalogdatei (FTS-Tabelle siehe app.services.search)
+CATALOG_TABLES = ("sets", "colors", "cards", "card_colors")
+
+
+class CatalogPointer:
+    """Zeigerdatei mit dem Dateinamen des aktiven Katalogs"""
+
+    def __init__(self, database_path: str):
+        database_path = os.path.abspath(database_path)
+        self.directory = os.path.dirname(database_path)
+        self.path = database_path + ".catalog"
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._current: Optional[str] = None
+
+    def catalog_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def current(self) -> Optional[str]:
+        """Pfad des aktiven Katalogs oder None (Zeigerdatei wird nur bei Änderung gelesen)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        with self._lock:
+            if key != self._stat:
+                with open(self.path, encoding="utf-8") as f:
+                    name = f.read().strip()
+                self._current = self.catalog_path(name) if name else None
+                self._stat = key
+            return self._current
+
+    def publish(self, catalog_path: str) -> None:
+        """Macht `catalog_path` atomar zum aktiven Katalog"""
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(catalog_path))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+def attach_catalog(engine: Engine, resolve: Callable[[], Optional[str]], pragmas: Sequence[str] = ()) -> Engine:
+    """
+    Bindet beim Auschecken jeder Verbindung den Katalog ein, den `resolve` liefert
+
+    Ist bereits derselbe Katalog eingebunden, kostet das nur den Aufruf von
+    `resolve`. `pragmas` werden nach jedem ATTACH ausgeführt (z.B. mmap_size
+    für das Schema `catalog`).
+    """
+    @event.listens_for(engine, "checkout")
+    def attach_current_catalog(dbapi_connection, connection_record, connection_proxy):
+        path = resolve()
+        attached = connection_record.info.get("catalog_path")
+        if attached == path:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            if attached is not None:
+                cursor.execute(f"DETACH DATABASE {CATALOG_SCHEMA}")
+                del connection_record.info["catalog_path"]
+            if path is not None:
+                cursor.execute(f"ATTACH DATABASE ? AS {CATALOG_SCHEMA}", (path,))
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                connection_record.info["catalog_path"] = path
+        finally:
+            cursor.close()
+
+    return engine
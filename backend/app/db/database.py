@@ -1,24 +1,137 @@
 import os
-from sqlalchemy import create_engine
+from typing import Any, Callable, List, TypeVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
+from app.db.catalog_attach import CATALOG_SCHEMA, CatalogPointer, attach_catalog
+
 # .env-Datei laden
 load_dotenv()
 
 # Datenbankverbindungsstring aus Umgebungsvariablen
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./magic_cards.db")
 
-# Engine erstellen
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Lesende Routen über AsyncSession (benötigt aiosqlite bzw. asyncpg), sonst synchron im Threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# Async-Treiber je Datenbank, falls ASYNC_DATABASE_URL nicht gesetzt ist
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """z.B. sqlite:///./magic_cards.db -> sqlite+aiosqlite:///./magic_cards.db"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Kein Async-Treiber für {parsed.get_backend_name()} bekannt, ASYNC_DATABASE_URL setzen")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+# SQLite-Profil: WAL (Leser blockieren den Schreiber nicht und umgekehrt),
+# synchronous=NORMAL (in WAL sicher bis auf den letzten Commit bei Stromausfall),
+# Memory-Mapping und größerer Seiten-Cache je Verbindung
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative Werte in KiB (-65536 = 64 MiB)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+# Wartezeit auf Sperren in Millisekunden statt sofortigem "database is locked"
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+
+def sqlite_pragmas(read_only: bool = False, tuned: bool = SQLITE_TUNING) -> List[str]:
+    """PRAGMAs für jede neue SQLite-Verbindung"""
+    pragmas = [f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}"]
+    if tuned:
+        pragmas += [
+            f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}",
+            f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+            f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+def catalog_pragmas(tuned: bool = SQLITE_TUNING) -> List[str]:
+    """PRAGMAs für das eingebundene Katalog-Schema (gelten je Datenbankdatei)"""
+    if not tuned:
+        return []
+    return [
+        f"PRAGMA {CATALOG_SCHEMA}.mmap_size = {SQLITE_MMAP_SIZE}",
+        f"PRAGMA {CATALOG_SCHEMA}.cache_size = {SQLITE_CACHE_SIZE}",
+    ]
+
+def configure_sqlite(engine: Engine, read_only: bool = False, tuned: bool = SQLITE_TUNING) -> Engine:
+    """Setzt die PRAGMAs beim Öffnen jeder Verbindung (ohne Wirkung bei anderen Datenbanken)"""
+    if engine.dialect.name != "sqlite":
+        return engine
+    pragmas = sqlite_pragmas(read_only, tuned)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+# Engine erstellen (Migrationen und schreibende API-Routen)
+engine = configure_sqlite(create_engine(SQLALCHEMY_DATABASE_URL))
 
 # SessionLocal-Klasse erstellen
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Bei einer SQLite-Datei: eigener schreibgeschützter Pool für lesende Routen und
+# eine einzelne Verbindung für den Sync, der damit nie um Pool-Verbindungen
+# der API konkurriert. Andere Datenbanken verwenden überall `engine`.
+if is_sqlite_file(SQLALCHEMY_DATABASE_URL):
+    read_engine = configure_sqlite(create_engine(SQLALCHEMY_DATABASE_URL), read_only=True)
+    writer_engine = configure_sqlite(create_engine(SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0))
+else:
+    read_engine = engine
+    writer_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+WriterSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+
+# Blue/Green-Katalog: Kartendaten in eigener Datei, die ein Sync neu aufbaut und
+# dann atomar austauscht (siehe app.db.catalog_attach, app.services.catalog_swap)
+CATALOG_BLUE_GREEN = os.getenv("CATALOG_BLUE_GREEN", "false").lower() == "true"
+catalog_pointer = None
+if CATALOG_BLUE_GREEN:
+    if not is_sqlite_file(SQLALCHEMY_DATABASE_URL):
+        raise ValueError("CATALOG_BLUE_GREEN setzt eine SQLite-Datei als DATABASE_URL voraus")
+    catalog_pointer = CatalogPointer(make_url(SQLALCHEMY_DATABASE_URL).database)
+    for catalog_engine in {engine, read_engine, writer_engine}:
+        attach_catalog(catalog_engine, catalog_pointer.current, catalog_pragmas())
+
 # Base-Klasse für Modelle
 Base = declarative_base()
 
+# Async-Engine nur, wenn konfiguriert (der Treiber wird beim Erstellen importiert)
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(os.getenv("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URL))
+    configure_sqlite(async_engine.sync_engine, read_only=True)
+    if catalog_pointer is not None:
+        attach_catalog(async_engine.sync_engine, catalog_pointer.current, catalog_pragmas())
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Dependency für FastAPI
 def get_db():
     """Datenbankverbindung für API-Routen bereitstellen"""
@@ -27,3 +140,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_only_db():
+    """Datenbankverbindung für lesende API-Routen (bei SQLite mit query_only)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """AsyncSession für lesende API-Routen bereitstellen (nur mit DB_ASYNC=true)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency der lesenden Routen
+get_read_db = get_async_db if DB_ASYNC else get_read_only_db
+
+T = TypeVar("T")
+
+async def run_db(db: Any, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Führt `fn(session, *args, **kwargs)` aus einer async-Route heraus aus
+
+    Mit einer AsyncSession über `run_sync` (die synchrone Session läuft dabei auf
+    dem Async-Treiber, ohne Thread), sonst im Threadpool. Dadurch können die
+    bestehenden synchronen Service-Funktionen unverändert verwendet werden.
+    `fn` sollte fertige Daten (Bytes, Dicts, Schemas) liefern: nach dem Aufruf
+    dürfen keine Attribute mehr nachgeladen werden.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
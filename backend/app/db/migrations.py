@@ -0,0 +1,80 @@
+"""
+Einfache Schema-Aktualisierung ohne Migrationswerkzeug
+
+`Base.metadata.create_all` legt nur fehlende Tabellen an. Für bestehende
+Datenbanken werden hier zusätzlich neue Spalten und Indizes ergänzt.
+"""
+
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import Table, inspect, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _merge_duplicate_deck_cards(conn: Connection) -> None:
+    """Fasst doppelte Deck-Einträge zusammen, bevor der Unique-Index angelegt wird"""
+    # Über SQLAlchemy, damit der Boolean-Wert für jede Datenbank passt (PostgreSQL: FALSE statt 0)
+    deck_cards = Base.metadata.tables["deck_cards"]
+    conn.execute(update(deck_cards).where(deck_cards.c.is_sideboard.is_(None)).values(is_sideboard=False))
+    conn.exec_driver_sql(
+        "UPDATE deck_cards SET quantity = ("
+        " SELECT SUM(other.quantity) FROM deck_cards AS other"
+        " WHERE other.deck_id = deck_cards.deck_id AND other.card_id = deck_cards.card_id"
+        " AND other.is_sideboard = deck_cards.is_sideboard"
+        ") WHERE id IN ("
+        " SELECT MIN(id) FROM deck_cards GROUP BY deck_id, card_id, is_sideboard HAVING COUNT(*) > 1"
+        ")"
+    )
+    result = conn.exec_driver_sql(
+        "DELETE FROM deck_cards WHERE id NOT IN ("
+        " SELECT MIN(id) FROM deck_cards GROUP BY deck_id, card_id, is_sideboard"
+        ")"
+    )
+    if result.rowcount:
+        logger.info(f"{result.rowcount} doppelte Deck-Einträge zusammengeführt")
+
+
+# Vorbereitung bestehender Daten vor dem Anlegen eines Index (z.B. Duplikate vor Unique-Indizes)
+BEFORE_INDEX = {
+    "ux_deck_cards_entry": _merge_duplicate_deck_cards,
+}
+
+
+def upgrade_schema(engine: Engine, tables: Optional[Sequence[Table]] = None) -> None:
+    """
+    Legt fehlende Tabellen, Spalten und Indizes an
+
+    Mit `tables` nur für diese Tabellen (z.B. getrennt für Hauptdatenbank und
+    Katalogdatei im Blue/Green-Betrieb).
+    """
+    # Modelle importieren, damit alle Tabellen in den Metadaten registriert sind
+    import app.models.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+    with engine.begin() as conn:
+        # Inspector auf derselben Verbindung (Engines mit pool_size=1, z.B. writer_engine)
+        inspector = inspect(conn)
+        for table in (Base.metadata.sorted_tables if tables is None else tables):
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"Ergänze Spalte {table.name}.{column.name}")
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                )
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    if index.name in BEFORE_INDEX:
+                        BEFORE_INDEX[index.name](conn)
+                    logger.info(f"Lege Index {index.name} an")
+                    index.create(bind=conn, checkfirst=True)
@@ -0,0 +1,114 @@
+"""
+Cursor-basierte Paginierung (Keyset)
+
+Statt `OFFSET` wird ab dem Sortierschlüssel der letzten Zeile weitergelesen:
+`WHERE (name, id) > (:name, :id) ORDER BY name, id LIMIT :limit`. Die Abfrage
+bleibt damit auch auf tiefen Seiten ein Index-Zugriff, und gleichzeitige
+Schreibvorgänge verschieben keine Einträge zwischen den Seiten.
+
+Der Cursor ist für Clients undurchsichtig (base64-kodiertes JSON) und wird
+im Header `X-Next-Cursor` zurückgegeben, damit die Antwort weiterhin eine
+einfache Liste bleibt.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Obergrenze für `limit` der paginierten Listen-Endpunkte
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Kodiert die Sortierwerte einer Zeile als Cursor"""
+    payload = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Dekodiert einen Cursor
+
+    Raises:
+        ValueError: Wenn der Cursor nicht zu den Sortierspalten passt
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("Cursor ist nicht lesbar") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor passt nicht zur Sortierung")
+    if any(value is None or isinstance(value, (list, dict)) for value in values):
+        raise ValueError("Cursor enthält ungültige Werte")
+    return values
+
+
+def _after(columns: Sequence, values: Sequence[Any]):
+    """
+    (c1, c2, ...) > (v1, v2, ...) ohne Zeilenwerte (nicht jede Datenbank kennt sie)
+
+    Die zusätzliche Bedingung `c1 >= v1` erlaubt der Datenbank, direkt im Index
+    zu springen, statt ihn ab dem Anfang zu durchlaufen.
+    """
+    if len(columns) == 1:
+        return columns[0] > values[0]
+    return and_(columns[0] >= values[0], _strictly_after(columns, values))
+
+
+def _strictly_after(columns: Sequence, values: Sequence[Any]):
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column > value
+    return or_(column > value, and_(column == value, _strictly_after(columns[1:], values[1:])))
+
+
+def paginate(
+    query: Query,
+    columns: Sequence,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[Any]:
+    """
+    Liest eine Seite sortiert nach `columns` (letzte Spalte muss eindeutig sein)
+
+    Mit `cursor` wird ab der letzten Zeile der vorherigen Seite gelesen, sonst
+    per `skip` (Offset) als Fallback. Ist die Seite voll, wird der Cursor der
+    nächsten Seite im Header `X-Next-Cursor` gesetzt.
+
+    Raises:
+        HTTPException: Bei ungültigem Cursor oder Cursor zusammen mit skip
+    """
+    if limit <= 0:
+        return []
+    query = query.order_by(*columns)
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=400, detail="cursor und skip können nicht kombiniert werden")
+        try:
+            values = decode_cursor(cursor, len(columns))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Ungültiger Cursor: {str(e)}")
+        query = query.filter(_after(columns, values))
+    elif skip:
+        query = query.offset(skip)
+
+    # Eine Zeile mehr lesen, um zu wissen, ob es eine nächste Seite gibt
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_sort_values(rows[-1], columns))
+    return rows
+
+
+def _sort_values(row: Any, columns: Sequence) -> Tuple[Any, ...]:
+    return tuple(getattr(row, column.key) for column in columns)
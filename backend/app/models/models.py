@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table, Text, Boolean, DateTime, Enum
+from sqlalchemy import BigInteger, Column, String, Integer, Float, ForeignKey, Index, Table, Text, Boolean, DateTime, Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import json
 
 from app.db.database import Base
 
@@ -23,23 +24,31 @@ class Card(Base):
     id = Column(String, primary_key=True)  # Scryfall ID
     name = Column(String, nullable=False, index=True)
     mana_cost = Column(String)
-    cmc = Column(Float)  # Converted Mana Cost als Float für Filterung
+    cmc = Column(Float, index=True)  # Converted Mana Cost als Float für Filterung
     type = Column(String, index=True)
     rarity = Column(String, index=True)
     text = Column(Text)
     
     # Set-Informationen
-    set_code = Column(String, ForeignKey("sets.code"))
+    set_code = Column(String, ForeignKey("sets.code"), index=True)
     set_name = Column(String, index=True)
     
     # Bild-URLs
     image_url = Column(String)
     image_url_small = Column(String)
     
+    # Fingerabdruck der importierten Daten (inkl. Farben) für inkrementelle Syncs
+    content_hash = Column(String)
+    
     # Beziehungen
     set = relationship("Set", back_populates="cards")
     colors = relationship("Color", secondary=card_colors, backref="cards")
 
+    __table_args__ = (
+        # Stabiler Sortierschlüssel für die Cursor-Paginierung
+        Index("ix_cards_name_id", "name", "id"),
+    )
+
 class Set(Base):
     """
     Modell für Magic-Sets
@@ -82,6 +91,11 @@ class DeckCard(Base):
     card = relationship("Card")
     deck = relationship("Deck", back_populates="deck_cards")
 
+    __table_args__ = (
+        # Ein Eintrag je Karte und Deckteil; dient zugleich als Index auf deck_id
+        Index("ux_deck_cards_entry", "deck_id", "card_id", "is_sideboard", unique=True),
+    )
+
 
 class UserRole(enum.Enum):
     USER = "user"
@@ -124,3 +138,54 @@ class Deck(Base):
     # Beziehungen
     deck_cards = relationship("DeckCard", back_populates="deck", cascade="all, delete-orphan")
     user = relationship("User", back_populates="decks")
+
+
+class SyncRun(Base):
+    """
+    Modell für einen Synchronisierungslauf mit der Scryfall-API
+    """
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String, nullable=False, default="running", index=True)  # running, completed, failed
+    stage = Column(String)  # sets, download, cards, cleanup, done
+    source = Column(String)  # Download-URL bzw. Pfad der Bulk-Datei
+    source_updated_at = Column(String)  # Stand der Bulk-Datei laut Scryfall (updated_at)
+    card_limit = Column(Integer)  # Optionales Kartenlimit (Testmodus)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Heartbeat
+    finished_at = Column(DateTime)
+
+    # Checkpoint des letzten committeten Batches
+    checkpoint_index = Column(Integer, default=0)  # Anzahl gelesener Bulk-Einträge
+    byte_offset = Column(BigInteger, default=0)  # Gelesene Bytes der Bulk-Datei
+    bytes_total = Column(BigInteger)
+    cards_processed = Column(Integer, default=0)
+
+    # Fortschritt der aktuellen Phase (für Rate und ETA)
+    stage_started_at = Column(DateTime)
+    stage_start_offset = Column(BigInteger, default=0)
+    stage_start_index = Column(Integer, default=0)
+    stage_durations = Column(Text)  # JSON mit Sekunden je Phase
+
+    # Änderungen gegenüber dem vorherigen Stand
+    cards_added = Column(Integer, default=0)
+    cards_updated = Column(Integer, default=0)
+    cards_removed = Column(Integer, default=0)
+    cards_unchanged = Column(Integer, default=0)
+    changes = Column(Text)  # JSON mit den IDs je Änderungsart
+
+    # Blue/Green: Katalogdatei, in die dieser Lauf schreibt (siehe catalog_swap)
+    catalog_file = Column(String)
+
+    error = Column(Text)
+
+    def summary(self):
+        """Änderungen im Format von CardChangeTracker.summary"""
+        return {
+            "added": self.cards_added or 0,
+            "updated": self.cards_updated or 0,
+            "removed": self.cards_removed or 0,
+            "unchanged": self.cards_unchanged or 0,
+            "ids": json.loads(self.changes) if self.changes else {},
+        }
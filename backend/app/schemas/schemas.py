@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Union
+from typing import List, Literal, Optional, Dict, Union
 from pydantic import BaseModel, EmailStr, Field, validator
 from datetime import datetime
 from app.models.models import UserRole
@@ -43,6 +43,24 @@ class Card(CardBase):
     class Config:
         orm_mode = True
 
+class CardSuggestion(BaseModel):
+    id: str
+    name: str
+
+class CardBatchRequest(BaseModel):
+    ids: List[str]
+
+
+class CardBatch(BaseModel):
+    cards: List[Optional[Card]]
+    missing: List[str]
+
+class CardFacets(BaseModel):
+    total: int
+    engine: str
+    facets: Dict[str, Dict[str, int]]
+    cards: List[Card]
+
 
 class DeckCardBase(BaseModel):
     card_id: str
@@ -63,6 +81,83 @@ class DeckCard(DeckCardBase):
         orm_mode = True
 
 
+class DeckCardOperation(BaseModel):
+    """Einzelne Änderung am Deck-Inhalt (add, remove oder replace)"""
+    op: Literal["add", "remove", "replace"]
+    card_id: str
+    is_sideboard: bool = False
+    quantity: Optional[int] = Field(None, ge=0)
+
+
+class DeckCardDelta(BaseModel):
+    """Ergebnis einer Änderung an einem einzelnen Deck-Eintrag"""
+    id: int
+    deck_id: int
+    card_id: str
+    is_sideboard: bool
+    quantity: int
+    added: int
+    updated_at: datetime
+
+
+class DeckStats(BaseModel):
+    deck_id: int
+    updated_at: Optional[datetime] = None
+    include_sideboard: bool
+    total_cards: int
+    average_cmc: Optional[float] = None
+    mana_curve: Dict[str, int]
+    colors: Dict[str, int]
+    pips: Dict[str, int]
+    types: Dict[str, int]
+
+
+class SimulationTarget(BaseModel):
+    card_id: str
+    turn: int = Field(..., ge=1, le=20)
+
+
+class DeckSimulationRequest(BaseModel):
+    samples: int = Field(100000, ge=0)
+    turns: int = Field(4, ge=1, le=20)
+    on_the_draw: bool = False
+    keep_min_lands: int = Field(2, ge=0, le=7)
+    keep_max_lands: int = Field(5, ge=0, le=7)
+    max_mulligans: int = Field(2, ge=0, le=6)
+    seed: Optional[int] = None
+    time_limit: Optional[float] = Field(None, gt=0)
+    targets: List[SimulationTarget] = Field([], max_length=20)
+
+
+class SimulationRun(BaseModel):
+    samples: int
+    truncated: bool
+    elapsed_ms: float
+    mulligans: Dict[str, float]
+    land_drops: Dict[str, float]
+
+
+class TargetOdds(BaseModel):
+    card_id: str
+    name: str
+    turn: int
+    copies: int
+    cmc: float
+    seen: float
+    castable: Optional[float] = None
+
+
+class DeckSimulation(BaseModel):
+    deck_id: int
+    deck_size: int
+    lands: int
+    engine: str
+    opening_hand_lands: Dict[str, float]
+    land_drops: Dict[str, float]
+    simulation: Optional[SimulationRun] = None
+    targets: List[TargetOdds]
+
+
 class DeckBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -159,3 +254,4 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[UserRole] = None
+    user_id: Optional[int] = None
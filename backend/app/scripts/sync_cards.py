@@ -5,15 +5,21 @@ um die lokale Datenbank mit den neuesten Karten aus der Scryfall-API zu aktualis
 """
 
 import os
-import time
 import json
 import logging
-from datetime import datetime
-import requests
+import argparse
+from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.db.database import SessionLocal, engine
-from app.models.models import Card, Set, Color, Base
+from app.db.database import SessionLocal, WriterSessionLocal, catalog_pointer, writer_engine
+from app.models.models import Card, Set, Color, Base, SyncRun
+from app.db.bulk import upsert_sets, upsert_colors
+from app.services.catalog_events import notify_catalog_changed
+from app.services.catalog_swap import CatalogBuild, upgrade_database
+from app.services.catalog_sync import CardChangeTracker
+from app.services.bulk_data import BulkDataCache, JsonArrayReader, open_bulk_file
+from app.services.scryfall_client import get_client
 
 # Logging konfigurieren
 logging.basicConfig(
@@ -31,9 +37,26 @@ SCRYFALL_SETS_URL = "https://api.scryfall.com/sets"
 SCRYFALL_CARDS_URL = "https://api.scryfall.com/cards/search"
 SCRYFALL_BULK_DATA_URL = "https://api.scryfall.com/bulk-data"
 
-# Maximale Anzahl von Anfragen pro Sekunde (Scryfall Rate Limit)
-MAX_REQUESTS_PER_SECOND = 10
-REQUEST_DELAY = 1.0 / MAX_REQUESTS_PER_SECOND
+# Verwendeter Bulk-Typ
+BULK_DATA_TYPE = "default_cards"
+
+# Anzahl der Karten pro Commit beim Bulk-Import
+DEFAULT_BATCH_SIZE = 500
+
+# Ein laufender Sync ohne Heartbeat in diesem Zeitraum gilt als abgebrochen
+STALE_RUN_AFTER = timedelta(minutes=15)
+
+# Lokaler Cache für Bulk-Dateien
+bulk_cache = BulkDataCache()
+
+# Farbdefinitionen
+COLOR_NAMES = {
+    "W": "White",
+    "U": "Blue",
+    "B": "Black",
+    "R": "Red",
+    "G": "Green"
+}
 
 def get_db():
     """Datenbankverbindung herstellen"""
@@ -44,11 +67,11 @@ def get_db():
         db.close()
 
 def fetch_json(url, params=None):
-    """JSON von einer URL abrufen mit Rate Limiting"""
-    time.sleep(REQUEST_DELAY)  # Rate Limiting
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    """JSON von einer URL abrufen (Rate Limiting und Wiederholungen über den geteilten Client)"""
+    data = get_client().get_json(url, params=params)
+    if data is None:
+        raise Exception(f"Nicht gefunden: {url}")
+    return data
 
 def sync_sets(db: Session):
     """Sets aus der Scryfall-API synchronisieren"""
@@ -61,10 +84,9 @@ def sync_sets(db: Session):
     total_sets = len(sets_data.get("data", []))
     logger.info(f"Gefunden: {total_sets} Sets")
     
-    # Sets in der Datenbank aktualisieren
-    for set_data in sets_data.get("data", []):
-        # Nur relevante Felder extrahieren
-        set_info = {
+    # Nur relevante Felder extrahieren
+    sets_info = [
+        {
             "code": set_data.get("code"),
             "name": set_data.get("name"),
             "release_date": set_data.get("released_at"),
@@ -72,169 +94,427 @@ def sync_sets(db: Session):
             "card_count": set_data.get("card_count"),
             "icon_url": set_data.get("icon_svg_uri")
         }
-        
-        # Set in der Datenbank suchen oder erstellen
-        db_set = db.query(Set).filter(Set.code == set_info["code"]).first()
-        if db_set:
-            # Set aktualisieren
-            for key, value in set_info.items():
-                setattr(db_set, key, value)
-        else:
-            # Neues Set erstellen
-            db_set = Set(**set_info)
-            db.add(db_set)
+        for set_data in sets_data.get("data", [])
+    ]
+
+    # Sets in einem Bulk-Upsert schreiben
+    upsert_sets(db, sets_info)
     
     # Änderungen speichern
     db.commit()
     logger.info("Sets synchronisiert")
 
-def get_bulk_data_url():
-    """Holt die URL für die Bulk Data von der Scryfall API"""
-    logger.info("Hole Bulk Data URL...")
+def get_bulk_data_info(bulk_type: str = BULK_DATA_TYPE):
+    """Holt den Eintrag eines Bulk-Typs (download_uri, updated_at, ...) von der Scryfall API"""
+    logger.info("Hole Bulk Data Informationen...")
     
-    # Bulk Data URL abrufen
+    # Bulk Data Liste abrufen
     bulk_data = fetch_json(SCRYFALL_BULK_DATA_URL)
-    default_cards_url = None
     
-    # URL für Default Cards finden
+    # Eintrag für den gewünschten Typ finden
     for data in bulk_data.get("data", []):
-        if data.get("type") == "default_cards":
-            default_cards_url = data.get("download_uri")
-            break
+        if data.get("type") == bulk_type and data.get("download_uri"):
+            return data
     
-    if not default_cards_url:
-        logger.error("Keine Bulk Data URL für Default Cards gefunden")
+    logger.error(f"Keine Bulk Data für {bulk_type} gefunden")
+    return None
+
+def get_bulk_data_url():
+    """Holt die URL für die Bulk Data von der Scryfall API"""
+    info = get_bulk_data_info()
+    return info["download_uri"] if info else None
+
+def map_bulk_card(card_data):
+    """
+    Bulk-Eintrag in unser Kartenformat mappen
+
+    Gibt None zurück, wenn die Karte übersprungen werden soll.
+    """
+    # Token und Embleme überspringen
+    if card_data.get("layout") in ["token", "emblem", "art_series"]:
+        return None
+
+    # Nur Karten mit Bildern verwenden
+    if not card_data.get("image_uris"):
         return None
-    
-    return default_cards_url
 
-def sync_cards_bulk(db: Session):
-    """Karten über die Bulk Data API synchronisieren"""
+    return {
+        "id": card_data.get("id"),
+        "name": card_data.get("name"),
+        "mana_cost": card_data.get("mana_cost"),
+        "cmc": card_data.get("cmc"),
+        "type": card_data.get("type_line"),
+        "rarity": card_data.get("rarity"),
+        "text": card_data.get("oracle_text"),
+        "set_code": card_data.get("set"),
+        "set_name": card_data.get("set_name"),
+        "image_url": card_data.get("image_uris", {}).get("normal"),
+        "image_url_small": card_data.get("image_uris", {}).get("small")
+    }
+
+def ensure_colors(db: Session):
+    """Legt die fünf Farben an bzw. aktualisiert sie"""
+    upsert_colors(db, [
+        {"code": color_code, "name": color_name}
+        for color_code, color_name in COLOR_NAMES.items()
+    ])
+    db.commit()
+
+def touch_heartbeat(db: Session, sync_run: SyncRun):
+    """Hält einen Lauf während langer Schritte ohne Checkpoint (Download, Komprimierung) aktiv"""
+    sync_run.updated_at = datetime.utcnow()
+    db.commit()
+
+def get_active_run(db: Session) -> Optional[SyncRun]:
+    """Gibt einen gerade laufenden Sync zurück (Heartbeat jünger als STALE_RUN_AFTER)"""
+    threshold = datetime.utcnow() - STALE_RUN_AFTER
+    return db.query(SyncRun).filter(
+        SyncRun.status == "running",
+        SyncRun.updated_at >= threshold
+    ).order_by(SyncRun.id.desc()).first()
+
+def find_resumable_run(db: Session, source: str, limit: Optional[int]) -> Optional[SyncRun]:
+    """
+    Sucht einen abgebrochenen Lauf für dieselbe Bulk-Datei, der fortgesetzt werden kann
+    """
+    run = db.query(SyncRun).filter(
+        SyncRun.status.in_(["failed", "running"])
+    ).order_by(SyncRun.id.desc()).first()
+
+    if run is None or run.source != source or run.card_limit != limit:
+        return None
+    if run.stage not in ("download", "cards", "cleanup"):
+        return None
+    return run
+
+def find_completed_import(db: Session, updated_at: str, exclude_id: Optional[int] = None) -> Optional[SyncRun]:
+    """Sucht einen vollständigen, erfolgreichen Import desselben Bulk-Stands"""
+    query = db.query(SyncRun).filter(
+        SyncRun.status == "completed",
+        SyncRun.source_updated_at == updated_at,
+        SyncRun.card_limit.is_(None)
+    )
+    if exclude_id is not None:
+        query = query.filter(SyncRun.id != exclude_id)
+    return query.first()
+
+def start_stage(db: Session, sync_run: SyncRun, stage: str):
+    """Setzt die aktuelle Phase eines Laufs und speichert den Startpunkt"""
+    sync_run.stage = stage
+    sync_run.stage_started_at = datetime.utcnow()
+    sync_run.stage_start_offset = sync_run.byte_offset or 0
+    sync_run.stage_start_index = sync_run.checkpoint_index or 0
+    db.commit()
+
+def finish_stage(db: Session, sync_run: SyncRun):
+    """Addiert die Dauer der aktuellen Phase zu den Phasendauern"""
+    durations = json.loads(sync_run.stage_durations) if sync_run.stage_durations else {}
+    elapsed = (datetime.utcnow() - sync_run.stage_started_at).total_seconds()
+    durations[sync_run.stage] = round(durations.get(sync_run.stage, 0) + elapsed, 3)
+    sync_run.stage_durations = json.dumps(durations)
+    db.commit()
+
+def save_checkpoint(db: Session, sync_run: SyncRun, tracker: CardChangeTracker,
+                    index: int, byte_offset: int, processed: int):
+    """Speichert den Fortschritt zusammen mit dem Batch in derselben Transaktion"""
+    summary = tracker.summary()
+    sync_run.checkpoint_index = index
+    sync_run.byte_offset = byte_offset
+    sync_run.cards_processed = processed
+    sync_run.cards_added = summary["added"]
+    sync_run.cards_updated = summary["updated"]
+    sync_run.cards_removed = summary["removed"]
+    sync_run.cards_unchanged = summary["unchanged"]
+    sync_run.changes = json.dumps(summary["ids"])
+    db.commit()
+
+def reset_checkpoint(sync_run: SyncRun):
+    """Verwirft den Fortschritt eines Laufs, der Import beginnt wieder beim ersten Eintrag"""
+    sync_run.checkpoint_index = 0
+    sync_run.byte_offset = 0
+    sync_run.cards_processed = 0
+    sync_run.cards_added = 0
+    sync_run.cards_updated = 0
+    sync_run.cards_removed = 0
+    sync_run.cards_unchanged = 0
+    sync_run.changes = None
+
+def sync_cards_bulk(db: Session, limit: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                    sync_run: Optional[SyncRun] = None, bulk_info=None,
+                    bulk_path: Optional[str] = None, force: bool = False):
+    """
+    Karten über die Bulk Data API synchronisieren
+
+    Die Bulk-Datei kommt aus dem lokalen Cache bzw. wird bedingt heruntergeladen
+    und anschließend Karte für Karte gelesen, so dass der Speicherverbrauch
+    unabhängig von der Größe des Katalogs bleibt. Geschrieben werden nur neue
+    und geänderte Karten. Wurde derselbe Bulk-Stand bereits vollständig
+    importiert, wird die Kartenphase übersprungen (außer mit `force`).
+
+    Nach jedem Batch wird ein Checkpoint im Sync-Lauf gespeichert. Enthält
+    `sync_run` bereits einen Checkpoint, wird ab dort fortgesetzt.
+
+    Args:
+        db: Datenbank-Session
+        limit: Optional, maximale Anzahl zu importierender Karten (für Tests)
+        batch_size: Anzahl der Karten pro Commit
+        sync_run: Optional, Sync-Lauf für Checkpoints (wird sonst angelegt)
+        bulk_info: Optional, bereits abgerufener Eintrag aus /bulk-data
+        bulk_path: Optional, lokale Bulk-Datei für Offline-Importe und Benchmarks
+        force: Auch einen bereits importierten Bulk-Stand erneut verarbeiten
+
+    Returns:
+        Änderungen des Laufs (siehe CardChangeTracker.summary)
+    """
     logger.info("Synchronisiere Karten über Bulk Data...")
-    
-    # Bulk Data URL abrufen
-    bulk_data_url = get_bulk_data_url()
-    logger.info(f"Lade Bulk Data von {bulk_data_url}")
-    
-    # Bulk Data herunterladen
-    response = requests.get(bulk_data_url)
-    cards_data = response.json()
-    
+
+    if sync_run is None:
+        sync_run = SyncRun(status="running", card_limit=limit)
+        db.add(sync_run)
+        db.commit()
+
+    # Bulk-Datei aus dem Cache holen bzw. bedingt herunterladen
+    start_stage(db, sync_run, "download")
+    if bulk_path:
+        bulk_file = bulk_cache.describe(bulk_path)
+        sync_run.source = bulk_path
+        logger.info(f"Verwende lokale Bulk Data {bulk_path}")
+    else:
+        bulk_info = bulk_info or get_bulk_data_info()
+        if not bulk_info:
+            raise Exception("Keine Bulk Data URL gefunden")
+        sync_run.source = bulk_info["download_uri"]
+        logger.info(f"Hole Bulk Data {bulk_info['download_uri']} (Stand {bulk_info.get('updated_at')})")
+        # Der Download kann länger als STALE_RUN_AFTER dauern, daher zwischendurch Heartbeat
+        bulk_file = bulk_cache.fetch(bulk_info, progress=lambda done: touch_heartbeat(db, sync_run))
+        if bulk_file.from_cache:
+            logger.info(f"Bulk Data unverändert, verwende Cache {bulk_file.path}")
+        else:
+            logger.info(f"Bulk Data heruntergeladen ({(bulk_file.size or 0) / (1024 * 1024):.1f} MB)")
+    sync_run.source_updated_at = bulk_file.updated_at
+    sync_run.bytes_total = bulk_file.size
+    finish_stage(db, sync_run)
+
+    # Derselbe Bulk-Stand wurde schon vollständig importiert: nichts zu tun
+    if not force and not limit and bulk_file.updated_at:
+        previous = find_completed_import(db, bulk_file.updated_at, exclude_id=sync_run.id)
+        if previous is not None:
+            logger.info(f"Bulk-Stand {bulk_file.updated_at} wurde bereits mit Lauf {previous.id} importiert")
+            summary = CardChangeTracker.empty_summary()
+            summary["skipped"] = True
+            return summary
+
     # Zuerst alle Farben einmalig erstellen
     logger.info("Erstelle Farbdefinitionen...")
-    color_mapping = {
-        "W": "White",
-        "U": "Blue",
-        "B": "Black",
-        "R": "Red",
-        "G": "Green"
-    }
-    
-    # Prüfe, ob die Farben bereits existieren, sonst erstelle sie
-    for color_code, color_name in color_mapping.items():
-        db_color = db.query(Color).filter(Color.code == color_code).first()
-        if not db_color:
-            db_color = Color(code=color_code, name=color_name)
-            db.add(db_color)
-    
-    # Speichere die Farben in der Datenbank
-    db.commit()
+    ensure_colors(db)
     logger.info("Farbdefinitionen erstellt")
-    
-    # Karten verarbeiten - Begrenzung auf 100 Karten zum Testen
-    cards_data = cards_data[:100]  # Nur die ersten 100 Karten verwenden
-    total_cards = len(cards_data)
-    batch_size = 50  # Karten pro Batch
-    logger.info(f"Verarbeite {total_cards} Karten in Batches von {batch_size} (Testmodus)")
-    
-    for i in range(0, total_cards, batch_size):
-        batch = cards_data[i:i+batch_size]
-        logger.info(f"Verarbeite Batch {i//batch_size + 1}/{(total_cards + batch_size - 1)//batch_size}")
-        
-        for card_data in batch:
-            # Nur relevante Felder extrahieren
-            if card_data.get("layout") in ["token", "emblem", "art_series"]:
-                continue  # Token und Embleme überspringen
-                
-            # Nur Karten mit Bildern verwenden
-            if not card_data.get("image_uris"):
+
+    # Vorhandene Fingerabdrücke laden, um unveränderte Karten zu überspringen
+    tracker = CardChangeTracker(db)
+
+    resume_index = sync_run.checkpoint_index or 0
+    processed = 0
+    if resume_index:
+        # Zähler des unterbrochenen Laufs übernehmen
+        tracker.restore(sync_run.summary())
+        processed = sync_run.cards_processed or 0
+        logger.info(f"Setze Import nach {resume_index} Einträgen ({processed} Karten) fort")
+
+    start_stage(db, sync_run, "cards")
+    if limit:
+        logger.info(f"Verarbeite maximal {limit} Karten in Batches von {batch_size} (Testmodus)")
+    else:
+        logger.info(f"Verarbeite Karten in Batches von {batch_size}")
+
+    index = 0
+    batch = []
+    with open_bulk_file(bulk_file.path) as f:
+        reader = JsonArrayReader(f)
+        for card_data in reader:
+            if limit and processed >= limit:
+                break
+            index += 1
+
+            card_info = map_bulk_card(card_data)
+
+            # Bereits committete Einträge nur als vorhanden markieren
+            if index <= resume_index:
+                if card_info is not None:
+                    tracker.mark_seen(card_info["id"])
                 continue
-                
-            card_info = {
-                "id": card_data.get("id"),
-                "name": card_data.get("name"),
-                "mana_cost": card_data.get("mana_cost"),
-                "cmc": card_data.get("cmc"),
-                "type": card_data.get("type_line"),
-                "rarity": card_data.get("rarity"),
-                "text": card_data.get("oracle_text"),
-                "set_code": card_data.get("set"),
-                "set_name": card_data.get("set_name"),
-                "image_url": card_data.get("image_uris", {}).get("normal"),
-                "image_url_small": card_data.get("image_uris", {}).get("small")
-            }
-            
-            # Karte in der Datenbank suchen oder erstellen
-            db_card = db.query(Card).filter(Card.id == card_info["id"]).first()
-            if db_card:
-                # Karte aktualisieren
-                for key, value in card_info.items():
-                    setattr(db_card, key, value)
-            else:
-                # Neue Karte erstellen
-                db_card = Card(**card_info)
-                db.add(db_card)
-            
-            # Bestehende Farben entfernen
-            db_card.colors = []
-            
-            # Farben hinzufügen (falls vorhanden)
-            for color_code in card_data.get("colors", []):
-                # Farbe aus der Datenbank abrufen (sollte bereits existieren)
-                db_color = db.query(Color).filter(Color.code == color_code).first()
-                if db_color:
-                    # Farbe zur Karte hinzufügen
-                    db_card.colors.append(db_color)
-        
-        # Änderungen speichern
-        db.commit()
-        logger.info(f"Batch {i//batch_size + 1} verarbeitet")
-    
-    logger.info("Karten synchronisiert")
 
-def sync_database():
-    """Hauptfunktion zum Synchronisieren der Datenbank mit der Scryfall-API"""
+            if card_info is None:
+                continue
+
+            color_codes = [code for code in card_data.get("colors", []) if code in COLOR_NAMES]
+            batch.append((card_info, color_codes))
+            processed += 1
+
+            if len(batch) >= batch_size:
+                written = tracker.write_batch(batch)
+                save_checkpoint(db, sync_run, tracker, index, reader.bytes_read, processed)
+                logger.info(f"Checkpoint bei {processed} Karten ({written} geschrieben)")
+                batch = []
+
+        if batch:
+            tracker.write_batch(batch)
+        save_checkpoint(db, sync_run, tracker, index, reader.bytes_read, processed)
+    finish_stage(db, sync_run)
+
+    # Entfernte Karten nur nach einem vollständigen Import löschen
+    start_stage(db, sync_run, "cleanup")
+    if not limit:
+        removed = tracker.remove_missing()
+        save_checkpoint(db, sync_run, tracker, index, sync_run.byte_offset, processed)
+        logger.info(f"{len(removed)} nicht mehr vorhandene Karten entfernt")
+
+    # Ältere Bulk-Dateien aufräumen
+    if not bulk_path:
+        bulk_cache.prune(bulk_file.bulk_type or BULK_DATA_TYPE)
+    finish_stage(db, sync_run)
+
+    summary = tracker.summary()
+    logger.info(
+        f"Karten synchronisiert ({processed} Karten: {summary['added']} neu, "
+        f"{summary['updated']} geändert, {summary['removed']} entfernt, "
+        f"{summary['unchanged']} unverändert)"
+    )
+    return summary
+
+def sync_database(limit: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                  force: bool = False, bulk_path: Optional[str] = None):
+    """
+    Hauptfunktion zum Synchronisieren der Datenbank mit der Scryfall-API
+
+    Ein abgebrochener Lauf für dieselbe Bulk-Datei wird ab dem letzten
+    Checkpoint fortgesetzt. Mit CATALOG_BLUE_GREEN=true schreibt der Lauf in
+    eine Kopie des Katalogs, die erst nach Import und Suchindex aktiv wird
+    (siehe app.services.catalog_swap). Ist der aktuelle Bulk-Stand bereits
+    importiert, endet der Lauf ohne `force` vor Download und Kopie.
+
+    Args:
+        limit: Optional, maximale Anzahl zu importierender Karten (für Tests)
+        batch_size: Anzahl der Karten pro Commit bzw. Checkpoint
+        force: Karten auch bei unverändertem Bulk-Stand neu verarbeiten
+        bulk_path: Optional, lokale Bulk-Datei (Offline-Import ohne Scryfall-Anfragen)
+    """
     start_time = datetime.now()
     logger.info(f"Starte Synchronisierung um {start_time}")
     
-    # Datenbankverbindung herstellen
-    db = SessionLocal()
+    # Tabellen erstellen bzw. um neue Spalten ergänzen
+    upgrade_database(writer_engine, catalog_pointer)
+    
+    # Eigene Schreibverbindung, damit der Sync den Pool der API nicht belegt
+    catalog_build = CatalogBuild(writer_engine.url, catalog_pointer) if catalog_pointer is not None else None
+    db = catalog_build.session() if catalog_build is not None else WriterSessionLocal()
+    sync_run = None
     
     try:
-        # Tabellen erstellen, falls sie nicht existieren
-        Base.metadata.create_all(bind=engine)
+        # Keinen zweiten Lauf parallel starten
+        active_run = get_active_run(db)
+        if active_run is not None:
+            logger.warning(f"Synchronisierung {active_run.id} läuft bereits, breche ab")
+            return None
         
-        # Sets synchronisieren
-        sync_sets(db)
+        bulk_info = None
+        if bulk_path:
+            source = bulk_path
+            source_updated_at = bulk_cache.describe(bulk_path).updated_at
+        else:
+            bulk_info = get_bulk_data_info()
+            if not bulk_info:
+                raise Exception("Keine Bulk Data URL gefunden")
+            source = bulk_info["download_uri"]
+            source_updated_at = bulk_info.get("updated_at")
+        
+        # Derselbe Bulk-Stand wurde schon vollständig importiert: Lauf ohne Download,
+        # Katalogkopie und Austausch als übersprungen protokollieren
+        previous = None
+        if not force and not limit and source_updated_at:
+            previous = find_completed_import(db, source_updated_at)
+        if previous is not None:
+            logger.info(f"Bulk-Stand {source_updated_at} wurde bereits mit Lauf {previous.id} importiert")
+            now = datetime.utcnow()
+            db.add(SyncRun(status="completed", stage="done", source=source, source_updated_at=source_updated_at,
+                           started_at=now, finished_at=now))
+            db.commit()
+            summary = CardChangeTracker.empty_summary()
+            summary["skipped"] = True
+            return summary
+        
+        # Abgebrochenen Lauf fortsetzen oder neuen Lauf anlegen
+        sync_run = find_resumable_run(db, source, limit)
+        if sync_run is not None:
+            logger.info(f"Setze Synchronisierung {sync_run.id} fort (Phase {sync_run.stage})")
+            sync_run.status = "running"
+            sync_run.error = None
+        else:
+            sync_run = SyncRun(status="running", source=source, card_limit=limit,
+                               started_at=datetime.utcnow())
+            db.add(sync_run)
+        db.commit()
+        
+        # Blue/Green: in die Katalogkopie des Laufs schreiben (ab der nächsten Transaktion eingebunden)
+        if catalog_build is not None:
+            if catalog_build.start(sync_run) and sync_run.checkpoint_index:
+                logger.info("Katalogkopie des abgebrochenen Laufs fehlt, Import beginnt von vorn")
+                reset_checkpoint(sync_run)
+            db.commit()
+        
+        # Sets synchronisieren (bei Offline-Importen übersprungen)
+        if not bulk_path:
+            start_stage(db, sync_run, "sets")
+            sync_sets(db)
+            finish_stage(db, sync_run)
         
         # Karten synchronisieren
-        sync_cards_bulk(db)
+        summary = sync_cards_bulk(db, limit=limit, batch_size=batch_size, sync_run=sync_run,
+                                  bulk_info=bulk_info, bulk_path=bulk_path, force=force)
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
-        # Speichere den Zeitpunkt der letzten Synchronisierung
-        with open("last_sync.txt", "w") as f:
-            f.write(end_time.isoformat())
+        # Blue/Green: neuen Katalog aktivieren, bevor der Lauf als abgeschlossen gilt
+        if catalog_build is not None:
+            catalog_build.publish(db, sync_run)
+        
+        # Lauf abschließen
+        sync_run.status = "completed"
+        sync_run.stage = "done"
+        sync_run.finished_at = datetime.utcnow()
+        db.commit()
+        
+        # Prozessinterne Indizes und Caches aktualisieren
+        notify_catalog_changed(db)
         
         logger.info(f"Synchronisierung abgeschlossen in {duration:.2f} Sekunden")
         print(f"Synchronisierung abgeschlossen in {duration:.2f} Sekunden!")
+        return summary
     except Exception as e:
         logger.error(f"Fehler bei der Synchronisierung: {str(e)}")
         db.rollback()
+        if sync_run is not None and sync_run.id is not None:
+            # Checkpoint bleibt erhalten, der nächste Lauf setzt dort fort
+            sync_run.status = "failed"
+            sync_run.error = str(e)
+            db.commit()
+            # Bereits committete Batches sind ohne Blue/Green schon im Katalog sichtbar
+            if catalog_build is None:
+                notify_catalog_changed(db)
         raise
     finally:
         db.close()
+        if catalog_build is not None:
+            catalog_build.dispose()
 
 if __name__ == "__main__":
-    sync_database()
+    parser = argparse.ArgumentParser(description="Karten aus der Scryfall-API synchronisieren")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Maximale Anzahl zu importierender Karten (z.B. 100 zum Testen)")
+    parser.add_argument("--force", action="store_true",
+                        help="Karten auch verarbeiten, wenn sich die Bulk-Datei nicht geändert hat")
+    parser.add_argument("--file", default=None,
+                        help="Lokale (ggf. gecachte .json.gz) Bulk-Datei offline importieren")
+    args = parser.parse_args()
+
+    sync_database(limit=args.limit, force=args.force, bulk_path=args.file)
@@ -0,0 +1,186 @@
+"""
+Autovervollständigung von Kartennamen
+
+Hält alle unterschiedlichen Kartennamen als sortierte Listen im Speicher:
+- `keys`: normalisierte Namen für die Suche nach dem Namensanfang
+- `word_keys`/`word_refs`: jedes Wort eines Namens mit Verweis auf den Namen,
+  damit auch "bolt" zu "Lightning Bolt" führt
+
+Eine Anfrage ist damit eine Binärsuche plus das Ablaufen weniger Einträge.
+Der Index wird beim Start und nach jedem Sync (siehe catalog_events) neu
+aufgebaut und ist über AUTOCOMPLETE_MAX_NAMES in der Größe begrenzt.
+"""
+
+import logging
+import os
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Card
+from app.services.catalog_events import on_catalog_changed
+
+logger = logging.getLogger(__name__)
+
+# Obergrenze für die Anzahl indizierter Namen (Scryfall: ca. 30.000)
+AUTOCOMPLETE_MAX_NAMES = int(os.getenv("AUTOCOMPLETE_MAX_NAMES", "60000"))
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+# Maximal geprüfte Worteinträge je Anfrage (begrenzt die Laufzeit bei kurzen Eingaben)
+MAX_WORD_SCAN = 2000
+
+
+def normalize(value: str) -> str:
+    """Kleinschreibung ohne Akzente und Satzzeichen, z.B. "Jötun Grunt" -> "jotun grunt" """
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    cleaned = "".join(
+        char if char.isalnum() else " "
+        for char in decomposed
+        if not unicodedata.combining(char)
+    )
+    return " ".join(cleaned.split())
+
+
+class _IndexState(NamedTuple):
+    names: List[str]
+    ids: List[str]
+    keys: List[str]
+    word_keys: List[str]
+    word_refs: array
+
+
+class NameIndex:
+    """Präfixindex über die unterschiedlichen Kartennamen"""
+
+    def __init__(self, max_names: int = AUTOCOMPLETE_MAX_NAMES):
+        self.max_names = max_names
+        self._state: Optional[_IndexState] = None
+        self._stats: Dict[str, Any] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._state is not None
+
+    def build(self, rows) -> None:
+        """
+        Baut den Index aus (Name, Karten-ID)-Paaren auf
+
+        Der neue Stand wird erst am Ende eingesetzt; laufende Anfragen
+        sehen also immer einen vollständigen Index.
+        """
+        start = time.perf_counter()
+        entries = sorted(
+            (normalize(name), name, card_id) for name, card_id in rows if name
+        )
+        truncated = len(entries) > self.max_names
+        if truncated:
+            logger.warning(f"Autovervollständigung auf {self.max_names} von {len(entries)} Namen begrenzt")
+            entries = entries[:self.max_names]
+
+        keys = [entry[0] for entry in entries]
+        words = sorted(
+            (word, position)
+            for position, key in enumerate(keys)
+            for word in set(key.split())
+        )
+        state = _IndexState(
+            names=[entry[1] for entry in entries],
+            ids=[entry[2] for entry in entries],
+            keys=keys,
+            word_keys=[word for word, _ in words],
+            word_refs=array("I", (position for _, position in words)),
+        )
+
+        self._state = state
+        self._stats = {
+            "names": len(state.names),
+            "words": len(state.word_keys),
+            "max_names": self.max_names,
+            "truncated": truncated,
+            "memory_bytes": self._memory_usage(state),
+            "build_seconds": round(time.perf_counter() - start, 3),
+            "built_at": datetime.utcnow().isoformat(),
+        }
+        logger.info(f"Autovervollständigung aufgebaut: {self._stats['names']} Namen, "
+                    f"{self._stats['memory_bytes'] / 1024 / 1024:.1f} MB")
+
+    def rebuild(self, db: Session) -> None:
+        """Baut den Index aus der Datenbank neu auf (eine Karten-ID je Name)"""
+        rows = db.execute(select(Card.name, func.min(Card.id)).group_by(Card.name)).all()
+        self.build(rows)
+
+    @staticmethod
+    def _memory_usage(state: _IndexState) -> int:
+        """Geschätzter Speicherbedarf in Bytes (Listen plus Zeichenketten)"""
+        size = sum(sys.getsizeof(part) for part in state)
+        for strings in (state.names, state.ids, state.keys, state.word_keys):
+            size += sum(sys.getsizeof(value) for value in strings)
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        """Kennzahlen des aktuellen Index (Anzahl, Speicher, Aufbauzeit)"""
+        return dict(self._stats, built=self.is_built)
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Dict[str, str]]:
+        """
+        Vorschläge für eine Eingabe
+
+        Zuerst Namen, die mit der Eingabe beginnen, danach Namen, in denen ein
+        Wort mit dem ersten Suchwort beginnt. Weitere Suchwörter müssen
+        jeweils als Wortanfang im Namen vorkommen.
+        """
+        state = self._state
+        query = normalize(query)
+        if state is None or not query or limit <= 0:
+            return []
+
+        results: List[int] = []
+
+        # Namensanfang
+        keys = state.keys
+        position = bisect_left(keys, query)
+        while position < len(keys) and len(results) < limit and keys[position].startswith(query):
+            results.append(position)
+            position += 1
+
+        # Wortanfang innerhalb des Namens
+        if len(results) < limit:
+            first, *rest = query.split()
+            seen = set(results)
+            word_keys = state.word_keys
+            position = bisect_left(word_keys, first)
+            end = min(len(word_keys), position + MAX_WORD_SCAN)
+            while position < end and len(results) < limit and word_keys[position].startswith(first):
+                ref = state.word_refs[position]
+                position += 1
+                if ref in seen:
+                    continue
+                if rest and not _has_word_prefixes(keys[ref], rest):
+                    continue
+                seen.add(ref)
+                results.append(ref)
+
+        return [{"id": state.ids[ref], "name": state.names[ref]} for ref in results]
+
+
+def _has_word_prefixes(key: str, prefixes: List[str]) -> bool:
+    words = key.split()
+    return all(any(word.startswith(prefix) for word in words) for prefix in prefixes)
+
+
+name_index = NameIndex()
+
+
+@on_catalog_changed
+def rebuild_name_index(db: Session) -> None:
+    """Baut den Index nach einem Sync neu auf"""
+    name_index.rebuild(db)
@@ -0,0 +1,374 @@
+"""
+Hilfsfunktionen für die Scryfall Bulk Data
+
+Die Bulk-Dateien von Scryfall sind mehrere hundert MB groß. Statt sie komplett
+in den Speicher zu laden, werden sie in Blöcken auf die Festplatte geschrieben
+und das JSON-Array anschließend Element für Element gelesen.
+"""
+
+import codecs
+import gzip
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+import requests
+
+# Blockgröße für Download und Parser (1 MB)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Verzeichnis für heruntergeladene Bulk-Dateien
+BULK_DATA_DIR = os.getenv("BULK_DATA_DIR", "./bulk_data")
+
+# Anzahl der Versionen je Bulk-Typ, die im Cache bleiben
+BULK_CACHE_KEEP = int(os.getenv("BULK_CACHE_KEEP", "2"))
+
+# Abstand der Fortschrittsmeldungen beim Herunterladen und Komprimieren (16 MB)
+PROGRESS_INTERVAL = 16 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+# Erhält die bisher verarbeiteten Bytes (z.B. für den Heartbeat eines Sync-Laufs)
+ProgressCallback = Callable[[int], None]
+
+
+def _throttled(progress: Optional[ProgressCallback]) -> Callable[[int], None]:
+    """Ruft `progress` höchstens alle PROGRESS_INTERVAL Bytes auf"""
+    reported = [0]
+
+    def report(done: int) -> None:
+        if progress is not None and done - reported[0] >= PROGRESS_INTERVAL:
+            reported[0] = done
+            progress(done)
+
+    return report
+
+
+def download_bulk_file(
+    url: str,
+    dest_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    headers: Optional[Dict[str, str]] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Lädt eine Bulk-Datei blockweise auf die Festplatte herunter
+
+    Die Datei wird zuerst unter einem temporären Namen geschrieben und erst nach
+    vollständigem Download umbenannt, damit nie eine halbe Datei liegen bleibt.
+    Ein abgebrochener Download wird per HTTP-Range fortgesetzt, sofern der
+    Server das unterstützt.
+
+    Args:
+        headers: Zusätzliche Header, z.B. für bedingte Anfragen (If-None-Match)
+        progress: Wird etwa alle PROGRESS_INTERVAL Bytes mit der Dateigröße aufgerufen
+
+    Returns:
+        {"status": HTTP-Status, "size": Bytes, "etag": ..., "last_modified": ...}
+        Bei 304 wird nichts geschrieben und "size" ist 0.
+    """
+    directory = os.path.dirname(dest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{dest_path}.part"
+    offset = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+
+    with requests.get(url, stream=True, headers=request_headers, timeout=60) as response:
+        result = {
+            "status": response.status_code,
+            "size": 0,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if response.status_code == 304:
+            return result
+
+        if response.status_code == 416:
+            # Teildatei ist bereits vollständig
+            pass
+        else:
+            response.raise_for_status()
+            # Ohne 206 liefert der Server die ganze Datei, also neu beginnen
+            mode = "ab" if offset and response.status_code == 206 else "wb"
+            written = offset if mode == "ab" else 0
+            report = _throttled(progress)
+            with open(tmp_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        written += len(chunk)
+                        report(written)
+
+    os.replace(tmp_path, dest_path)
+    result["size"] = os.path.getsize(dest_path)
+    return result
+
+
+def open_bulk_file(path: str) -> BinaryIO:
+    """Öffnet eine Bulk-Datei zum Lesen, gzip-komprimierte Dateien transparent"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+@dataclass
+class BulkFile:
+    """Eine lokal verfügbare Bulk-Datei"""
+    path: str
+    bulk_type: Optional[str] = None
+    updated_at: Optional[str] = None
+    download_uri: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: Optional[int] = None  # Unkomprimierte Größe in Bytes
+    from_cache: bool = False
+
+
+class BulkDataCache:
+    """
+    Festplatten-Cache für Scryfall Bulk-Dateien
+
+    Dateien werden gzip-komprimiert unter `<typ>-<updated_at>.json.gz` abgelegt,
+    daneben eine `.meta.json` mit ETag, Last-Modified und unkomprimierter Größe.
+    Ist die Datei zum aktuellen `updated_at` schon vorhanden, wird gar nicht
+    angefragt; sonst wird mit If-None-Match/If-Modified-Since der letzten
+    Version bedingt heruntergeladen.
+
+    Die Dateien können auch offline für erneute Importe und Benchmarks
+    verwendet werden (siehe `latest`).
+    """
+
+    def __init__(self, directory: str = BULK_DATA_DIR, keep: int = BULK_CACHE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def _key(self, bulk_type: str, updated_at: str) -> str:
+        return f"{bulk_type}-{re.sub(r'[^0-9A-Za-z]', '', updated_at or 'unknown')}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.meta.json")
+
+    def _load(self, key: str) -> Optional[BulkFile]:
+        path = self._path(key)
+        meta_path = self._meta_path(key)
+        if not os.path.exists(path) or not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        return BulkFile(path=path, from_cache=True, **meta)
+
+    def _store_meta(self, key: str, bulk_file: BulkFile) -> None:
+        meta = asdict(bulk_file)
+        del meta["path"], meta["from_cache"]
+        with open(self._meta_path(key), "w") as f:
+            json.dump(meta, f)
+
+    def describe(self, path: str) -> BulkFile:
+        """Beschreibt eine lokale Datei, mit Metadaten falls sie aus dem Cache stammt"""
+        if path.endswith(".json.gz"):
+            meta_path = f"{path[:-len('.json.gz')]}.meta.json"
+            if os.path.exists(meta_path):
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                return BulkFile(path=path, from_cache=True, **meta)
+        return BulkFile(path=path, from_cache=True)
+
+    def lookup(self, bulk_type: str, updated_at: str) -> Optional[BulkFile]:
+        """Gibt die gecachte Datei zu einem Stand zurück"""
+        return self._load(self._key(bulk_type, updated_at))
+
+    def entries(self, bulk_type: str) -> List[BulkFile]:
+        """Alle gecachten Dateien eines Typs, neueste zuerst"""
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(f"{bulk_type}-") and filename.endswith(".meta.json"):
+                bulk_file = self._load(filename[:-len(".meta.json")])
+                if bulk_file is not None:
+                    files.append(bulk_file)
+        return sorted(files, key=lambda f: f.updated_at or "", reverse=True)
+
+    def latest(self, bulk_type: str) -> Optional[BulkFile]:
+        """Neueste gecachte Datei eines Typs (z.B. für Offline-Importe)"""
+        files = self.entries(bulk_type)
+        return files[0] if files else None
+
+    def fetch(self, info: Dict[str, Any], progress: Optional[ProgressCallback] = None) -> BulkFile:
+        """
+        Liefert die Bulk-Datei zu einem Eintrag der /bulk-data Antwort
+
+        Args:
+            info: Eintrag mit "type", "updated_at" und "download_uri"
+            progress: Fortschritt beim Herunterladen und Komprimieren (siehe download_bulk_file)
+        """
+        bulk_type = info.get("type", "bulk")
+        updated_at = info.get("updated_at")
+        key = self._key(bulk_type, updated_at)
+
+        cached = self._load(key)
+        if cached is not None:
+            return cached
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Bedingte Anfrage gegen die zuletzt gespeicherte Version
+        previous = self.latest(bulk_type)
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        raw_path = os.path.join(self.directory, f"{key}.json")
+        result = download_bulk_file(info["download_uri"], raw_path, headers=headers, progress=progress)
+        if result["status"] == 304 and previous is None:
+            # 304 ohne bedingte Anfrage (z.B. von einem Proxy): einmal ohne Cache erneut anfragen
+            result = download_bulk_file(info["download_uri"], raw_path, headers={"Cache-Control": "no-cache"},
+                                        progress=progress)
+            if result["status"] == 304:
+                raise ValueError(f"Server meldet 304 für {info['download_uri']}, aber es gibt keine gecachte Bulk-Datei")
+
+        if result["status"] == 304:
+            # Inhalt unverändert: vorhandene Datei unter dem neuen Stand weiterverwenden
+            os.replace(previous.path, self._path(key))
+            os.remove(self._meta_path(self._key(bulk_type, previous.updated_at)))
+            bulk_file = BulkFile(
+                path=self._path(key), bulk_type=bulk_type, updated_at=updated_at,
+                download_uri=info["download_uri"], etag=previous.etag,
+                last_modified=previous.last_modified, size=previous.size, from_cache=True,
+            )
+            self._store_meta(key, bulk_file)
+            return bulk_file
+
+        # Komprimiert ablegen und die unkomprimierte Datei entfernen
+        tmp_gz = f"{self._path(key)}.part"
+        report = _throttled(progress)
+        compressed = 0
+        with open(raw_path, "rb") as src, gzip.open(tmp_gz, "wb", compresslevel=6) as dst:
+            for block in iter(lambda: src.read(DEFAULT_CHUNK_SIZE), b""):
+                dst.write(block)
+                compressed += len(block)
+                report(compressed)
+        os.replace(tmp_gz, self._path(key))
+        os.remove(raw_path)
+
+        bulk_file = BulkFile(
+            path=self._path(key), bulk_type=bulk_type, updated_at=updated_at,
+            download_uri=info["download_uri"], etag=result["etag"],
+            last_modified=result["last_modified"], size=result["size"],
+        )
+        self._store_meta(key, bulk_file)
+        return bulk_file
+
+    def prune(self, bulk_type: str) -> None:
+        """Behält nur die neuesten `keep` Dateien eines Typs"""
+        for bulk_file in self.entries(bulk_type)[self.keep:]:
+            os.remove(bulk_file.path)
+            os.remove(self._meta_path(self._key(bulk_type, bulk_file.updated_at)))
+
+
+class JsonArrayReader:
+    """
+    Liest ein JSON-Array inkrementell aus einer Binärdatei
+
+    Es wird immer nur ein Block plus das aktuell geparste Element im Speicher
+    gehalten, unabhängig von der Gesamtgröße der Datei.
+
+    Beispiel:
+        with open("default_cards.json", "rb") as f:
+            for card in JsonArrayReader(f):
+                ...
+    """
+
+    def __init__(self, fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        # Anzahl der bisher aus der Datei gelesenen Bytes
+        self.bytes_read = 0
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Liest den nächsten Block in den Puffer. Gibt False am Dateiende zurück."""
+        if self._eof:
+            return False
+        chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(b"", final=True)
+            self._pos = 0
+            return False
+        self.bytes_read += len(chunk)
+        # Bereits verarbeiteten Teil verwerfen, damit der Puffer nicht wächst
+        self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _next_token(self) -> Optional[str]:
+        """Überspringt Leerzeichen und gibt das nächste Zeichen zurück (ohne es zu verbrauchen)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def __iter__(self) -> Iterator[Any]:
+        # Öffnende Klammer des Arrays
+        token = self._next_token()
+        if token is None:
+            return
+        if token != "[":
+            raise ValueError("Bulk-Datei enthält kein JSON-Array")
+        self._pos += 1
+
+        token = self._next_token()
+        if token == "]":
+            return
+
+        while True:
+            if token is None:
+                raise ValueError("Unerwartetes Dateiende in der Bulk-Datei")
+
+            # Element dekodieren, bei unvollständigem Puffer nachladen
+            while True:
+                try:
+                    item, end = self._decoder.raw_decode(self._buffer, self._pos)
+                    break
+                except json.JSONDecodeError:
+                    if not self._fill():
+                        raise
+            self._pos = end
+            yield item
+
+            token = self._next_token()
+            if token == ",":
+                self._pos += 1
+                token = self._next_token()
+            elif token == "]":
+                return
+            else:
+                raise ValueError("Ungültiges Trennzeichen in der Bulk-Datei")
+
+
+def iter_bulk_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Gibt die Einträge einer heruntergeladenen Bulk-Datei einzeln zurück
+    """
+    with open_bulk_file(path) as f:
+        yield from JsonArrayReader(f, chunk_size=chunk_size)
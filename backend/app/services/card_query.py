@@ -0,0 +1,345 @@
+"""
+Suchsprache für Karten nach dem Vorbild von Scryfall
+
+Beispiel: `t:creature c:rg cmc>=3 r:rare o:"draw a card" s:neo`
+
+Unterstützt:
+- Wörter ohne Feld suchen im Namen (Wortanfang), `name:` explizit
+- `t:`/`type:` Typzeile, `o:`/`oracle:` Regeltext (Phrasen in Anführungszeichen)
+- `c:`/`color:` Farben (w, u, b, r, g, c = farblos, m = mehrfarbig, auch ausgeschrieben)
+- `cmc`/`mv` und `r:`/`rarity:` mit Vergleichen (`:`, `=`, `!=`, `<`, `<=`, `>`, `>=`)
+- `s:`/`set:`/`e:` Set-Code
+- `-` negiert, `or` verknüpft Alternativen, Klammern gruppieren
+
+Die Anfrage wird einmal geparst und zu einer einzigen WHERE-Bedingung
+übersetzt; beides wird je normalisierter Anfrage zwischengespeichert.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import and_, exists, func, not_, or_, select, true
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, card_colors
+from app.services.search import TextTerm, has_fts, text_condition
+
+# Anzahl zwischengespeicherter Anfragen
+QUERY_CACHE_SIZE = 1024
+
+COLOR_CODES = "wubrg"
+COLOR_NAMES = {
+    "white": "w", "blue": "u", "black": "b", "red": "r", "green": "g",
+}
+RARITIES = ["common", "uncommon", "rare", "mythic"]
+RARITY_ALIASES = {"c": "common", "u": "uncommon", "r": "rare", "m": "mythic"}
+
+FIELD_ALIASES = {
+    "name": "name", "n": "name",
+    "t": "type", "type": "type",
+    "o": "oracle", "oracle": "oracle",
+    "c": "color", "color": "color", "colors": "color",
+    "cmc": "cmc", "mv": "cmc", "manavalue": "cmc",
+    "r": "rarity", "rarity": "rarity",
+    "s": "set", "set": "set", "e": "set", "edition": "set",
+}
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<neg>-)(?=[^\s)])
+      | (?P<term>(?:(?P<key>[a-z]+)(?P<op>>=|<=|!=|:|=|<|>))?(?:"(?P<quoted>[^"]*)"|(?P<word>[^\s()"]+)))
+    )
+''', re.VERBOSE)
+
+
+class QuerySyntaxError(ValueError):
+    """Ungültige Suchanfrage"""
+
+
+@dataclass(frozen=True)
+class Term:
+    field: str
+    op: str
+    value: str
+    quoted: bool = False
+
+
+@dataclass(frozen=True)
+class Not:
+    child: "Node"
+
+
+@dataclass(frozen=True)
+class And:
+    children: Tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    children: Tuple["Node", ...]
+
+
+Node = Union[Term, Not, And, Or]
+
+
+def normalize_query(query: str) -> str:
+    """Schlüssel für den Cache: Kleinschreibung, einfache Leerzeichen"""
+    return " ".join(query.lower().split())
+
+
+def _tokenize(query: str) -> List[Tuple[str, Optional[Term]]]:
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _TOKEN_RE.match(query, position)
+        if match is None or match.end() == position:
+            raise QuerySyntaxError(f"Unerwartetes Zeichen an Position {position + 1}")
+        position = match.end()
+        if match.group("lparen"):
+            tokens.append(("(", None))
+        elif match.group("rparen"):
+            tokens.append((")", None))
+        elif match.group("neg"):
+            tokens.append(("-", None))
+        else:
+            quoted = match.group("quoted") is not None
+            value = match.group("quoted") if quoted else match.group("word")
+            key = match.group("key")
+            if key is None:
+                if not quoted and value == "or":
+                    tokens.append(("or", None))
+                    continue
+                tokens.append(("term", Term("name", ":", value, quoted)))
+                continue
+            field = FIELD_ALIASES.get(key)
+            if field is None:
+                raise QuerySyntaxError(f"Unbekanntes Suchfeld: {key}")
+            tokens.append(("term", Term(field, match.group("op"), value, quoted)))
+    return tokens
+
+
+class _Parser:
+    """Rekursiver Abstieg: or_expr := and_expr ("or" and_expr)*, and_expr := unary+"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def parse(self) -> Node:
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise QuerySyntaxError("Schließende Klammer ohne öffnende Klammer")
+        return node
+
+    def or_expr(self) -> Node:
+        children = [self.and_expr()]
+        while self.peek() == "or":
+            self.position += 1
+            children.append(self.and_expr())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def and_expr(self) -> Node:
+        children = []
+        while self.peek() not in (None, ")", "or"):
+            children.append(self.unary())
+        if not children:
+            raise QuerySyntaxError("Leerer Ausdruck")
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def unary(self) -> Node:
+        kind, term = self.tokens[self.position]
+        self.position += 1
+        if kind == "-":
+            if self.peek() in (None, ")", "or"):
+                raise QuerySyntaxError("Negation ohne Ausdruck")
+            return Not(self.unary())
+        if kind == "(":
+            node = self.or_expr()
+            if self.peek() != ")":
+                raise QuerySyntaxError("Fehlende schließende Klammer")
+            self.position += 1
+            return node
+        return term
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def parse_query(query: str) -> Optional[Node]:
+    """
+    Parst eine (normalisierte) Anfrage zu einem Syntaxbaum
+
+    Returns:
+        Wurzelknoten oder None bei leerer Anfrage
+
+    Raises:
+        QuerySyntaxError: Bei ungültiger Anfrage
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return None
+    return _Parser(tokens).parse()
+
+
+def _compare(column, op: str, value):
+    if op in (":", "="):
+        return column == value
+    if op == "!=":
+        return column != value
+    if op == "<":
+        return column < value
+    if op == "<=":
+        return column <= value
+    if op == ">":
+        return column > value
+    return column >= value
+
+
+def _has_color(code: str):
+    return exists().where(card_colors.c.card_id == Card.id, card_colors.c.color_code == code.upper())
+
+
+def _has_other_colors(codes: str):
+    return exists().where(
+        card_colors.c.card_id == Card.id,
+        card_colors.c.color_code.notin_([code.upper() for code in codes]),
+    )
+
+
+def _color_count():
+    return select(func.count()).where(card_colors.c.card_id == Card.id).scalar_subquery()
+
+
+def _compile_color(term: Term):
+    value = COLOR_NAMES.get(term.value, term.value)
+    if value in ("c", "colorless", "m", "multicolor"):
+        if term.op not in (":", "=", "!="):
+            raise QuerySyntaxError(f"Operator {term.op} ist für {term.value} nicht möglich")
+        if value in ("c", "colorless"):
+            condition = not_(exists().where(card_colors.c.card_id == Card.id))
+        else:
+            condition = _color_count() >= 2
+        return not_(condition) if term.op == "!=" else condition
+    if not value or any(code not in COLOR_CODES for code in value):
+        raise QuerySyntaxError(f"Unbekannte Farbe: {term.value}")
+
+    codes = "".join(sorted(set(value), key=COLOR_CODES.index))
+    includes_all = and_(*(_has_color(code) for code in codes))
+    within = not_(_has_other_colors(codes))
+
+    # Wie bei Scryfall bedeutet "c:rg" mindestens Rot und Grün
+    if term.op in (":", ">="):
+        return includes_all
+    if term.op == "=":
+        return and_(includes_all, within)
+    if term.op == "!=":
+        return not_(and_(includes_all, within))
+    if term.op == "<=":
+        return within
+    if term.op == "<":
+        return and_(within, not_(includes_all))
+    return and_(includes_all, _has_other_colors(codes))
+
+
+def color_condition(colors: str, op: str = ":"):
+    """
+    Farbbedingung wie `c<op><colors>`, z.B. color_condition("rg", "=") für genau Rot-Grün
+
+    Raises:
+        QuerySyntaxError: Bei unbekannten Farben oder Operatoren
+    """
+    return _compile_color(Term("color", op, colors.lower()))
+
+
+def _compile_term(term: Term, use_fts: bool):
+    if term.field in ("name", "type", "oracle"):
+        if term.op != ":":
+            raise QuerySyntaxError(f"Operator {term.op} ist für {term.field} nicht möglich")
+        field = "text" if term.field == "oracle" else term.field
+        condition = text_condition([TextTerm(field, term.value, term.quoted)], use_fts)
+        # Eingaben ohne Wortzeichen (z.B. "!!") schränken nicht ein
+        return condition if condition is not None else true()
+
+    if term.field == "color":
+        return _compile_color(term)
+
+    if term.field == "cmc":
+        try:
+            value = float(term.value)
+        except ValueError:
+            raise QuerySyntaxError(f"Manawert muss eine Zahl sein: {term.value}")
+        return _compare(Card.cmc, term.op, value)
+
+    if term.field == "rarity":
+        value = RARITY_ALIASES.get(term.value, term.value)
+        if value not in RARITIES:
+            raise QuerySyntaxError(f"Unbekannte Seltenheit: {term.value}")
+        # Bulk-Sync speichert Kleinbuchstaben, der Set-Import (map_card_data) großgeschrieben
+        stored = func.lower(Card.rarity)
+        if term.op in (":", "="):
+            return stored == value
+        if term.op == "!=":
+            return stored != value
+        rank = RARITIES.index(value)
+        selected = [rarity for index, rarity in enumerate(RARITIES) if _compare(index, term.op, rank)]
+        return stored.in_(selected)
+
+    # Set-Code
+    if term.op not in (":", "=", "!="):
+        raise QuerySyntaxError(f"Operator {term.op} ist für set nicht möglich")
+    return _compare(Card.set_code, term.op, term.value)
+
+
+def _compile(node: Node, use_fts: bool):
+    if isinstance(node, Term):
+        return _compile_term(node, use_fts)
+    if isinstance(node, Not):
+        return not_(_compile(node.child, use_fts))
+    if isinstance(node, Or):
+        return or_(*(_compile(child, use_fts) for child in node.children))
+
+    # Positive Textbegriffe zu einer einzigen Indexabfrage zusammenfassen
+    text_terms = []
+    others = []
+    for child in node.children:
+        if isinstance(child, Term) and child.field in ("name", "type", "oracle") and child.op == ":":
+            field = "text" if child.field == "oracle" else child.field
+            text_terms.append(TextTerm(field, child.value, child.quoted))
+        else:
+            others.append(child)
+
+    conditions = [_compile(child, use_fts) for child in others]
+    text = text_condition(text_terms, use_fts)
+    if text is not None:
+        conditions.insert(0, text)
+    return and_(*conditions) if conditions else true()
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query: str, use_fts: bool):
+    """
+    Übersetzt eine normalisierte Anfrage in eine WHERE-Bedingung auf `cards`
+
+    Raises:
+        QuerySyntaxError: Bei ungültiger Anfrage
+    """
+    node = parse_query(query)
+    if node is None:
+        return None
+    return _compile(node, use_fts)
+
+
+def query_filter(db: Session, query: str):
+    """Bedingung für eine Suchanfrage (None bei leerer Anfrage)"""
+    return compile_query(normalize_query(query), has_fts(db))
+
+
+def cache_info():
+    """Trefferstatistik der Caches für Parser und Übersetzung"""
+    return {"parse": parse_query.cache_info()._asdict(), "compile": compile_query.cache_info()._asdict()}
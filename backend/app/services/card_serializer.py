@@ -0,0 +1,211 @@
+"""
+Schnelle Serialisierung von Karten, Sets und Deck-Karten
+
+Der Standardweg (ORM-Objekte -> Pydantic mit orm_mode -> JSON) lädt `set` und
+`colors` je Karte einzeln nach und validiert jedes Feld erneut. Hier werden
+die Spalten direkt als Tupel gelesen (ohne Identity Map), zu einfachen Dicts
+mit demselben Aufbau wie die Schemas zusammengesetzt und mit orjson kodiert.
+
+Die fertigen JSON-Bytes jeder Karte werden nach ID zwischengespeichert
+(CARD_PAYLOAD_CACHE_SIZE, 0 schaltet den Cache ab) und nach jedem Sync
+verworfen. Listen entstehen durch Verketten der gespeicherten Bytes.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.bulk import IN_CHUNK_SIZE
+from app.models.models import Card, Color, Deck, DeckCard, Set, card_colors
+from app.services.catalog_events import on_catalog_changed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    orjson = None
+
+CARD_PAYLOAD_CACHE_SIZE = int(os.getenv("CARD_PAYLOAD_CACHE_SIZE", "20000"))
+
+# Spalten in der Reihenfolge der Schemas (CardBase, SetBase)
+CARD_COLUMNS = (
+    Card.id, Card.name, Card.mana_cost, Card.cmc, Card.type, Card.rarity, Card.text,
+    Card.set_code, Card.set_name, Card.image_url, Card.image_url_small,
+)
+SET_COLUMNS = (Set.code, Set.name, Set.release_date, Set.set_type, Set.card_count, Set.icon_url)
+DECK_COLUMNS = (Deck.name, Deck.description, Deck.format, Deck.id, Deck.created_at, Deck.updated_at)
+DECK_CARD_COLUMNS = (DeckCard.card_id, DeckCard.quantity, DeckCard.is_sideboard, DeckCard.id, DeckCard.deck_id)
+
+CARD_FIELDS = tuple(column.key for column in CARD_COLUMNS)
+SET_FIELDS = tuple(column.key for column in SET_COLUMNS)
+DECK_FIELDS = tuple(column.key for column in DECK_COLUMNS)
+DECK_CARD_FIELDS = tuple(column.key for column in DECK_CARD_COLUMNS)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Typ {type(value).__name__} ist nicht serialisierbar")
+
+
+def dumps(value: Any) -> bytes:
+    """JSON-Bytes wie bei FastAPI (UTF-8, ohne Leerzeichen); orjson, sofern installiert"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def join_json(items: Iterable[bytes]) -> bytes:
+    """Verkettet bereits kodierte Elemente zu einer JSON-Liste"""
+    return b"[" + b",".join(items) + b"]"
+
+
+def set_payload(row: Sequence[Any]) -> Dict[str, Any]:
+    return dict(zip(SET_FIELDS, row))
+
+
+def encode_sets(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Kodiert Zeilen aus `select(*SET_COLUMNS)` als Liste von Sets"""
+    return dumps([set_payload(row) for row in rows])
+
+
+class CardPayloadCache:
+    """Threadsicherer LRU-Cache für die JSON-Bytes einzelner Karten"""
+
+    def __init__(self, max_entries: int = CARD_PAYLOAD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, bytes]:
+        found = {}
+        with self._lock:
+            for card_id in ids:
+                payload = self._entries.get(card_id)
+                if payload is not None:
+                    self._entries.move_to_end(card_id)
+                    found[card_id] = payload
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def set_many(self, payloads: Dict[str, bytes]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for card_id, payload in payloads.items():
+                self._entries[card_id] = payload
+                self._entries.move_to_end(card_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(payload) for payload in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+card_payload_cache = CardPayloadCache()
+
+
+@on_catalog_changed
+def clear_card_payload_cache(db: Session) -> None:
+    """Verwirft die kodierten Karten nach einem Sync"""
+    card_payload_cache.clear()
+
+
+def _load_card_payloads(db: Session, ids: Sequence[str]) -> Dict[str, bytes]:
+    """Liest Karten samt Set und Farben in je einer Abfrage pro Block und kodiert sie"""
+    payloads = {}
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[start:start + IN_CHUNK_SIZE]
+        colors: Dict[str, List[Dict[str, str]]] = {card_id: [] for card_id in chunk}
+        color_rows = db.execute(
+            select(card_colors.c.card_id, Color.code, Color.name)
+            .join(Color, Color.code == card_colors.c.color_code)
+            .where(card_colors.c.card_id.in_(chunk))
+            .order_by(card_colors.c.card_id, Color.code)
+        )
+        for card_id, code, name in color_rows:
+            colors[card_id].append({"code": code, "name": name})
+
+        rows = db.execute(
+            select(*CARD_COLUMNS, *SET_COLUMNS)
+            .outerjoin(Set, Set.code == Card.set_code)
+            .where(Card.id.in_(chunk))
+        )
+        card_width = len(CARD_COLUMNS)
+        for row in rows:
+            card = dict(zip(CARD_FIELDS, row[:card_width]))
+            card["set"] = set_payload(row[card_width:]) if row[card_width] is not None else None
+            card["colors"] = colors[card["id"]]
+            payloads[card["id"]] = dumps(card)
+    return payloads
+
+
+def card_payloads(db: Session, ids: Sequence[str]) -> Dict[str, bytes]:
+    """
+    JSON-Bytes je Karten-ID (wie Schema `Card`), fehlende IDs sind nicht enthalten
+
+    Bereits kodierte Karten kommen aus dem Cache, nur die übrigen werden gelesen.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    payloads = card_payload_cache.get_many(unique_ids)
+    missing = [card_id for card_id in unique_ids if card_id not in payloads]
+    if missing:
+        loaded = _load_card_payloads(db, missing)
+        card_payload_cache.set_many(loaded)
+        payloads.update(loaded)
+    return payloads
+
+
+def encode_cards(db: Session, ids: Sequence[str]) -> bytes:
+    """Kodiert Karten als JSON-Liste in der Reihenfolge von `ids`"""
+    payloads = card_payloads(db, ids)
+    return join_json(payloads[card_id] for card_id in ids if card_id in payloads)
+
+
+def encode_card(db: Session, card_id: str) -> Optional[bytes]:
+    """Kodiert eine einzelne Karte oder gibt None zurück, wenn es sie nicht gibt"""
+    return card_payloads(db, [card_id]).get(card_id)
+
+
+def encode_deck(db: Session, deck_id: int) -> Optional[bytes]:
+    """
+    Kodiert ein Deck samt Deck-Karten (wie Schema `DeckWithCards`)
+
+    Deck, Deck-Karten und die Karten werden mit einer festen Anzahl von
+    Abfragen gelesen, unabhängig von der Größe des Decks.
+    """
+    deck_row = db.execute(select(*DECK_COLUMNS).where(Deck.id == deck_id)).first()
+    if deck_row is None:
+        return None
+    deck_cards = db.execute(
+        select(*DECK_CARD_COLUMNS).where(DeckCard.deck_id == deck_id).order_by(DeckCard.id)
+    ).all()
+    payloads = card_payloads(db, [row.card_id for row in deck_cards])
+
+    # Deck-Felder kodieren und die fertigen Karten-Bytes einsetzen
+    entries = []
+    for row in deck_cards:
+        entry = dumps(dict(zip(DECK_CARD_FIELDS, row)))
+        card = payloads.get(row.card_id, b"null")
+        entries.append(entry[:-1] + b',"card":' + card + b"}")
+    deck = dumps(dict(zip(DECK_FIELDS, deck_row)))
+    return deck[:-1] + b',"deck_cards":' + join_json(entries) + b"}"
@@ -0,0 +1,124 @@
+"""
+Benachrichtigung über Änderungen am Kartenkatalog
+
+Prozessinterne Caches und Indizes (z.B. Autovervollständigung) registrieren
+sich hier und werden nach jedem abgeschlossenen oder abgebrochenen Sync
+aktualisiert.
+
+Die Katalog-Generation ist der Zeitpunkt (Mikrosekunden) der letzten Änderung
+eines Sync-Laufs, der den aktiven Katalog geändert hat: abgeschlossene Läufe
+sowie abgebrochene Läufe, die direkt in den Katalog geschrieben haben (ohne
+Blue/Green-Kopie), jeweils nur mit neuen, geänderten oder entfernten Karten.
+Übersprungene Läufe und Läufe ohne Änderungen lassen Caches damit gültig. Ein
+fortgesetzter Lauf behält seine ID, ändert die Generation aber beim Abschluss
+erneut. Sie liegt in der Datenbank und ist
+damit für alle Worker gleich. Jeder
+Prozess prüft sie höchstens alle CATALOG_CHECK_INTERVAL Sekunden; ändert sie
+sich durch einen Sync in einem anderen Prozess (z.B. per CLI), werden die
+Listener auch dort aufgerufen.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.models import SyncRun
+
+logger = logging.getLogger(__name__)
+
+# Abstand zwischen zwei Prüfungen der Generation in der Datenbank (Sekunden)
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "5"))
+
+CatalogListener = Callable[[Session], None]
+
+_listeners: List[CatalogListener] = []
+
+
+def on_catalog_changed(listener: CatalogListener) -> CatalogListener:
+    """Registriert eine Funktion, die nach Katalogänderungen aufgerufen wird (auch als Dekorator)"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def load_generation(db: Session) -> int:
+    """Liest die Generation (letzte Katalogänderung eines Sync-Laufs in Mikrosekunden, 0 ohne Sync)"""
+    changed_cards = (
+        func.coalesce(SyncRun.cards_added, 0) + func.coalesce(SyncRun.cards_updated, 0)
+        + func.coalesce(SyncRun.cards_removed, 0)
+    )
+    last_change = db.execute(
+        select(func.max(SyncRun.updated_at)).where(
+            or_(
+                SyncRun.status == "completed",
+                and_(SyncRun.status == "failed", SyncRun.catalog_file.is_(None)),
+            ),
+            changed_cards > 0,
+        )
+    ).scalar()
+    if last_change is None:
+        return 0
+    return (last_change - _EPOCH) // timedelta(microseconds=1)
+
+
+class CatalogGeneration:
+    """Zwischengespeicherte Generation des Katalogs in diesem Prozess"""
+
+    def __init__(self, check_interval: float = CATALOG_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.value: Optional[int] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: int) -> None:
+        self.value = value
+        self.checked_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self.value is None or time.monotonic() - self.checked_at >= self.check_interval
+
+    def refresh(self, session_factory: Callable[[], Session]) -> int:
+        """
+        Prüft die Generation in der Datenbank, sofern das Intervall abgelaufen ist
+
+        Hat ein anderer Prozess den Katalog geändert, werden die Listener aufgerufen.
+        """
+        if not self.is_stale():
+            return self.value
+        with self._lock:
+            if not self.is_stale():
+                return self.value
+            with session_factory() as db:
+                value = load_generation(db)
+                previous = self.value
+                self.set(value)
+                if previous is not None and value != previous:
+                    logger.info(f"Katalog wurde extern geändert (Generation {previous} -> {value})")
+                    notify_catalog_changed(db)
+        return self.value
+
+
+catalog_generation = CatalogGeneration()
+
+
+def notify_catalog_changed(db: Session) -> None:
+    """
+    Übernimmt die neue Generation und ruft alle registrierten Funktionen auf
+
+    Fehler einzelner Listener werden protokolliert und brechen den Sync nicht ab.
+    """
+    catalog_generation.set(load_generation(db))
+    for listener in list(_listeners):
+        try:
+            listener(db)
+        except Exception as e:
+            logger.error(f"Fehler beim Aktualisieren nach Katalogänderung ({listener.__name__}): {str(e)}")
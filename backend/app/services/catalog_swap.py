@@ -0,0 +1,240 @@
+"""
+Blue/Green-Austausch des Katalogs nach einem Sync (CATALOG_BLUE_GREEN=true)
+
+Ein Sync schreibt nicht in die Katalogdatei, die die API liest, sondern in
+eine Kopie davon (`catalog-<lauf>-<zeit>.db`). Erst wenn Import und Suchindex
+fertig sind, wird die Zeigerdatei umgestellt (siehe app.db.catalog_attach).
+Bis dahin sehen Leser den vollständigen alten Stand und teilen sich keine
+Sperren mit dem Import. Ältere Katalogdateien werden danach bis auf
+CATALOG_KEEP_FILES aufgeräumt.
+
+Ohne Blue/Green (pointer None) verhält sich `upgrade_database` wie bisher.
+"""
+
+import glob
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import Table, create_engine
+from sqlalchemy.engine import Connection, Engine, URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.db.catalog_attach import CATALOG_TABLES, CatalogPointer, attach_catalog
+from app.db.database import Base, catalog_pragmas, configure_sqlite
+from app.db.migrations import upgrade_schema
+from app.models.models import SyncRun
+from app.services.search import FTS_TABLE, ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+# Anzahl aufbewahrter Katalogdateien (aktive und vorherige)
+CATALOG_KEEP_FILES = int(os.getenv("CATALOG_KEEP_FILES", "2"))
+
+# Wartezeit anderer Prozesse, während einer die Katalogtabellen übernimmt (Millisekunden)
+CATALOG_MOVE_TIMEOUT = int(os.getenv("CATALOG_MOVE_TIMEOUT", "600000"))
+
+
+def catalog_tables() -> List[Table]:
+    import app.models.models  # noqa: F401
+    return [Base.metadata.tables[name] for name in CATALOG_TABLES]
+
+
+def main_tables() -> List[Table]:
+    import app.models.models  # noqa: F401
+    return [table for table in Base.metadata.sorted_tables if table.name not in CATALOG_TABLES]
+
+
+def new_catalog_name(tag) -> str:
+    return f"catalog-{tag}-{datetime.utcnow():%Y%m%d%H%M%S%f}.db"
+
+
+def _file_engine(path: str) -> Engine:
+    """Engine direkt auf eine Katalogdatei (ohne Pool, Journal-Modus bleibt unverändert)"""
+    return configure_sqlite(create_engine(f"sqlite:///{path}", poolclass=NullPool), tuned=False)
+
+
+def _table_names(conn: Connection, schema: str = "main") -> Set[str]:
+    return {row[0] for row in conn.exec_driver_sql(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+
+
+def upgrade_catalog_file(path: str) -> None:
+    """Schema und Suchindex einer Katalogdatei aktualisieren (Index wird bei Abweichung neu aufgebaut)"""
+    engine = _file_engine(path)
+    try:
+        upgrade_schema(engine, tables=catalog_tables())
+        ensure_search_index(engine)
+    finally:
+        engine.dispose()
+
+
+def copy_catalog(source: str, target: str) -> None:
+    """Konsistente Kopie per Backup-API, auch während andere Verbindungen lesen"""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+def _move_main_catalog(engine: Engine, pointer: CatalogPointer) -> str:
+    """Legt eine Katalogdatei an und übernimmt vorhandene Katalogtabellen der Hauptdatenbank"""
+    path = pointer.catalog_path(new_catalog_name("initial"))
+    catalog_engine = _file_engine(path)
+    try:
+        upgrade_schema(catalog_engine, tables=catalog_tables())
+        with catalog_engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS legacy", (os.path.abspath(engine.url.database),))
+            legacy_tables = _table_names(conn, "legacy")
+            for table in catalog_tables():
+                if table.name not in legacy_tables:
+                    continue
+                legacy_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA legacy.table_info({table.name})")}
+                columns = ", ".join(column.name for column in table.columns if column.name in legacy_columns)
+                conn.exec_driver_sql(
+                    f"INSERT INTO main.{table.name} ({columns}) SELECT {columns} FROM legacy.{table.name}"
+                )
+            conn.commit()
+            conn.exec_driver_sql("DETACH DATABASE legacy")
+    finally:
+        catalog_engine.dispose()
+    return path
+
+
+def upgrade_database(engine: Engine, pointer: Optional[CatalogPointer] = None) -> None:
+    """
+    Legt fehlende Tabellen, Spalten und den Suchindex an
+
+    Im Blue/Green-Betrieb getrennt für Hauptdatenbank und aktive Katalogdatei.
+    Liegen (noch) Katalogtabellen in der Hauptdatenbank, etwa beim ersten
+    Start mit CATALOG_BLUE_GREEN=true, werden sie in eine neue Katalogdatei
+    übernommen und aus der Hauptdatenbank entfernt, da sie den eingebundenen
+    Katalog sonst verdecken würden. Starten mehrere Worker gleichzeitig,
+    übernimmt nur einer; die anderen warten auf die Schreibsperre der
+    Hauptdatenbank und finden danach den veröffentlichten Katalog vor.
+    Auch die Aktualisierung der Katalogdatei läuft unter dieser Sperre.
+    """
+    if pointer is None:
+        upgrade_schema(engine)
+        ensure_search_index(engine)
+        return
+
+    upgrade_schema(engine, tables=main_tables())
+    with engine.connect() as conn:
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {CATALOG_MOVE_TIMEOUT}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            # Erst unter der Sperre prüfen, ein anderer Prozess kann schon übernommen haben
+            legacy = _table_names(conn) & {*CATALOG_TABLES, FTS_TABLE}
+            current = pointer.current()
+            if legacy or current is None or not os.path.exists(current):
+                if legacy:
+                    logger.info(
+                        f"Übernehme Katalogtabellen der Hauptdatenbank in eine Katalogdatei ({', '.join(sorted(legacy))})"
+                    )
+                pointer.publish(_move_main_catalog(engine, pointer))
+            for name in (FTS_TABLE, "card_colors", "cards", "sets", "colors"):
+                if name in legacy:
+                    conn.exec_driver_sql(f"DROP TABLE main.{name}")
+            # Schema und Suchindex des Katalogs ebenfalls nur in einem Prozess gleichzeitig
+            upgrade_catalog_file(pointer.current())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+
+
+def prune_catalogs(pointer: CatalogPointer, keep: int = CATALOG_KEEP_FILES, abandoned: Iterable[str] = ()) -> List[str]:
+    """
+    Löscht ältere Katalogdateien; die aktive und die `keep - 1` neuesten übrigen bleiben
+
+    `abandoned` sind Kopien nicht abgeschlossener Läufe: Sie werden immer gelöscht
+    und zählen nicht zu den aufbewahrten Dateien, damit eine halb gebaute Kopie
+    nicht den letzten vollständigen Katalog verdrängt.
+    """
+    current = pointer.current()
+    abandoned = {path for path in abandoned if path != current}
+    files = sorted(glob.glob(pointer.catalog_path("catalog-*.db")), key=os.path.getmtime, reverse=True)
+    others = [path for path in files if path != current and path not in abandoned]
+    removed = []
+    for path in [*(path for path in files if path in abandoned), *others[max(keep - 1, 0):]]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            # z.B. unter Windows, solange eine Verbindung die Datei noch eingebunden hat
+            logger.warning(f"Katalogdatei {path} konnte nicht gelöscht werden: {str(e)}")
+    return removed
+
+
+class CatalogBuild:
+    """
+    Katalogkopie eines Sync-Laufs samt eigener Schreibverbindung
+
+    Bis `start` bindet die Verbindung den aktiven Katalog ein, danach die Kopie
+    (wirksam ab der nächsten Transaktion der Session).
+    """
+
+    def __init__(self, url: URL, pointer: CatalogPointer):
+        self.pointer = pointer
+        self.path: Optional[str] = None
+        self.engine = configure_sqlite(create_engine(url, pool_size=1, max_overflow=0))
+        attach_catalog(self.engine, self._resolve, catalog_pragmas())
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    def _resolve(self) -> Optional[str]:
+        return self.path or self.pointer.current()
+
+    def session(self) -> Session:
+        return self.session_factory()
+
+    def start(self, sync_run) -> bool:
+        """
+        Wählt die Katalogkopie des Laufs; ein fortgesetzter Lauf schreibt in seine bisherige Kopie
+
+        Returns:
+            True, wenn eine neue Kopie des aktiven Katalogs angelegt wurde
+            (ein vorhandener Checkpoint des Laufs gilt dann nicht mehr)
+        """
+        live = self.pointer.current()
+        path = self.pointer.catalog_path(sync_run.catalog_file) if sync_run.catalog_file else None
+        created = path is None or path == live or not os.path.exists(path)
+        if created:
+            path = self.pointer.catalog_path(new_catalog_name(f"run{sync_run.id}"))
+            logger.info(f"Kopiere aktiven Katalog nach {os.path.basename(path)}")
+            copy_catalog(live, path)
+            sync_run.catalog_file = os.path.basename(path)
+        else:
+            logger.info(f"Setze Aufbau von {sync_run.catalog_file} fort")
+        upgrade_catalog_file(path)
+        self.path = path
+        return created
+
+    def publish(self, db: Session, sync_run) -> None:
+        """
+        Suchindex prüfen und die Kopie zum aktiven Katalog machen
+
+        Kopien anderer, nicht abgeschlossener Läufe werden danach gelöscht; fortgesetzt
+        wird immer nur der letzte Lauf, sie werden also nicht mehr gebraucht.
+        """
+        upgrade_catalog_file(self.path)
+        self.pointer.publish(self.path)
+        logger.info(f"Katalog {os.path.basename(self.path)} ist aktiv")
+        abandoned = [
+            self.pointer.catalog_path(name) for (name,) in db.query(SyncRun.catalog_file).filter(
+                SyncRun.catalog_file.isnot(None), SyncRun.status != "completed", SyncRun.id != sync_run.id
+            )
+        ]
+        for path in prune_catalogs(self.pointer, abandoned=abandoned):
+            logger.info(f"Alte Katalogdatei {os.path.basename(path)} gelöscht")
+
+    def dispose(self) -> None:
+        self.engine.dispose()
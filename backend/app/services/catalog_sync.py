@@ -0,0 +1,146 @@
+"""
+Inkrementelle Katalog-Synchronisierung
+
+Für jede Karte wird ein Fingerabdruck der gemappten Felder plus Farben
+gespeichert. Beim nächsten Sync werden nur neue und geänderte Karten
+geschrieben; Karten, die upstream verschwunden sind, werden gelöscht.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.bulk import IN_CHUNK_SIZE, replace_card_colors, upsert_cards
+from app.models.models import Card, DeckCard, card_colors
+from app.services.search import remove_from_search_index, update_search_index
+
+# Maximale Anzahl gespeicherter IDs je Änderungsart im Sync-Protokoll
+MAX_CHANGE_IDS = 5000
+
+
+def card_fingerprint(card_info: Dict[str, Any], color_codes: Sequence[str]) -> str:
+    """Berechnet den Fingerabdruck einer gemappten Karte inkl. Farben"""
+    payload = {key: value for key, value in card_info.items() if key != "content_hash"}
+    payload["colors"] = sorted(set(color_codes))
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class CardChangeTracker:
+    """
+    Vergleicht importierte Karten mit dem Datenbankstand
+
+    Beim Erzeugen werden einmalig alle vorhandenen Fingerabdrücke geladen.
+    `write_batch` schreibt anschließend nur neue und geänderte Karten.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.known_hashes: Dict[str, str] = dict(db.execute(select(Card.id, Card.content_hash)).all())
+        # In diesem Lauf bereits verarbeitete Karten (Fingerabdruck) und davon gezählte Änderungen,
+        # damit doppelte Einträge über Batches hinweg mit ihrer ersten Kopie verglichen werden
+        self.seen: Dict[str, str] = {}
+        self.changed: Set[str] = set()
+        # Zähler und (auf MAX_CHANGE_IDS begrenzte) ID-Listen je Änderungsart
+        self.counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        self.ids: Dict[str, List[str]] = {"added": [], "updated": [], "removed": []}
+
+    def _record(self, kind: str, card_ids: Sequence[str]) -> None:
+        self.counts[kind] += len(card_ids)
+        free = MAX_CHANGE_IDS - len(self.ids[kind])
+        if free > 0:
+            self.ids[kind].extend(card_ids[:free])
+
+    def restore(self, summary: Dict[str, Any]) -> None:
+        """Übernimmt den Stand eines unterbrochenen Laufs (siehe summary)"""
+        for kind in self.counts:
+            self.counts[kind] = summary.get(kind, 0)
+        for kind, card_ids in summary.get("ids", {}).items():
+            self.ids[kind] = list(card_ids)[:MAX_CHANGE_IDS]
+
+    def mark_seen(self, card_id: str) -> None:
+        """Markiert eine bereits importierte Karte als vorhanden (z.B. beim Fortsetzen)"""
+        fingerprint = self.known_hashes.pop(card_id, None)
+        if fingerprint is not None:
+            self.seen[card_id] = fingerprint
+
+    def write_batch(self, batch: Iterable[Tuple[Dict[str, Any], Sequence[str]]]) -> int:
+        """
+        Schreibt geänderte Karten eines Batches (ohne Commit)
+
+        Args:
+            batch: Paare aus gemappter Karte und Farbcodes
+
+        Returns:
+            Anzahl der geschriebenen Karten
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        colors_by_card: Dict[str, List[str]] = {}
+        for card_info, color_codes in batch:
+            card_id = card_info["id"]
+            fingerprint = card_fingerprint(card_info, color_codes)
+            # pop: übrig bleibende IDs sind am Ende die entfernten Karten
+            previous = self.seen.get(card_id)
+            if previous is None:
+                previous = self.known_hashes.pop(card_id, None)
+            self.seen[card_id] = fingerprint
+
+            if previous == fingerprint:
+                self.counts["unchanged"] += 1
+                continue
+
+            # Doppelte Einträge: letzter gewinnt, jede Karte nur einmal als Änderung zählen
+            if card_id not in self.changed:
+                self.changed.add(card_id)
+                self._record("added" if previous is None else "updated", [card_id])
+
+            rows[card_id] = {**card_info, "content_hash": fingerprint}
+            colors_by_card[card_id] = list(color_codes)
+
+        if rows:
+            upsert_cards(self.db, list(rows.values()))
+            replace_card_colors(self.db, colors_by_card)
+            update_search_index(self.db, list(rows))
+        return len(rows)
+
+    def remove_missing(self) -> List[str]:
+        """
+        Löscht Karten, die im Import nicht mehr vorkamen (ohne Commit)
+
+        Karten, die noch in Decks verwendet werden, bleiben erhalten.
+        Darf nur nach einem vollständigen Import aufgerufen werden.
+        """
+        missing = list(self.known_hashes)
+        in_use = set()
+        for i in range(0, len(missing), IN_CHUNK_SIZE):
+            chunk = missing[i:i + IN_CHUNK_SIZE]
+            in_use.update(self.db.execute(
+                select(DeckCard.card_id).where(DeckCard.card_id.in_(chunk))
+            ).scalars())
+
+        removable = [card_id for card_id in missing if card_id not in in_use]
+        for i in range(0, len(removable), IN_CHUNK_SIZE):
+            chunk = removable[i:i + IN_CHUNK_SIZE]
+            remove_from_search_index(self.db, chunk)
+            self.db.execute(delete(card_colors).where(card_colors.c.card_id.in_(chunk)))
+            self.db.execute(delete(Card).where(Card.id.in_(chunk)))
+
+        self._record("removed", removable)
+        self.known_hashes.clear()
+        return removable
+
+    @staticmethod
+    def empty_summary() -> Dict[str, Any]:
+        """Zusammenfassung eines Laufs ohne Änderungen"""
+        return {"added": 0, "updated": 0, "removed": 0, "unchanged": 0,
+                "ids": {"added": [], "updated": [], "removed": []}}
+
+    def summary(self) -> Dict[str, Any]:
+        """Änderungen als Dictionary (IDs auf MAX_CHANGE_IDS je Art begrenzt)"""
+        return {
+            **self.counts,
+            "ids": {kind: list(card_ids) for kind, card_ids in self.ids.items()},
+        }
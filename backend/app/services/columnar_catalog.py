@@ -0,0 +1,323 @@
+"""
+Spaltenbasierter Kartenkatalog im Speicher (optional, benötigt NumPy)
+
+Die Tabelle `cards` wird nach (Name, ID) sortiert in kompakte Spalten geladen:
+- Zeichenketten (Name, Typ, Seltenheit, Set) als Wörterbuch-Codes
+- Manawert als float32-Array
+- Farben als Bitmaske (W=1, U=2, B=4, R=8, G=16)
+
+Filter werden als vektorisierte Masken ausgewertet, Facetten per bincount
+gezählt. Der Katalog wird nach jedem Sync vollständig neu geladen und dann
+in einem Schritt ausgetauscht.
+
+Ohne NumPy (oder mit CARD_CATALOG_ENGINE=sql) beantwortet `sql_facets`
+dieselben Anfragen per GROUP BY in der Datenbank.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, and_, case, cast, func, select, true
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, card_colors
+from app.services.card_query import color_condition
+from app.services.catalog_events import on_catalog_changed
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# "columnar" (Standard, sofern NumPy installiert ist) oder "sql"
+CARD_CATALOG_ENGINE = os.getenv("CARD_CATALOG_ENGINE", "columnar")
+
+COLOR_BITS = {"W": 1, "U": 2, "B": 4, "R": 8, "G": 16}
+COLOR_MODES = ("include", "exact", "within")
+
+# Manawerte ab dieser Grenze werden in einer Facette zusammengefasst
+CMC_FACET_MAX = 16
+
+
+def columnar_enabled() -> bool:
+    return np is not None and CARD_CATALOG_ENGINE == "columnar"
+
+
+@dataclass(frozen=True)
+class CatalogFilter:
+    """
+    Filter für Katalog und Facetten
+
+    `name` und `card_type` suchen Teilzeichenketten (ohne Groß-/Kleinschreibung),
+    `colors` z.B. "rg" oder "c" für farblos; `color_mode` legt fest, ob die
+    Karte diese Farben enthalten (include), genau haben (exact) oder nur
+    aus ihnen bestehen (within) muss.
+    """
+    name: Optional[str] = None
+    card_type: Optional[str] = None
+    rarity: Optional[str] = None
+    set_code: Optional[str] = None
+    set_name: Optional[str] = None
+    cmc_min: Optional[float] = None
+    cmc_max: Optional[float] = None
+    colors: Optional[str] = None
+    color_mode: str = "include"
+
+
+def _color_bits(colors: str) -> int:
+    bits = 0
+    for code in colors.upper():
+        if code not in COLOR_BITS:
+            raise ValueError(f"Unbekannte Farbe: {code}")
+        bits |= COLOR_BITS[code]
+    return bits
+
+
+class _Dictionary:
+    """Wörterbuch-kodierte Zeichenkettenspalte"""
+
+    def __init__(self, values: Sequence[Optional[str]]):
+        positions: Dict[str, int] = {}
+        codes = []
+        for value in values:
+            value = value or ""
+            code = positions.get(value)
+            if code is None:
+                code = positions[value] = len(positions)
+            codes.append(code)
+        self.values: List[str] = list(positions)
+        self.lowered: List[str] = [value.lower() for value in self.values]
+        self.positions = positions
+        self.codes = np.array(codes, dtype=np.min_scalar_type(max(len(self.values) - 1, 0)))
+
+    def equals(self, value: str):
+        code = self.positions.get(value)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def contains(self, needle: str):
+        needle = needle.lower()
+        matching = [code for code, value in enumerate(self.lowered) if needle in value]
+        return np.isin(self.codes, np.array(matching, dtype=self.codes.dtype))
+
+    def counts(self, mask) -> Dict[str, int]:
+        counts = np.bincount(self.codes[mask], minlength=len(self.values))
+        return {self.values[code]: int(count) for code, count in enumerate(counts) if count and self.values[code]}
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+
+class ColumnarCatalog:
+    """Unveränderlicher Schnappschuss des Katalogs; für neue Daten neu aufbauen"""
+
+    def __init__(self, rows: Sequence[Tuple], colors: Sequence[Tuple[str, str]]):
+        """
+        Args:
+            rows: (id, name, type, rarity, set_code, set_name, cmc), sortiert nach (name, id)
+            colors: (card_id, color_code)-Paare
+        """
+        self.ids: List[str] = [row[0] for row in rows]
+        self.name = _Dictionary([row[1] for row in rows])
+        self.type = _Dictionary([row[2] for row in rows])
+        self.rarity = _Dictionary([row[3] for row in rows])
+        self.set_code = _Dictionary([row[4] for row in rows])
+        self.set_name = _Dictionary([row[5] for row in rows])
+        self.cmc = np.array([np.nan if row[6] is None else row[6] for row in rows], dtype=np.float32)
+
+        position = {card_id: index for index, card_id in enumerate(self.ids)}
+        self.colors = np.zeros(len(self.ids), dtype=np.uint8)
+        for card_id, code in colors:
+            index = position.get(card_id)
+            if index is not None and code in COLOR_BITS:
+                self.colors[index] |= COLOR_BITS[code]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Speicherbedarf der Spalten (ohne IDs und Wörterbücher)"""
+        columns = (self.name, self.type, self.rarity, self.set_code, self.set_name)
+        return sum(column.nbytes for column in columns) + int(self.cmc.nbytes) + int(self.colors.nbytes)
+
+    def mask(self, filters: CatalogFilter):
+        """Boolesche Maske der Karten, die alle Filter erfüllen"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if filters.name:
+            mask &= self.name.contains(filters.name)
+        if filters.card_type:
+            mask &= self.type.contains(filters.card_type)
+        if filters.rarity:
+            mask &= self.rarity.equals(filters.rarity)
+        if filters.set_code:
+            mask &= self.set_code.equals(filters.set_code)
+        if filters.set_name:
+            mask &= self.set_name.equals(filters.set_name)
+        # NaN-Vergleiche sind immer falsch: Karten ohne Manawert fallen bei Bereichsfiltern heraus
+        if filters.cmc_min is not None:
+            mask &= self.cmc >= filters.cmc_min
+        if filters.cmc_max is not None:
+            mask &= self.cmc <= filters.cmc_max
+        if filters.colors:
+            mask &= self._color_mask(filters.colors, filters.color_mode)
+        return mask
+
+    def _color_mask(self, colors: str, mode: str):
+        if colors.lower() in ("c", "colorless"):
+            return self.colors == 0
+        bits = _color_bits(colors)
+        if mode == "exact":
+            return self.colors == bits
+        if mode == "within":
+            return (self.colors & ~np.uint8(bits)) == 0
+        return (self.colors & bits) == bits
+
+    def facets(self, mask) -> Dict[str, Dict[str, int]]:
+        """Anzahl der gefilterten Karten je Seltenheit, Manawert, Set und Farbe"""
+        cmc = self.cmc[mask]
+        cmc = cmc[~np.isnan(cmc)]
+        cmc_counts = np.bincount(np.minimum(cmc, CMC_FACET_MAX).astype(np.int64), minlength=CMC_FACET_MAX + 1)
+
+        colors = self.colors[mask]
+        color_counts = {code: int(np.count_nonzero(colors & bit)) for code, bit in COLOR_BITS.items()}
+        color_counts["C"] = int(np.count_nonzero(colors == 0))
+        # Mehrfarbig: mehr als ein Bit gesetzt
+        color_counts["M"] = int(np.count_nonzero(colors & (colors - 1)))
+
+        return {
+            "rarity": self.rarity.counts(mask),
+            "cmc": {_cmc_label(value): int(count) for value, count in enumerate(cmc_counts) if count},
+            "set": self.set_code.counts(mask),
+            "color": {code: count for code, count in color_counts.items() if count},
+        }
+
+    def search(self, filters: CatalogFilter, skip: int = 0, limit: int = 20) -> Tuple[int, List[str], Dict[str, Dict[str, int]]]:
+        """
+        Returns:
+            (Gesamtzahl, Karten-IDs der Seite in (Name, ID)-Reihenfolge, Facetten)
+        """
+        mask = self.mask(filters)
+        positions = np.flatnonzero(mask)
+        page = positions[skip:skip + limit]
+        return int(len(positions)), [self.ids[index] for index in page], self.facets(mask)
+
+
+def _cmc_label(value: int) -> str:
+    return f"{CMC_FACET_MAX}+" if value == CMC_FACET_MAX else str(value)
+
+
+class CatalogStore:
+    """Hält den aktuellen Katalog; der Austausch ist eine einzelne Zuweisung"""
+
+    def __init__(self):
+        self.current: Optional[ColumnarCatalog] = None
+        self.stats: Dict[str, Any] = {}
+
+    def rebuild(self, db: Session) -> None:
+        if not columnar_enabled():
+            return
+        start = time.perf_counter()
+        rows = db.execute(
+            select(Card.id, Card.name, Card.type, Card.rarity, Card.set_code, Card.set_name, Card.cmc)
+            .order_by(Card.name, Card.id)
+        ).all()
+        colors = db.execute(select(card_colors.c.card_id, card_colors.c.color_code)).all()
+        catalog = ColumnarCatalog(rows, colors)
+
+        self.current = catalog
+        self.stats = {
+            "cards": len(catalog),
+            "memory_bytes": catalog.nbytes,
+            "build_seconds": round(time.perf_counter() - start, 3),
+            "built_at": datetime.utcnow().isoformat(),
+        }
+        logger.info(f"Spaltenkatalog geladen: {len(catalog)} Karten, {catalog.nbytes / 1024 / 1024:.1f} MB")
+
+
+catalog_store = CatalogStore()
+
+
+@on_catalog_changed
+def rebuild_columnar_catalog(db: Session) -> None:
+    """Lädt den Katalog nach einem Sync neu"""
+    catalog_store.rebuild(db)
+
+
+def _sql_conditions(filters: CatalogFilter) -> List:
+    conditions = []
+    if filters.name:
+        conditions.append(Card.name.ilike(f"%{filters.name}%"))
+    if filters.card_type:
+        conditions.append(Card.type.ilike(f"%{filters.card_type}%"))
+    if filters.rarity:
+        conditions.append(Card.rarity == filters.rarity)
+    if filters.set_code:
+        conditions.append(Card.set_code == filters.set_code)
+    if filters.set_name:
+        conditions.append(Card.set_name == filters.set_name)
+    if filters.cmc_min is not None:
+        conditions.append(Card.cmc >= filters.cmc_min)
+    if filters.cmc_max is not None:
+        conditions.append(Card.cmc <= filters.cmc_max)
+    if filters.colors:
+        if filters.colors.lower() in ("c", "colorless"):
+            op = ":"
+        else:
+            op = {"include": ":", "exact": "=", "within": "<="}[filters.color_mode]
+        conditions.append(color_condition(filters.colors, op))
+    return conditions
+
+
+def sql_facets(db: Session, filters: CatalogFilter, skip: int = 0, limit: int = 20) -> Tuple[int, List[str], Dict[str, Dict[str, int]]]:
+    """Gleiche Rückgabe wie ColumnarCatalog.search, per GROUP BY in der Datenbank"""
+    where = and_(true(), *_sql_conditions(filters))
+
+    def grouped(column) -> Dict[Any, int]:
+        rows = db.execute(select(column, func.count()).where(where).group_by(column)).all()
+        return {value: count for value, count in rows if value is not None}
+
+    total = db.execute(select(func.count()).select_from(Card).where(where)).scalar()
+    ids = list(db.execute(
+        select(Card.id).where(where).order_by(Card.name, Card.id).offset(skip).limit(limit)
+    ).scalars())
+
+    cmc_bucket = case((Card.cmc >= CMC_FACET_MAX, CMC_FACET_MAX), else_=cast(Card.cmc, Integer))
+    cmc_counts = {_cmc_label(int(value)): count for value, count in sorted(grouped(cmc_bucket).items())}
+
+    # Farben: je Farbe sowie Anzahl farbiger und mehrfarbiger Karten
+    filtered_ids = select(Card.id).where(where)
+    color_counts = dict(db.execute(
+        select(card_colors.c.color_code, func.count())
+        .where(card_colors.c.card_id.in_(filtered_ids))
+        .group_by(card_colors.c.color_code)
+    ).all())
+    per_card = (
+        select(func.count().label("colors"))
+        .where(card_colors.c.card_id.in_(filtered_ids))
+        .group_by(card_colors.c.card_id)
+        .subquery()
+    )
+    colored, multicolor = db.execute(
+        select(func.count(), func.coalesce(func.sum(case((per_card.c.colors >= 2, 1), else_=0)), 0))
+    ).one()
+    if total - colored:
+        color_counts["C"] = total - colored
+    if multicolor:
+        color_counts["M"] = multicolor
+
+    facets = {
+        "rarity": {value: count for value, count in grouped(Card.rarity).items() if value},
+        "cmc": cmc_counts,
+        "set": {value: count for value, count in grouped(Card.set_code).items() if value},
+        "color": color_counts,
+    }
+    return total, ids, facets
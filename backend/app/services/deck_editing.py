@@ -0,0 +1,184 @@
+"""
+Änderungen an Deck-Inhalten als Differenz
+
+Der Inhalt eines Decks wird als Abbildung (card_id, is_sideboard) -> Anzahl
+betrachtet. Statt alle Deck-Karten zu löschen und neu anzulegen, wird der
+gewünschte Inhalt mit dem vorhandenen verglichen; geschrieben werden nur
+neue Einträge, geänderte Anzahlen und entfernte Einträge. Alle referenzierten
+Karten werden vorher mit einer IN-Abfrage geprüft, so dass bei unbekannten
+Karten nichts geschrieben wird.
+
+Einzelne Karten werden per `INSERT ... ON CONFLICT DO UPDATE` auf den
+Unique-Index (deck_id, card_id, is_sideboard) addiert; gleichzeitige
+Klicks erhöhen damit dieselbe Zeile, statt Duplikate anzulegen.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import literal, select, update
+from sqlalchemy.orm import Session
+
+from app.db.bulk import dialect_insert, existing_ids
+from app.models.models import Card, Deck, DeckCard
+
+# (card_id, is_sideboard) -> Anzahl
+DeckContents = Dict[Tuple[str, bool], int]
+
+
+class UnknownCardsError(ValueError):
+    """Referenzierte Karten existieren nicht"""
+
+    def __init__(self, card_ids: Sequence[str]):
+        self.card_ids = list(card_ids)
+        super().__init__(f"Karte mit ID {', '.join(self.card_ids)} nicht gefunden")
+
+
+class CardNotInDeckError(LookupError):
+    """Eine zu entfernende Karte ist nicht im Deck"""
+
+
+@dataclass
+class DeckDiff:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+
+def contents_from_items(items: Iterable) -> DeckContents:
+    """Fasst Einträge mit card_id, quantity und is_sideboard zusammen (Duplikate werden addiert)"""
+    contents: DeckContents = {}
+    for item in items:
+        key = (item.card_id, bool(item.is_sideboard))
+        contents[key] = contents.get(key, 0) + item.quantity
+    return {key: quantity for key, quantity in contents.items() if quantity > 0}
+
+
+def check_cards_exist(db: Session, card_ids: Iterable[str]) -> None:
+    """
+    Prüft alle Karten-IDs mit einer IN-Abfrage (je Block)
+
+    Raises:
+        UnknownCardsError: Mit allen fehlenden IDs in Eingabereihenfolge
+    """
+    card_ids = list(dict.fromkeys(card_ids))
+    found = existing_ids(db, Card.id, card_ids)
+    missing = [card_id for card_id in card_ids if card_id not in found]
+    if missing:
+        raise UnknownCardsError(missing)
+
+
+def current_contents(db: Session, deck_id: int) -> DeckContents:
+    contents: DeckContents = {}
+    rows = db.query(DeckCard.card_id, DeckCard.is_sideboard, DeckCard.quantity).filter(DeckCard.deck_id == deck_id)
+    for card_id, is_sideboard, quantity in rows:
+        key = (card_id, bool(is_sideboard))
+        contents[key] = contents.get(key, 0) + (quantity or 0)
+    return contents
+
+
+def apply_operations(contents: DeckContents, operations: Iterable) -> DeckContents:
+    """
+    Wendet Operationen im Stil von JSON Patch auf einen Deck-Inhalt an
+
+    - add: Anzahl erhöhen (Standard 1), legt den Eintrag bei Bedarf an
+    - remove: Anzahl verringern, ohne Anzahl den Eintrag ganz entfernen
+    - replace: Anzahl setzen (0 entfernt den Eintrag)
+
+    Raises:
+        CardNotInDeckError: Wenn remove eine Karte betrifft, die nicht im Deck ist
+    """
+    contents = dict(contents)
+    for operation in operations:
+        key = (operation.card_id, operation.is_sideboard)
+        if operation.op == "add":
+            contents[key] = contents.get(key, 0) + (1 if operation.quantity is None else operation.quantity)
+        elif operation.op == "remove":
+            if key not in contents:
+                raise CardNotInDeckError(operation.card_id)
+            contents[key] = 0 if operation.quantity is None else contents[key] - operation.quantity
+        else:
+            contents[key] = operation.quantity or 0
+        if contents[key] <= 0:
+            del contents[key]
+    return contents
+
+
+def apply_contents(db: Session, deck: Deck, desired: DeckContents) -> DeckDiff:
+    """
+    Gleicht die Deck-Karten mit dem gewünschten Inhalt ab (ohne Commit)
+
+    Mehrfach vorhandene Zeilen für denselben Eintrag werden dabei zusammengeführt.
+    Bei Änderungen wird `updated_at` des Decks gesetzt.
+    """
+    diff = DeckDiff()
+    seen = set()
+    rows: List[DeckCard] = db.query(DeckCard).filter(DeckCard.deck_id == deck.id).order_by(DeckCard.id).all()
+    for row in rows:
+        key = (row.card_id, bool(row.is_sideboard))
+        if key not in desired or key in seen:
+            db.delete(row)
+            diff.deleted += 1
+            continue
+        seen.add(key)
+        if row.quantity != desired[key]:
+            row.quantity = desired[key]
+            diff.updated += 1
+
+    for (card_id, is_sideboard), quantity in desired.items():
+        if (card_id, is_sideboard) not in seen:
+            db.add(DeckCard(deck_id=deck.id, card_id=card_id, quantity=quantity, is_sideboard=is_sideboard))
+            diff.inserted += 1
+
+    if diff.changed:
+        deck.updated_at = datetime.utcnow()
+    return diff
+
+
+def touch_deck(db: Session, deck_id: int) -> Optional[datetime]:
+    """Setzt updated_at des Decks; gibt None zurück, wenn es das Deck nicht gibt"""
+    now = datetime.utcnow()
+    result = db.execute(update(Deck).where(Deck.id == deck_id).values(updated_at=now))
+    return now if result.rowcount else None
+
+
+def add_deck_card(db: Session, deck_id: int, card_id: str, quantity: int, is_sideboard: bool) -> Optional[Tuple[int, int]]:
+    """
+    Addiert `quantity` zum Eintrag der Karte im Deck (legt ihn bei Bedarf an, ohne Commit)
+
+    Die Existenz der Karte wird im selben Statement geprüft (INSERT ... SELECT aus cards).
+
+    Returns:
+        (ID des Eintrags, neue Anzahl) oder None, wenn es die Karte nicht gibt
+    """
+    insert = dialect_insert(db, DeckCard.__table__)
+    if insert is None:
+        # Fallback ohne ON CONFLICT: Lesen und Schreiben über das ORM
+        if not existing_ids(db, Card.id, [card_id]):
+            return None
+        deck_card = db.query(DeckCard).filter(
+            DeckCard.deck_id == deck_id,
+            DeckCard.card_id == card_id,
+            DeckCard.is_sideboard == is_sideboard
+        ).with_for_update().first()
+        if deck_card is None:
+            deck_card = DeckCard(deck_id=deck_id, card_id=card_id, quantity=0, is_sideboard=is_sideboard)
+            db.add(deck_card)
+        deck_card.quantity += quantity
+        db.flush()
+        return deck_card.id, deck_card.quantity
+
+    table = DeckCard.__table__
+    source = select(literal(deck_id), Card.id, literal(quantity), literal(is_sideboard)).where(Card.id == card_id)
+    stmt = insert(table).from_select(["deck_id", "card_id", "quantity", "is_sideboard"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["deck_id", "card_id", "is_sideboard"],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    ).returning(table.c.id, table.c.quantity)
+    row = db.execute(stmt).first()
+    return (row.id, row.quantity) if row is not None else None
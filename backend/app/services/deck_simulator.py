@@ -0,0 +1,280 @@
+"""
+Wahrscheinlichkeiten für Starthände und Ziehungen eines Decks
+
+Exakt (hypergeometrisch, ohne Mulligans):
+- Verteilung der Länder in der Starthand
+- jeden Land-Drop bis Zug N treffen
+- mindestens ein Exemplar einer Karte bis Zug N gesehen
+
+Per Monte-Carlo-Simulation (optional, benötigt NumPy) zusätzlich mit London-
+Mulligan und "Karte X bis Zug N ausspielbar" (Exemplar gezogen und genug
+Länder ausgespielt, Farben werden nicht berücksichtigt). Gemischt wird in
+Blöcken von höchstens SIMULATION_BATCH_SIZE Decks als ein Array, wobei ein
+Block nie mehr als SIMULATION_BATCH_ELEMENTS Zufallswerte umfasst (große Decks
+ergeben kleinere Blöcke). Nach jedem Block wird das Zeitlimit geprüft, so dass
+eine Anfrage einen Worker nicht blockiert.
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, DeckCard
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    np = None
+
+SIMULATION_MAX_SAMPLES = int(os.getenv("SIMULATION_MAX_SAMPLES", "2000000"))
+SIMULATION_TIME_LIMIT = float(os.getenv("SIMULATION_TIME_LIMIT", "2.0"))
+SIMULATION_BATCH_SIZE = int(os.getenv("SIMULATION_BATCH_SIZE", "50000"))
+SIMULATION_BATCH_ELEMENTS = int(os.getenv("SIMULATION_BATCH_ELEMENTS", "3000000"))
+SIMULATION_MAX_DECK_SIZE = int(os.getenv("SIMULATION_MAX_DECK_SIZE", "1000"))
+
+HAND_SIZE = 7
+
+
+class SimulationError(ValueError):
+    """Deck oder Parameter erlauben keine Simulation"""
+
+
+@dataclass
+class DeckEntry:
+    card_id: str
+    name: str
+    quantity: int
+    cmc: float
+    is_land: bool
+
+
+@dataclass
+class SimulationSettings:
+    turns: int = 4
+    on_the_draw: bool = False
+    keep_min_lands: int = 2
+    keep_max_lands: int = 5
+    max_mulligans: int = 2
+    samples: int = 100000
+    time_limit: float = SIMULATION_TIME_LIMIT
+    seed: Optional[int] = None
+    # (card_id, Zug) für "bis Zug N ausspielbar"
+    targets: List[tuple] = field(default_factory=list)
+
+    def cards_seen(self, turn: int) -> int:
+        """Anzahl gesehener Karten bis einschließlich Zug `turn` (ohne Mulligan)"""
+        return HAND_SIZE + turn - 1 + (1 if self.on_the_draw else 0)
+
+    def max_turn(self) -> int:
+        """Spätester Zug aus `turns` und den Zielkarten"""
+        return max([self.turns, *(turn for _, turn in self.targets)])
+
+
+def load_main_deck(db: Session, deck_id: int) -> List[DeckEntry]:
+    """Hauptdeck mit Manawert und Land-Kennzeichen in einer Abfrage"""
+    rows = db.execute(
+        select(DeckCard.card_id, Card.name, DeckCard.quantity, Card.cmc, Card.type)
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(DeckCard.deck_id == deck_id, DeckCard.is_sideboard.is_(False), DeckCard.quantity > 0)
+        .order_by(DeckCard.id)
+    )
+    return [
+        DeckEntry(card_id, name, quantity, cmc or 0.0, "Land" in (card_type or ""))
+        for card_id, name, quantity, cmc, card_type in rows
+    ]
+
+
+def hypergeom_pmf(population: int, successes: int, draws: int, k: int) -> float:
+    """P(genau k Treffer) beim Ziehen ohne Zurücklegen"""
+    if k < 0 or k > successes or k > draws or draws - k > population - successes:
+        return 0.0
+    return math.comb(successes, k) * math.comb(population - successes, draws - k) / math.comb(population, draws)
+
+
+def hypergeom_at_least(population: int, successes: int, draws: int, k: int) -> float:
+    """P(mindestens k Treffer) beim Ziehen ohne Zurücklegen"""
+    draws = min(draws, population)
+    return min(1.0, sum(hypergeom_pmf(population, successes, draws, i) for i in range(max(k, 0), draws + 1)))
+
+
+def exact_odds(entries: Sequence[DeckEntry], settings: SimulationSettings) -> Dict[str, Any]:
+    deck_size = sum(entry.quantity for entry in entries)
+    lands = sum(entry.quantity for entry in entries if entry.is_land)
+    copies = {}
+    for entry in entries:
+        copies[entry.card_id] = copies.get(entry.card_id, 0) + entry.quantity
+    return {
+        "opening_hand_lands": {
+            str(k): round(hypergeom_pmf(deck_size, lands, HAND_SIZE, k), 6) for k in range(HAND_SIZE + 1)
+        },
+        "land_drops": {
+            str(turn): round(hypergeom_at_least(deck_size, lands, settings.cards_seen(turn), turn), 6)
+            for turn in range(1, settings.turns + 1)
+        },
+        "targets_seen": [
+            round(hypergeom_at_least(deck_size, copies[card_id], settings.cards_seen(turn), 1), 6)
+            for card_id, turn in settings.targets
+        ],
+    }
+
+
+def _shuffled_prefix(rng, batch: int, deck_size: int, depth: int):
+    """Die ersten `depth` Positionen von `batch` zufälligen Permutationen des Decks"""
+    keys = rng.random((batch, deck_size), dtype=np.float32)
+    if depth < deck_size:
+        # Nur die `depth` kleinsten Schlüssel je Zeile auswählen und sortieren
+        prefix = keys.argpartition(depth - 1, axis=1)[:, :depth]
+        order = np.take_along_axis(keys, prefix, axis=1).argsort(axis=1)
+        return np.take_along_axis(prefix, order, axis=1).astype(np.int32)
+    return keys.argsort(axis=1).astype(np.int32)
+
+
+def _simulate_batch(rng, is_land, target_masks, target_cmc, settings: SimulationSettings, batch: int):
+    """Simuliert `batch` Partien; gibt Mulligans, Land-Drops je Zug und Treffer je Ziel zurück"""
+    deck_size = len(is_land)
+    # Gezogene Karten bis zum spätesten Zug (Ziele können nach `turns` liegen), +1 beim Ziehen
+    depth = min(deck_size, HAND_SIZE + settings.max_turn() + 1)
+
+    # London-Mulligan: neu mischen, bis die Hand behalten wird
+    # (nur die noch offenen Partien werden erneut gemischt)
+    order = np.zeros((batch, depth), dtype=np.int32)
+    mulligans = np.full(batch, settings.max_mulligans, dtype=np.int32)
+    undecided = np.arange(batch)
+    for attempt in range(settings.max_mulligans + 1):
+        shuffled = _shuffled_prefix(rng, len(undecided), deck_size, depth)
+        hand_lands = is_land[shuffled[:, :HAND_SIZE]].sum(axis=1)
+        keep = (hand_lands >= settings.keep_min_lands) & (hand_lands <= settings.keep_max_lands)
+        if attempt == settings.max_mulligans:
+            keep[:] = True
+        order[undecided[keep]] = shuffled[keep]
+        mulligans[undecided[keep]] = attempt
+        undecided = undecided[~keep]
+        if len(undecided) == 0:
+            break
+
+    # Beim Behalten zuerst andere Zauber, dann Länder, zuletzt Zielkarten unter die Bibliothek legen
+    hand = order[:, :HAND_SIZE]
+    is_target = target_masks.any(axis=0)
+    priority = is_land[hand].astype(np.int8) + 2 * is_target[hand]
+    ranks = priority.argsort(axis=1, kind="stable").argsort(axis=1)
+    kept = ranks >= mulligans[:, None]
+
+    draws = order[:, HAND_SIZE:]
+    land_counts = (is_land[hand] & kept).sum(axis=1)[:, None] + np.concatenate(
+        [np.zeros((batch, 1), dtype=np.int64), is_land[draws].cumsum(axis=1)], axis=1
+    )
+
+    offset = 1 if settings.on_the_draw else 0
+    land_drops = {}
+    for turn in range(1, settings.turns + 1):
+        drawn = min(turn - 1 + offset, land_counts.shape[1] - 1)
+        land_drops[turn] = int((land_counts[:, drawn] >= turn).sum())
+
+    targets = []
+    for index, (_, turn) in enumerate(settings.targets):
+        drawn = min(turn - 1 + offset, draws.shape[1])
+        mask = target_masks[index]
+        seen = (mask[hand] & kept).any(axis=1) | mask[draws[:, :drawn]].any(axis=1)
+        mana = np.minimum(land_counts[:, drawn], turn)
+        targets.append(int((seen & (mana >= target_cmc[index])).sum()))
+
+    return np.bincount(mulligans, minlength=settings.max_mulligans + 1), land_drops, targets
+
+
+def monte_carlo(entries: Sequence[DeckEntry], settings: SimulationSettings) -> Optional[Dict[str, Any]]:
+    """Simulation in Blöcken bis zur Stichprobengröße oder zum Zeitlimit; None ohne NumPy oder Stichproben"""
+    if np is None or settings.samples <= 0:
+        return None
+
+    # Eine Position je Karte im Deck
+    quantities = [entry.quantity for entry in entries]
+    is_land = np.repeat(np.array([entry.is_land for entry in entries], dtype=bool), quantities)
+    card_ids = np.repeat(np.array([entry.card_id for entry in entries], dtype=object), quantities)
+    target_masks = np.array([card_ids == card_id for card_id, _ in settings.targets], dtype=bool)
+    target_masks = target_masks.reshape(len(settings.targets), len(is_land))
+    cmc_by_card = {entry.card_id: entry.cmc for entry in entries}
+    target_cmc = [math.ceil(cmc_by_card[card_id]) for card_id, _ in settings.targets]
+
+    rng = np.random.default_rng(settings.seed)
+    batch_size = max(1, min(SIMULATION_BATCH_SIZE, SIMULATION_BATCH_ELEMENTS // len(is_land)))
+    started = time.perf_counter()
+    samples = 0
+    timed_out = False
+    mulligans = np.zeros(settings.max_mulligans + 1, dtype=np.int64)
+    land_drops = {turn: 0 for turn in range(1, settings.turns + 1)}
+    targets = [0] * len(settings.targets)
+    while samples < settings.samples:
+        batch = min(batch_size, settings.samples - samples)
+        batch_mulligans, batch_land_drops, batch_targets = _simulate_batch(
+            rng, is_land, target_masks, target_cmc, settings, batch
+        )
+        mulligans += batch_mulligans
+        for turn, count in batch_land_drops.items():
+            land_drops[turn] += count
+        targets = [total + count for total, count in zip(targets, batch_targets)]
+        samples += batch
+        if samples < settings.samples and time.perf_counter() - started > settings.time_limit:
+            timed_out = True
+            break
+
+    return {
+        "samples": samples,
+        "truncated": timed_out,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "mulligans": {str(count): round(int(value) / samples, 4) for count, value in enumerate(mulligans)},
+        "land_drops": {str(turn): round(count / samples, 4) for turn, count in land_drops.items()},
+        "targets_castable": [round(count / samples, 4) for count in targets],
+    }
+
+
+def simulate_deck(entries: Sequence[DeckEntry], settings: SimulationSettings) -> Dict[str, Any]:
+    """
+    Exakte Werte und (sofern möglich) Simulation für das Hauptdeck
+
+    Raises:
+        SimulationError: Bei zu kleinem oder zu großem Deck oder Zielkarten, die nicht im Hauptdeck sind
+    """
+    deck_size = sum(entry.quantity for entry in entries)
+    if deck_size < HAND_SIZE + 1:
+        raise SimulationError(f"Das Hauptdeck braucht mindestens {HAND_SIZE + 1} Karten")
+    if deck_size > SIMULATION_MAX_DECK_SIZE:
+        raise SimulationError(f"Das Hauptdeck darf höchstens {SIMULATION_MAX_DECK_SIZE} Karten haben")
+    names = {entry.card_id: entry.name for entry in entries}
+    for card_id, _ in settings.targets:
+        if card_id not in names:
+            raise SimulationError(f"Karte {card_id} ist nicht im Hauptdeck")
+
+    exact = exact_odds(entries, settings)
+    simulated = monte_carlo(entries, settings)
+    cmc_by_card = {entry.card_id: entry.cmc for entry in entries}
+    copies = {}
+    for entry in entries:
+        copies[entry.card_id] = copies.get(entry.card_id, 0) + entry.quantity
+
+    return {
+        "deck_size": deck_size,
+        "lands": sum(entry.quantity for entry in entries if entry.is_land),
+        "engine": "numpy" if simulated is not None else "exact",
+        "opening_hand_lands": exact["opening_hand_lands"],
+        "land_drops": exact["land_drops"],
+        "simulation": None if simulated is None else {
+            key: simulated[key] for key in ("samples", "truncated", "elapsed_ms", "mulligans", "land_drops")
+        },
+        "targets": [
+            {
+                "card_id": card_id,
+                "name": names[card_id],
+                "turn": turn,
+                "copies": copies[card_id],
+                "cmc": cmc_by_card[card_id],
+                "seen": exact["targets_seen"][index],
+                "castable": simulated["targets_castable"][index] if simulated is not None else None,
+            }
+            for index, (card_id, turn) in enumerate(settings.targets)
+        ],
+    }
@@ -0,0 +1,193 @@
+"""
+Kennzahlen eines Decks (Manakurve, Farben, Mana-Symbole, Kartentypen)
+
+Alles wird per Aggregation über `deck_cards` in der Datenbank berechnet; nur
+die Manakosten werden je unterschiedlicher Zeichenkette in Python zerlegt.
+Ergebnisse werden je Deck mit dessen `updated_at` gespeichert: solange sich
+das Deck nicht ändert, kostet ein erneuter Aufruf nur das Lesen des
+Zeitstempels. Nach einem Sync (geänderte Kartendaten) wird alles verworfen.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, case, cast, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, Deck, DeckCard, card_colors
+from app.services.catalog_events import on_catalog_changed
+
+DECK_STATS_CACHE_SIZE = int(os.getenv("DECK_STATS_CACHE_SIZE", "2048"))
+
+# Manawerte ab dieser Grenze werden in der Kurve zusammengefasst ("7+")
+CURVE_MAX = 7
+COLOR_ORDER = ("W", "U", "B", "R", "G")
+CARD_TYPES = ("Creature", "Instant", "Sorcery", "Artifact", "Enchantment", "Planeswalker", "Battle", "Land")
+
+_SYMBOL = re.compile(r"\{([^}]+)\}")
+
+
+@lru_cache(maxsize=4096)
+def count_pips(mana_cost: Optional[str]) -> Tuple[Tuple[str, int], ...]:
+    """
+    Zählt farbige Mana-Symbole in Manakosten wie "{2}{W}{W/U}{G/P}"
+
+    Hybride Symbole zählen für jede ihrer Farben, phyrexianische für ihre Farbe.
+    """
+    counts: Dict[str, int] = {}
+    for symbol in _SYMBOL.findall(mana_cost or ""):
+        for part in set(symbol.upper().split("/")):
+            if part in COLOR_ORDER:
+                counts[part] = counts.get(part, 0) + 1
+    return tuple(sorted(counts.items()))
+
+
+def _curve_bucket(cmc: Optional[float]) -> str:
+    value = int(cmc or 0)
+    return f"{CURVE_MAX}+" if value >= CURVE_MAX else str(value)
+
+
+def compute_deck_stats(db: Session, deck_id: int, include_sideboard: bool = False) -> Dict[str, Any]:
+    """Berechnet die Kennzahlen mit vier Aggregat-Abfragen"""
+    conditions = [DeckCard.deck_id == deck_id]
+    if not include_sideboard:
+        conditions.append(DeckCard.is_sideboard.is_(False))
+    quantity = func.coalesce(DeckCard.quantity, 0)
+    is_land = Card.type.like("%Land%")
+    colored = exists().where(card_colors.c.card_id == DeckCard.card_id)
+
+    # Kartentypen und Summen in einer Abfrage
+    type_columns = [func.sum(case((Card.type.like(f"%{name}%"), quantity), else_=0)) for name in CARD_TYPES]
+    totals = db.execute(
+        select(
+            func.sum(quantity),
+            func.sum(case((is_land, 0), else_=quantity * func.coalesce(Card.cmc, 0))),
+            func.sum(case((is_land, 0), else_=quantity)),
+            func.sum(case((colored, 0), else_=quantity)),
+            *type_columns,
+        )
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(*conditions)
+    ).one()
+    total_cards, cmc_sum, nonland_cards, colorless_cards = (value or 0 for value in totals[:4])
+    types = {name: int(value or 0) for name, value in zip(CARD_TYPES, totals[4:]) if value}
+
+    # Manakurve ohne Länder
+    curve = {str(value): 0 for value in range(CURVE_MAX)}
+    curve[f"{CURVE_MAX}+"] = 0
+    cmc = func.coalesce(Card.cmc, 0)
+    bucket = case((cmc >= CURVE_MAX, CURVE_MAX), else_=cast(cmc, Integer))
+    curve_rows = db.execute(
+        select(bucket, func.sum(quantity))
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(*conditions, ~is_land)
+        .group_by(bucket)
+    )
+    for value, count in curve_rows:
+        curve[_curve_bucket(value)] += int(count or 0)
+
+    # Farbverteilung über die Farbzuordnung der Karten
+    colors = {code: 0 for code in COLOR_ORDER}
+    color_rows = db.execute(
+        select(card_colors.c.color_code, func.sum(quantity))
+        .join(card_colors, card_colors.c.card_id == DeckCard.card_id)
+        .where(*conditions)
+        .group_by(card_colors.c.color_code)
+    )
+    for code, count in color_rows:
+        colors[code] = int(count or 0)
+    colors["C"] = int(colorless_cards)
+
+    # Mana-Symbole je unterschiedlicher Manakosten
+    pips = {code: 0 for code in COLOR_ORDER}
+    cost_rows = db.execute(
+        select(Card.mana_cost, func.sum(quantity))
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(*conditions, Card.mana_cost.is_not(None))
+        .group_by(Card.mana_cost)
+    )
+    for mana_cost, count in cost_rows:
+        for code, pip_count in count_pips(mana_cost):
+            pips[code] += pip_count * int(count or 0)
+
+    return {
+        "deck_id": deck_id,
+        "include_sideboard": include_sideboard,
+        "total_cards": int(total_cards),
+        "average_cmc": round(cmc_sum / nonland_cards, 2) if nonland_cards else None,
+        "mana_curve": curve,
+        "colors": colors,
+        "pips": pips,
+        "types": types,
+    }
+
+
+class DeckStatsCache:
+    """Kennzahlen je (Deck, Sideboard-Option), gültig für einen Stand von updated_at"""
+
+    def __init__(self, max_entries: int = DECK_STATS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, bool], Tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[int, bool], updated_at: datetime) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != updated_at:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple[int, bool], updated_at: datetime, stats: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (updated_at, stats)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+deck_stats_cache = DeckStatsCache()
+
+
+@on_catalog_changed
+def clear_deck_stats(db: Session) -> None:
+    """Kartendaten (Manawert, Farben) können sich durch einen Sync ändern"""
+    deck_stats_cache.clear()
+
+
+def deck_stats(db: Session, deck_id: int, include_sideboard: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Kennzahlen eines Decks, aus dem Cache, solange sich `updated_at` nicht geändert hat
+
+    Returns:
+        Kennzahlen samt `updated_at` oder None, wenn es das Deck nicht gibt
+    """
+    row = db.execute(select(Deck.updated_at).where(Deck.id == deck_id)).first()
+    if row is None:
+        return None
+    updated_at = row.updated_at
+    key = (deck_id, include_sideboard)
+    if updated_at is not None:
+        cached = deck_stats_cache.get(key, updated_at)
+        if cached is not None:
+            return cached
+
+    stats = {**compute_deck_stats(db, deck_id, include_sideboard), "updated_at": updated_at}
+    if updated_at is not None:
+        deck_stats_cache.set(key, updated_at, stats)
+    return stats
@@ -0,0 +1,211 @@
+"""
+Ergebnis-Cache für Kartensuchen
+
+Speichert fertig serialisierte Antworten (Bytes plus Header) je normalisierter
+Anfrage. Der lokale Cache ist ein LRU mit TTL sowie Obergrenzen für Anzahl
+und Gesamtgröße der Einträge und gilt je Worker.
+
+Optional teilen sich mehrere Worker über Redis (RESULT_CACHE_URL, benötigt das
+Paket `redis`) einen gemeinsamen Cache; lokale Treffer haben Vorrang.
+
+Die Katalog-Generation ist Teil jedes Schlüssels. Nach einem Sync werden alte
+Einträge damit nicht mehr getroffen, auch nicht von anderen Workern; der lokale
+Cache wird zusätzlich sofort geleert.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.services.catalog_events import catalog_generation, on_catalog_changed
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "")
+
+# Einzelne Einträge dürfen höchstens diesen Anteil des Gesamtbudgets belegen
+MAX_ENTRY_FRACTION = 8
+
+
+@dataclass
+class CachedResult:
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(key) + len(value) for key, value in self.headers.items())
+
+    def encode(self) -> bytes:
+        """Kompakte Darstellung für den gemeinsamen Cache: Header als JSON-Zeile, dann der Body"""
+        return json.dumps(self.headers).encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CachedResult":
+        headers, _, body = data.partition(b"\n")
+        return cls(body=body, headers=json.loads(headers))
+
+
+class LocalResultCache:
+    """Threadsicherer LRU-Cache mit TTL sowie Begrenzung nach Anzahl und Bytes"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 ttl: float = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def set(self, key: str, result: CachedResult) -> bool:
+        size = result.size
+        if size > self.max_bytes // MAX_ENTRY_FRACTION or self.max_entries <= 0:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: str) -> None:
+        _, result = self._entries.pop(key)
+        self._bytes -= result.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisResultCache:
+    """Gemeinsamer Cache mehrerer Worker in Redis (Ablauf über die TTL von Redis)"""
+
+    def __init__(self, url: str, ttl: float = RESULT_CACHE_TTL, prefix: str = "magicfrog:results:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        data = self.client.get(self.prefix + key)
+        return CachedResult.decode(data) if data is not None else None
+
+    def set(self, key: str, result: CachedResult) -> None:
+        self.client.set(self.prefix + key, result.encode(), ex=max(int(self.ttl), 1))
+
+
+class ResultCache:
+    """Lokaler Cache, optional ergänzt um einen gemeinsamen Cache"""
+
+    def __init__(self, local: Optional[LocalResultCache] = None, shared_url: str = RESULT_CACHE_URL):
+        self.local = local or LocalResultCache()
+        self.shared: Optional[RedisResultCache] = None
+        if shared_url:
+            try:
+                self.shared = RedisResultCache(shared_url, ttl=self.local.ttl)
+            except ImportError:
+                logger.warning("RESULT_CACHE_URL gesetzt, aber das Paket redis ist nicht installiert")
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(scope: str, **params: Any) -> str:
+        """Schlüssel aus Bereich, Katalog-Generation und den (normalisierten) Parametern"""
+        encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{scope}:{catalog_generation.value or 0}:{encoded}"
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        result = self.local.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        if self.shared is not None:
+            try:
+                result = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Gemeinsamer Ergebnis-Cache nicht erreichbar: {str(e)}")
+                result = None
+            if result is not None:
+                self.shared_hits += 1
+                self.local.set(key, result)
+                return result
+        self.misses += 1
+        return None
+
+    def set(self, key: str, result: CachedResult) -> None:
+        self.local.set(key, result)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, result)
+            except Exception as e:
+                logger.warning(f"Gemeinsamer Ergebnis-Cache nicht erreichbar: {str(e)}")
+
+    def clear(self) -> None:
+        """Leert den lokalen Cache (gemeinsame Einträge laufen über die Generation ins Leere)"""
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            **self.local.stats(),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else None,
+            "shared": self.shared is not None,
+            "generation": catalog_generation.value,
+        }
+
+
+result_cache = ResultCache()
+
+
+@on_catalog_changed
+def clear_result_cache(db: Session) -> None:
+    """Verwirft alle Ergebnisse nach einem Sync"""
+    result_cache.clear()
@@ -1,53 +1,248 @@
-import requests
+import json
+import logging
+import os
+import random
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 from sqlalchemy.orm import Session
-from typing import Dict, List, Any, Optional
 
-from app.models.models import Card, Set, Color
+from app.db.bulk import upsert_colors, upsert_sets
+from app.models.models import SyncRun
+from app.services.catalog_events import notify_catalog_changed
+from app.services.catalog_sync import CardChangeTracker
+
+logger = logging.getLogger(__name__)
+
+# Scryfall API Basis-URL (für Tests gegen einen lokalen Server überschreibbar)
+SCRYFALL_API_BASE = os.getenv("SCRYFALL_API_BASE", "https://api.scryfall.com")
+
+# Scryfall Rate Limit: max. 10 Anfragen pro Sekunde für alle Worker zusammen
+MAX_REQUESTS_PER_SECOND = float(os.getenv("SCRYFALL_MAX_REQUESTS_PER_SECOND", "10"))
+
+# Anzahl paralleler Worker beim Abrufen der Sets
+DEFAULT_FETCH_WORKERS = int(os.getenv("SCRYFALL_FETCH_WORKERS", "8"))
+
+# Wiederholungen bei 429, 5xx und Verbindungsfehlern
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+USER_AGENT = "MagicFrog/0.1"
+
+
+class TokenBucket:
+    """
+    Thread-sicherer Token-Bucket für ein globales Anfragebudget
+
+    `acquire` blockiert, bis ein Token verfügbar ist. Mit `penalize` kann nach
+    einem 429 das Budget für alle Worker gemeinsam pausiert werden.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-# Scryfall API Basis-URL
-SCRYFALL_API_BASE = "https://api.scryfall.com"
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
 
-def fetch_sets() -> List[Dict[str, Any]]:
+    def acquire(self) -> None:
+        """Wartet auf ein Token und verbraucht es"""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        """Pausiert das Budget für alle Worker um die angegebene Zeit"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class ScryfallClient:
+    """
+    HTTP-Client für die Scryfall-API
+
+    Alle Worker teilen sich eine Session mit Connection-Pool und einen
+    Token-Bucket, so dass das Rate Limit global eingehalten wird. Bei 429,
+    5xx und Verbindungsfehlern wird mit exponentiellem Backoff wiederholt.
+    """
+
+    def __init__(
+        self,
+        base_url: str = SCRYFALL_API_BASE,
+        requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+        pool_size: int = DEFAULT_FETCH_WORKERS,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        delay = self.backoff_base * (2 ** attempt)
+        return min(delay, BACKOFF_MAX_SECONDS) * random.uniform(0.5, 1.0)
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        JSON abrufen; gibt None bei 404 zurück
+
+        Relative Pfade werden an die Basis-URL angehängt.
+        """
+        if not url.startswith("http"):
+            url = f"{self.base_url}{url}"
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # ReadTimeout ist keine Unterklasse von ConnectionError
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                kind = "Zeitüberschreitung" if isinstance(e, requests.Timeout) else "Verbindungsfehler"
+                logger.warning(f"{kind} bei {url}: {e}, neuer Versuch in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 404:
+                return None
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt >= self.max_retries:
+                    raise Exception(f"Fehler beim Abrufen von {url}: {response.status_code}")
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    # Zu viele Anfragen: alle Worker bremsen, nicht nur diesen
+                    self.limiter.penalize(delay)
+                else:
+                    time.sleep(delay)
+                logger.warning(f"Status {response.status_code} bei {url}, neuer Versuch in {delay:.1f}s")
+                continue
+
+            if response.status_code != 200:
+                raise Exception(f"Fehler beim Abrufen von {url}: {response.status_code}")
+
+            return response.json()
+
+        raise Exception(f"Fehler beim Abrufen von {url}")
+
+
+_default_client: Optional[ScryfallClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> ScryfallClient:
+    """Gibt den prozessweit geteilten Scryfall-Client zurück"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ScryfallClient()
+        return _default_client
+
+
+def fetch_sets(client: Optional[ScryfallClient] = None) -> List[Dict[str, Any]]:
     """
     Alle verfügbaren Sets von Scryfall abrufen
     """
-    response = requests.get(f"{SCRYFALL_API_BASE}/sets")
-    if response.status_code != 200:
-        raise Exception(f"Fehler beim Abrufen der Sets: {response.status_code}")
+    client = client or get_client()
+    data = client.get_json("/sets")
+    if data is None:
+        raise Exception("Fehler beim Abrufen der Sets: 404")
     
-    return response.json().get("data", [])
+    return data.get("data", [])
 
-def fetch_cards_by_set(set_code: str) -> List[Dict[str, Any]]:
+def fetch_cards_by_set(set_code: str, client: Optional[ScryfallClient] = None) -> List[Dict[str, Any]]:
     """
     Alle Karten eines bestimmten Sets abrufen
     """
+    client = client or get_client()
     cards = []
-    has_more = True
-    next_page = f"{SCRYFALL_API_BASE}/cards/search?q=set:{set_code}&unique=prints"
+    next_page = f"/cards/search?q=set:{set_code}&unique=prints"
     
-    while has_more:
-        # Karten von der API abrufen
-        response = requests.get(next_page)
+    while next_page:
+        # Karten von der API abrufen (Rate Limiting übernimmt der Client)
+        data = client.get_json(next_page)
         
-        # Rate Limiting beachten (max. 10 Anfragen pro Sekunde)
-        time.sleep(0.1)
-        
-        if response.status_code == 404:
+        if data is None:
             # Keine Karten gefunden
-            return []
-        
-        if response.status_code != 200:
-            raise Exception(f"Fehler beim Abrufen der Karten: {response.status_code}")
+            return cards
         
-        data = response.json()
         cards.extend(data.get("data", []))
-        
-        has_more = data.get("has_more", False)
-        next_page = data.get("next_page", "")
+        next_page = data.get("next_page") if data.get("has_more") else None
     
     return cards
 
+def fetch_cards_for_sets(
+    set_codes: Iterable[str],
+    client: Optional[ScryfallClient] = None,
+    max_workers: int = DEFAULT_FETCH_WORKERS,
+) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+    """
+    Karten mehrerer Sets parallel abrufen
+
+    Die Worker teilen sich Session und Token-Bucket des Clients. Ergebnisse
+    werden in der Reihenfolge ihrer Fertigstellung geliefert. Es laufen höchstens
+    `max_workers * 2` Abrufe gleichzeitig, damit nicht die Karten aller Sets auf
+    einmal im Speicher liegen, während der Aufrufer schreibt.
+
+    Yields:
+        (set_code, Karten, None) oder (set_code, None, Fehler)
+    """
+    client = client or get_client()
+    pending_codes = iter(set_codes)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scryfall") as executor:
+        futures: Dict[Future, str] = {}
+
+        def submit_next() -> None:
+            for set_code in pending_codes:
+                futures[executor.submit(fetch_cards_by_set, set_code, client)] = set_code
+                return
+
+        for _ in range(max_workers * 2):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            while done:
+                # Future vor dem Liefern freigeben, damit nur der Aufrufer die Karten hält
+                future = done.pop()
+                set_code = futures.pop(future)
+                submit_next()
+                try:
+                    result = (set_code, future.result(), None)
+                except Exception as e:
+                    result = (set_code, None, e)
+                del future
+                yield result
+
 def map_card_data(card_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Kartendaten von Scryfall in unser Format mappen
@@ -79,20 +274,25 @@ def map_set_data(set_data: Dict[str, Any]) -> Dict[str, Any]:
         "icon_url": set_data.get("icon_svg_uri", ""),
     }
 
-def update_card_database(db: Session, limit_sets: Optional[int] = None) -> Dict[str, int]:
+def update_card_database(
+    db: Session,
+    limit_sets: Optional[int] = None,
+    max_workers: int = DEFAULT_FETCH_WORKERS,
+) -> Dict[str, int]:
     """
     Datenbank mit Karten von Scryfall aktualisieren
     
     Args:
         db: Datenbank-Session
         limit_sets: Optional, Anzahl der Sets zu importieren (für Tests)
+        max_workers: Anzahl paralleler Worker für den Abruf der Sets
     
     Returns:
-        Dict mit Statistiken: {"added": int, "updated": int}
+        Dict mit Statistiken: {"added": int, "updated": int, "unchanged": int}
     """
-    stats = {"added": 0, "updated": 0}
+    started_at = datetime.utcnow()
     
-    # Farben initialisieren, falls sie noch nicht existieren
+    # Farben initialisieren bzw. aktualisieren
     colors = [
         {"code": "W", "name": "White"},
         {"code": "U", "name": "Blue"},
@@ -100,13 +300,9 @@ def update_card_database(db: Session, limit_sets: Optional[int] = None) -> Dict[
         {"code": "R", "name": "Red"},
         {"code": "G", "name": "Green"},
     ]
+    color_codes = {color["code"] for color in colors}
     
-    for color_data in colors:
-        color = db.query(Color).filter_by(code=color_data["code"]).first()
-        if not color:
-            color = Color(**color_data)
-            db.add(color)
-    
+    upsert_colors(db, colors)
     db.commit()
     
     # Sets abrufen und speichern
@@ -116,59 +312,42 @@ def update_card_database(db: Session, limit_sets: Optional[int] = None) -> Dict[
     if limit_sets:
         sets_data = sets_data[:limit_sets]
     
-    for set_data in sets_data:
-        mapped_set = map_set_data(set_data)
-        
-        # Set in der Datenbank suchen oder erstellen
-        db_set = db.query(Set).filter_by(code=mapped_set["code"]).first()
-        
-        if not db_set:
-            db_set = Set(**mapped_set)
-            db.add(db_set)
-        else:
-            # Set aktualisieren
-            for key, value in mapped_set.items():
-                setattr(db_set, key, value)
+    mapped_sets = [map_set_data(set_data) for set_data in sets_data]
+    upsert_sets(db, mapped_sets)
+    db.commit()
+    
+    # Vorhandene Fingerabdrücke laden, um unveränderte Karten zu überspringen
+    tracker = CardChangeTracker(db)
+    
+    # Karten aller Sets parallel abrufen, aber im Hauptthread schreiben
+    set_names = {mapped_set["code"]: mapped_set["name"] for mapped_set in mapped_sets}
+    for set_code, cards_data, error in fetch_cards_for_sets(list(set_names), max_workers=max_workers):
+        if error is not None:
+            print(f"Fehler beim Abrufen der Karten für Set {set_names[set_code]}: {str(error)}")
+            continue
         
-        db.commit()
+        batch = [
+            (map_card_data(card_data), [code for code in card_data.get("colors", []) if code in color_codes])
+            for card_data in cards_data
+        ]
         
-        # Karten für dieses Set abrufen
+        # Nur neue und geänderte Karten des Sets in einer Transaktion schreiben
         try:
-            cards_data = fetch_cards_by_set(mapped_set["code"])
-            
-            for card_data in cards_data:
-                try:
-                    mapped_card = map_card_data(card_data)
-                    
-                    # Karte in der Datenbank suchen oder erstellen
-                    db_card = db.query(Card).filter_by(id=mapped_card["id"]).first()
-                    
-                    if not db_card:
-                        db_card = Card(**mapped_card)
-                        db.add(db_card)
-                        stats["added"] += 1
-                    else:
-                        # Karte aktualisieren
-                        for key, value in mapped_card.items():
-                            setattr(db_card, key, value)
-                        stats["updated"] += 1
-                    
-                    # Farben der Karte aktualisieren
-                    db_card.colors = []
-                    card_colors = card_data.get("colors", [])
-                    
-                    for color_code in card_colors:
-                        color = db.query(Color).filter_by(code=color_code).first()
-                        if color:
-                            db_card.colors.append(color)
-                    
-                    db.commit()
-                    
-                except Exception as e:
-                    print(f"Fehler beim Verarbeiten der Karte {card_data.get('name')}: {str(e)}")
-                    db.rollback()
-            
+            tracker.write_batch(batch)
+            db.commit()
         except Exception as e:
-            print(f"Fehler beim Abrufen der Karten für Set {mapped_set['name']}: {str(e)}")
+            print(f"Fehler beim Speichern der Karten für Set {set_names[set_code]}: {str(e)}")
+            db.rollback()
     
-    return stats
+    # Als abgeschlossenen Lauf protokollieren (neue Katalog-Generation)
+    summary = tracker.summary()
+    db.add(SyncRun(
+        status="completed", stage="done", source="api/sets", card_limit=None,
+        started_at=started_at, finished_at=datetime.utcnow(),
+        cards_added=summary["added"], cards_updated=summary["updated"],
+        cards_removed=0, cards_unchanged=summary["unchanged"],
+        changes=json.dumps(summary["ids"]),
+    ))
+    db.commit()
+    notify_catalog_changed(db)
+    return {"added": summary["added"], "updated": summary["updated"], "unchanged": summary["unchanged"]}
@@ -0,0 +1,270 @@
+"""
+Volltextsuche über Kartenname, Typzeile und Regeltext
+
+SQLite: FTS5-Tabelle `cards_fts` (rowid = cards.rowid), die vom Import
+batchweise aktualisiert wird.
+PostgreSQL: GIN-Index über einen gewichteten tsvector sowie Trigramm-Indizes
+für ILIKE auf Name und Typ; beide pflegt die Datenbank selbst.
+
+Ohne Index (z.B. andere Datenbanken) wird auf ILIKE zurückgefallen.
+
+Hinweis: SQLite kann bei VACUUM die rowids von `cards` neu vergeben. Danach
+muss der Index mit `rebuild_search_index` neu aufgebaut werden.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+from sqlalchemy import and_, column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from app.db.bulk import IN_CHUNK_SIZE
+from app.models.models import Card
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "cards_fts"
+
+# Spalten des Index und ihre Gewichtung im Ranking
+SEARCH_FIELDS = {"name": "name", "type": "type", "text": "text"}
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+_fts = table(FTS_TABLE, column("rowid"))
+_cards_rowid = literal_column("cards.rowid")
+
+# Verfügbarkeit der FTS-Tabelle je Engine (wird einmalig geprüft)
+_fts_available: Dict[int, bool] = {}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind(mapper=Card).dialect.name
+
+
+def _engine(db: Session) -> Engine:
+    return db.get_bind(mapper=Card)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Legt den Suchindex an und baut ihn bei Bedarf auf"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+            ).first()
+            if not exists:
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    "name, type, text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                )
+            # Nach Neuanlage oder unvollständigem Index neu aufbauen
+            indexed = conn.exec_driver_sql(f"SELECT count(*) FROM {FTS_TABLE}").scalar()
+            total = conn.exec_driver_sql("SELECT count(*) FROM cards").scalar()
+            if indexed != total:
+                logger.info(f"Baue Suchindex auf ({total} Karten)")
+                _rebuild_sqlite(conn)
+        elif dialect == "postgresql":
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_cards_search ON cards USING GIN ("
+                "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(type, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(text, '')), 'C')))"
+            )
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_cards_name_trgm ON cards USING GIN (name gin_trgm_ops)")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_cards_type_trgm ON cards USING GIN (type gin_trgm_ops)")
+    _fts_available.pop(id(engine), None)
+
+
+def _rebuild_sqlite(conn) -> None:
+    conn.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    conn.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, type, text) SELECT rowid, name, type, text FROM cards"
+    )
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Baut den SQLite-Suchindex komplett neu auf (z.B. nach VACUUM)"""
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            _rebuild_sqlite(conn)
+
+
+def has_fts(db: Session) -> bool:
+    """Prüft, ob die SQLite-FTS-Tabelle für die Engine der Session existiert"""
+    engine = _engine(db)
+    if engine.dialect.name != "sqlite":
+        return False
+    key = id(engine)
+    if key not in _fts_available:
+        # Auch in eingebundenen Datenbanken suchen (Blue/Green-Katalog)
+        schemas = [row[1] for row in db.execute(text("PRAGMA database_list"))]
+        _fts_available[key] = any(
+            db.execute(
+                text(f"SELECT 1 FROM \"{schema}\".sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first() is not None
+            for schema in schemas
+        )
+    return _fts_available[key]
+
+
+def update_search_index(db: Session, card_ids: Sequence[str]) -> None:
+    """Aktualisiert die Index-Einträge der angegebenen Karten (ohne Commit)"""
+    if not card_ids or not has_fts(db):
+        return
+    for i in range(0, len(card_ids), IN_CHUNK_SIZE):
+        chunk = list(card_ids[i:i + IN_CHUNK_SIZE])
+        params = {f"id{n}": card_id for n, card_id in enumerate(chunk)}
+        placeholders = ", ".join(f":id{n}" for n in range(len(chunk)))
+        db.execute(text(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT rowid FROM cards WHERE id IN ({placeholders}))"
+        ), params)
+        db.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, type, text) "
+            f"SELECT rowid, name, type, text FROM cards WHERE id IN ({placeholders})"
+        ), params)
+
+
+def remove_from_search_index(db: Session, card_ids: Sequence[str]) -> None:
+    """Entfernt Karten aus dem Index; muss vor dem Löschen der Karten laufen (ohne Commit)"""
+    if not card_ids or not has_fts(db):
+        return
+    for i in range(0, len(card_ids), IN_CHUNK_SIZE):
+        chunk = list(card_ids[i:i + IN_CHUNK_SIZE])
+        params = {f"id{n}": card_id for n, card_id in enumerate(chunk)}
+        placeholders = ", ".join(f":id{n}" for n in range(len(chunk)))
+        db.execute(text(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT rowid FROM cards WHERE id IN ({placeholders}))"
+        ), params)
+
+
+def tokenize(value: str) -> List[str]:
+    """Zerlegt eine Sucheingabe in Wörter"""
+    return _TOKEN_RE.findall(value.lower())
+
+
+class TextTerm(NamedTuple):
+    """Suchbegriff für ein Feld ("name", "type", "text" oder "*" für alle Felder)"""
+    field: str
+    value: str
+    phrase: bool = False
+
+
+def _as_terms(terms: Union[Dict[str, str], Iterable[TextTerm]]) -> List[TextTerm]:
+    if isinstance(terms, dict):
+        return [TextTerm(field, value) for field, value in terms.items() if value]
+    return [term for term in terms if term.value]
+
+
+def fts_match_expression(terms: Union[Dict[str, str], Iterable[TextTerm]]) -> Optional[str]:
+    """
+    Baut einen FTS5-MATCH-Ausdruck
+
+    Jedes Wort wird als Wortanfang gesucht; bei Phrasen müssen die Wörter
+    direkt aufeinander folgen.
+
+    Args:
+        terms: Suchtext je Feld als Dictionary oder Liste von TextTerm
+    """
+    parts = []
+    for term in _as_terms(terms):
+        tokens = tokenize(term.value)
+        if not tokens:
+            continue
+        if term.phrase:
+            words = '"' + " ".join(tokens) + '"'
+        else:
+            words = " AND ".join(f'"{token}"*' for token in tokens)
+        if term.field == "*":
+            parts.append(f"({words})")
+        else:
+            parts.append(f"{{{SEARCH_FIELDS[term.field]}}}: ({words})")
+    return " AND ".join(parts) if parts else None
+
+
+def _pg_document():
+    return (
+        func.setweight(func.to_tsvector("simple", func.coalesce(Card.name, "")), "A")
+        .op("||")(func.setweight(func.to_tsvector("simple", func.coalesce(Card.type, "")), "B"))
+        .op("||")(func.setweight(func.to_tsvector("simple", func.coalesce(Card.text, "")), "C"))
+    )
+
+
+def _pg_tsquery(value: str):
+    tokens = tokenize(value)
+    return func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+
+
+def text_condition(terms: Union[Dict[str, str], Iterable[TextTerm]], use_fts: bool):
+    """
+    Filterbedingung für Textsuche in einzelnen Feldern
+
+    Mit `use_fts` über den FTS-Index (Wort-Präfixsuche), sonst per ILIKE.
+    Unabhängig von der Session, kann also zwischengespeichert werden.
+    Gibt None zurück, wenn keine Suchbegriffe vorhanden sind.
+    """
+    terms = _as_terms(terms)
+    if not terms:
+        return None
+
+    if use_fts:
+        match = fts_match_expression(terms)
+        if match is None:
+            return None
+        fts_rowids = _fts.select().with_only_columns(_fts.c.rowid).where(
+            literal_column(FTS_TABLE).op("MATCH")(match)
+        )
+        return _cards_rowid.in_(fts_rowids.scalar_subquery())
+
+    conditions = []
+    for term in terms:
+        fields = list(SEARCH_FIELDS) if term.field == "*" else [term.field]
+        conditions.append(or_(*(
+            getattr(Card, SEARCH_FIELDS[field]).ilike(f"%{term.value}%") for field in fields
+        )))
+    return and_(*conditions)
+
+
+def text_filter(db: Session, terms: Union[Dict[str, str], Iterable[TextTerm]]):
+    """Wie text_condition, nutzt den FTS-Index, sofern er für die Session verfügbar ist"""
+    return text_condition(terms, has_fts(db))
+
+
+def ranked_search(db: Session, query: str) -> Optional[Query]:
+    """
+    Nach Relevanz sortierte Suche über Name, Typzeile und Regeltext
+
+    Returns:
+        Query auf Card oder None, wenn die Eingabe keine Suchbegriffe enthält
+    """
+    if not tokenize(query):
+        return None
+
+    cards = db.query(Card)
+    dialect = _dialect(db)
+
+    if has_fts(db):
+        match = fts_match_expression({"*": query})
+        return (
+            cards.join(_fts, _fts.c.rowid == _cards_rowid)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+            .order_by(func.bm25(literal_column(FTS_TABLE), *FTS_WEIGHTS), Card.name, Card.id)
+        )
+
+    if dialect == "postgresql":
+        document = _pg_document()
+        tsquery = _pg_tsquery(query)
+        return (
+            cards.filter(document.op("@@")(tsquery))
+            .order_by(func.ts_rank(document, tsquery).desc(), Card.name, Card.id)
+        )
+
+    # Fallback ohne Index: alle Wörter müssen irgendwo vorkommen
+    for token in tokenize(query):
+        cards = cards.filter(or_(*(getattr(Card, name).ilike(f"%{token}%") for name in SEARCH_FIELDS)))
+    return cards.order_by(Card.name, Card.id)
@@ -0,0 +1,147 @@
+"""
+Benchmark: lesende Routen mit synchroner Session (Threadpool) gegen AsyncSession
+
+Startet die App je Modus als eigenen uvicorn-Prozess (DB_ASYNC=false/true)
+auf derselben SQLite-Datei und misst Durchsatz und Latenz bei `--clients`
+gleichzeitigen Clients (Einzelkarte, Kartensuche, Sets, Deck, Deck-Statistik).
+Der Async-Modus benötigt aiosqlite.
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_async_db.py --clients 64 --seconds 5
+"""
+import argparse
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+TMP = tempfile.TemporaryDirectory()
+DATABASE_URL = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+os.environ["DATABASE_URL"] = DATABASE_URL
+
+import httpx
+
+from app.db.bulk import upsert_cards, upsert_sets
+from app.db.database import SessionLocal, engine
+from app.models.models import Base, Deck, DeckCard
+
+SETS = 40
+
+
+def seed(cards_count):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        upsert_sets(db, [{"code": f"s{i:02d}", "name": f"Set {i}"} for i in range(SETS)])
+        upsert_cards(db, [
+            {
+                "id": f"card-{i:06d}", "name": f"Benchmark Card {i}", "mana_cost": "{1}{G}", "cmc": float(i % 8),
+                "type": "Creature — Frog", "rarity": "common", "text": "Draw a card.",
+                "set_code": f"s{i % SETS:02d}", "set_name": f"Set {i % SETS}",
+            }
+            for i in range(cards_count)
+        ])
+        for d in range(20):
+            deck = Deck(name=f"Deck {d}")
+            deck.deck_cards = [DeckCard(card_id=f"card-{(d * 60 + i) % cards_count:06d}", quantity=1) for i in range(60)]
+            db.add(deck)
+        db.commit()
+
+
+def start_server(port, db_async):
+    env = dict(os.environ, DATABASE_URL=DATABASE_URL, DB_ASYNC="true" if db_async else "false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(base + "/", timeout=1)
+            return process, base
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server nicht erreichbar")
+
+
+def request_paths(rng, cards_count):
+    """Gemischte Leseanfragen; wechselnde Parameter umgehen den Ergebnis-Cache weitgehend"""
+    deck_id = rng.randint(1, 20)
+    return rng.choice([
+        f"/cards/card-{rng.randrange(cards_count):06d}",
+        f"/cards/?name=card {rng.randrange(1000)}&limit=20",
+        f"/cards/?skip={rng.randrange(cards_count)}&limit=20",
+        "/sets/",
+        f"/decks/{deck_id}",
+        f"/decks/{deck_id}/stats",
+    ])
+
+
+def run(name, base, clients, seconds, cards_count):
+    stop = threading.Event()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def loop(index):
+        rng = random.Random(index)
+        local = []
+        with httpx.Client(base_url=base, timeout=60) as client:
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.get(request_paths(rng, cards_count))
+                local.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    with lock:
+                        errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<6} {len(latencies) / elapsed:8.1f} Anfragen/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  Fehler {errors[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark synchrone gegen asynchrone Datenbankzugriffe")
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    seed(args.cards)
+    modes = [("sync", False)]
+    if importlib.util.find_spec("aiosqlite") is not None:
+        modes.append(("async", True))
+    else:
+        print("aiosqlite nicht installiert, nur synchroner Modus")
+
+    try:
+        for name, db_async in modes:
+            process, base = start_server(args.port, db_async)
+            try:
+                run(name, base, args.clients, args.seconds, args.cards)
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        TMP.cleanup()
@@ -0,0 +1,131 @@
+"""
+Benchmark: Leselatenz während eines vollständigen Re-Imports, direkt gegen Blue/Green
+
+Ein Schreib-Thread importiert den kompletten Katalog neu (Bulk-Upsert in
+Batches mit Commit), während ein Lese-Thread Deck-Joins und Kartenseiten
+abfragt. "inplace" schreibt in den eingebundenen, aktiven Katalog, "bluegreen"
+in eine Kopie, die nach dem Import per Zeigerdatei aktiviert wird (siehe
+app.services.catalog_swap). Beide mit SQLite-Profil (WAL, Lesepool).
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_catalog_swap.py --cards 50000 --rounds 2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.bulk import upsert_cards
+from app.db.catalog_attach import CatalogPointer, attach_catalog
+from app.db.database import catalog_pragmas, configure_sqlite
+from app.models.models import Deck, DeckCard
+from app.services.catalog_swap import copy_catalog, new_catalog_name, upgrade_catalog_file, upgrade_database
+
+DECK_QUERY = text(
+    "SELECT cards.name, deck_cards.quantity FROM deck_cards JOIN cards ON cards.id = deck_cards.card_id "
+    "WHERE deck_cards.deck_id = :deck_id"
+)
+PAGE_QUERY = text("SELECT id, name, type, cmc FROM cards WHERE set_code = :set_code ORDER BY name, id LIMIT 50")
+
+
+def make_rows(count, generation):
+    return [
+        {
+            "id": f"card-{i:06d}", "name": f"Benchmark Card {i} v{generation}", "mana_cost": "{2}{U}",
+            "cmc": float(i % 8), "type": "Creature — Frog", "rarity": "common",
+            "text": f"Sync generation {generation}. " * 4, "set_code": f"s{i % 100:02d}", "set_name": f"Set {i % 100}",
+        }
+        for i in range(count)
+    ]
+
+
+def import_catalog(Writer, cards_count, batch_size, generation):
+    rows = make_rows(cards_count, generation)
+    with Writer() as db:
+        for start in range(0, len(rows), batch_size):
+            upsert_cards(db, rows[start:start + batch_size])
+            db.commit()
+
+
+def run(name, blue_green, cards_count, batch_size, rounds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        url = f"sqlite:///{path}"
+        pointer = CatalogPointer(path)
+        main_engine = configure_sqlite(create_engine(url, pool_size=1, max_overflow=0))
+        upgrade_database(main_engine, pointer)
+        read_engine = configure_sqlite(create_engine(url), read_only=True)
+        for engine in (main_engine, read_engine):
+            attach_catalog(engine, pointer.current, catalog_pragmas())
+        Writer = sessionmaker(bind=main_engine)
+        import_catalog(Writer, cards_count, batch_size, 0)
+        with Writer() as db:
+            for d in range(20):
+                db.add(Deck(name=f"Deck {d}", deck_cards=[
+                    DeckCard(card_id=f"card-{(d * 60 + i) % cards_count:06d}", quantity=1) for i in range(60)
+                ]))
+            db.commit()
+
+        done = threading.Event()
+
+        def sync_loop():
+            for generation in range(1, rounds + 1):
+                if not blue_green:
+                    import_catalog(Writer, cards_count, batch_size, generation)
+                    continue
+                shadow = pointer.catalog_path(new_catalog_name(f"bench{generation}"))
+                copy_catalog(pointer.current(), shadow)
+                shadow_engine = configure_sqlite(create_engine(f"sqlite:///{shadow}"), tuned=False)
+                import_catalog(sessionmaker(bind=shadow_engine), cards_count, batch_size, generation)
+                shadow_engine.dispose()
+                upgrade_catalog_file(shadow)
+                pointer.publish(shadow)
+            done.set()
+
+        writer = threading.Thread(target=sync_loop)
+        rng = random.Random(1)
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        writer.start()
+        while not done.is_set():
+            request_started = time.perf_counter()
+            try:
+                # Jede Anfrage checkt eine Verbindung aus, wie ein API-Request
+                with read_engine.connect() as conn:
+                    conn.execute(DECK_QUERY, {"deck_id": rng.randint(1, 20)}).fetchall()
+                    conn.execute(PAGE_QUERY, {"set_code": f"s{rng.randrange(100):02d}"}).fetchall()
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        elapsed = time.perf_counter() - started
+        writer.join()
+        main_engine.dispose()
+        read_engine.dispose()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<9} Lesen {len(latencies) / elapsed:8.0f}/s  p50 {p50:7.2f} ms  p99 {p99:8.2f} ms  "
+        f"max {latencies[-1]:8.1f} ms  Fehler {errors:>3}  Import {rounds * cards_count / elapsed:8.0f} Karten/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Leselatenz während eines Re-Imports")
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    run("inplace", False, args.cards, args.batch_size, args.rounds)
+    run("bluegreen", True, args.cards, args.batch_size, args.rounds)
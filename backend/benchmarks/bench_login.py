@@ -0,0 +1,143 @@
+"""
+Benchmark: Anmeldungen mit Hashing im Standard-Threadpool gegen den Passwort-Pool
+
+Während `--logins` Clients ununterbrochen Tokens anfordern, misst ein weiterer
+Client die Latenz von GET /cards/. "inline" entspricht dem bisherigen
+synchronen Endpunkt, "pool" dem neuen /users/token.
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_login.py --logins 64 --seconds 5
+    python benchmarks/bench_login.py --scheme pbkdf2_sha256 --rounds 200000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+
+import httpx
+import uvicorn
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+
+from app.api import cards, users
+from app.auth import auth
+from app.auth.password_pool import password_pool
+from app.db.bulk import upsert_cards
+from app.db.database import SessionLocal, engine, get_db
+from app.models.models import Base, User, UserRole
+
+PASSWORD = "benchmark-password"
+
+legacy = APIRouter()
+
+
+@legacy.post("/legacy/token")
+def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    """Bisheriger Weg: Prüfung direkt im synchronen Endpunkt"""
+    user = auth.get_user(db, form_data.username)
+    if not user or not auth.pwd_context.verify(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"ok": True}
+
+
+def setup(users_count, scheme, rounds):
+    options = {f"{scheme}__default_rounds": rounds} if rounds else {}
+    auth.pwd_context = CryptContext(schemes=[scheme], **options)
+    Base.metadata.create_all(bind=engine)
+    hashed = auth.pwd_context.hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all([
+            User(username=f"user{i}", email=f"user{i}@example.com", hashed_password=hashed, role=UserRole.USER)
+            for i in range(users_count)
+        ])
+        upsert_cards(db, [
+            {"id": f"card-{i:05d}", "name": f"Benchmark Card {i}", "rarity": "common", "set_code": "tst",
+             "set_name": "Test", "type": "Creature", "cmc": float(i % 8)}
+            for i in range(2000)
+        ])
+        db.commit()
+
+
+def start_server(port):
+    app = FastAPI()
+    app.include_router(cards.router)
+    app.include_router(users.router)
+    app.include_router(legacy)
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def run(name, url, base, logins, users_count, seconds):
+    stop = threading.Event()
+    counts = {"ok": 0, "busy": 0, "error": 0}
+    lock = threading.Lock()
+
+    def login_loop(index):
+        with httpx.Client(base_url=base, timeout=60) as client:
+            while not stop.is_set():
+                response = client.post(url, data={"username": f"user{index % users_count}", "password": PASSWORD})
+                key = "ok" if response.status_code == 200 else "busy" if response.status_code == 503 else "error"
+                with lock:
+                    counts[key] += 1
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(logins)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+
+    latencies = []
+    started = time.perf_counter()
+    with httpx.Client(base_url=base, timeout=60) as client:
+        while time.perf_counter() - started < seconds:
+            request_started = time.perf_counter()
+            client.get("/cards/", params={"limit": 20})
+            latencies.append((time.perf_counter() - request_started) * 1000)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(
+        f"{name:<7} Anmeldungen {counts['ok'] / elapsed:8.1f}/s  503 {counts['busy']:>6}  Fehler {counts['error']:>4}  "
+        f"Lesen n={len(latencies):>5}  p50 {statistics.median(latencies):8.1f} ms  p95 {p95:8.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für Anmeldungen unter Last")
+    parser.add_argument("--logins", type=int, default=64, help="Gleichzeitige Anmelde-Clients")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scheme", default="bcrypt")
+    parser.add_argument("--rounds", type=int, default=0, help="0 = Standard des Verfahrens")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup(args.users, args.scheme, args.rounds)
+    server, thread = start_server(args.port)
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"Passwort-Pool: {password_pool.workers} Worker, Kapazität {password_pool.capacity}")
+    try:
+        run("inline", "/legacy/token", base, args.logins, args.users, args.seconds)
+        run("pool", "/users/token", base, args.logins, args.users, args.seconds)
+    finally:
+        server.should_exit = True
+        thread.join()
+        password_pool.shutdown()
+        TMP.cleanup()
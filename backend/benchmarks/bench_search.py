@@ -0,0 +1,108 @@
+"""
+Benchmark: Kartensuche per ILIKE gegen FTS5-Index
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_search.py --rows 90000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.bulk import upsert_cards
+from app.models.models import Base, Card
+from app.services.search import _fts_available, ensure_search_index, ranked_search, text_filter
+
+WORDS = [
+    "lightning", "bolt", "frog", "dragon", "shadow", "goblin", "ancient", "storm", "grove", "knight",
+    "serpent", "elder", "blade", "whisper", "ember", "tide", "spirit", "forge", "wild", "crypt",
+]
+TYPES = ["Creature — Frog", "Instant", "Sorcery", "Artifact", "Enchantment — Aura", "Legendary Creature — Dragon"]
+QUERIES = ["light", "dragon bo", "ancient storm", "frog", "zzz"]
+
+
+def make_rows(count):
+    """Synthetische Karten mit realistischer Wortverteilung (großes Vokabular im Regeltext)"""
+    rng = random.Random(42)
+    vocabulary = WORDS + [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+        for _ in range(3000)
+    ]
+    name_words = vocabulary[:400]
+    rows = []
+    for i in range(count):
+        name = " ".join(rng.choice(name_words).capitalize() for _ in range(2 + i % 2))
+        rows.append({
+            "id": f"card-{i:06d}",
+            "name": name,
+            "mana_cost": "{1}{G}",
+            "cmc": float(i % 8),
+            "type": TYPES[i % len(TYPES)],
+            "rarity": "common",
+            "text": " ".join(rng.choice(vocabulary) for _ in range(25)),
+            "set_code": f"s{i % 50:02d}",
+            "set_name": f"Set {i % 50}",
+            "image_url": None,
+            "image_url_small": None,
+        })
+    return rows
+
+
+def measure(label, func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<28} {elapsed * 1000:8.2f} ms")
+
+
+def run(rows_count, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        rows = make_rows(rows_count)
+        for start in range(0, len(rows), 5000):
+            upsert_cards(db, rows[start:start + 5000])
+        db.commit()
+
+        def ilike(query):
+            cards = db.query(Card)
+            for token in query.split():
+                cards = cards.filter(Card.name.ilike(f"%{token}%"))
+            return cards.limit(100).all()
+
+        for query in QUERIES:
+            measure(f"ilike   name={query!r}", lambda: ilike(query), repeat)
+
+        start = time.perf_counter()
+        ensure_search_index(engine)
+        _fts_available.clear()
+        print(f"Indexaufbau ({rows_count} Karten): {time.perf_counter() - start:.2f} s")
+
+        for query in QUERIES:
+            measure(f"fts     name={query!r}",
+                    lambda: db.query(Card).filter(text_filter(db, {"name": query})).limit(100).all(), repeat)
+        for query in QUERIES:
+            measure(f"ranked  q={query!r}", lambda: ranked_search(db, query).limit(100).all(), repeat)
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für die Volltextsuche")
+    parser.add_argument("--rows", type=int, default=90000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.rows, args.repeat)
@@ -0,0 +1,104 @@
+"""
+Benchmark: Kartenlisten per ORM und Pydantic gegen den card_serializer
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_serialize.py --rows 20000 --limit 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.bulk import replace_card_colors, upsert_cards, upsert_colors, upsert_sets
+from app.models.models import Base, Card
+from app.schemas.schemas import Card as CardSchema
+from app.services.card_serializer import card_payload_cache, encode_cards
+
+COLORS = [("W", "White"), ("U", "Blue"), ("B", "Black"), ("R", "Red"), ("G", "Green")]
+
+
+def make_rows(count):
+    """Synthetische Karten mit Set und ein bis zwei Farben"""
+    rows = []
+    colors = {}
+    for i in range(count):
+        rows.append({
+            "id": f"card-{i:06d}",
+            "name": f"Benchmark Card {i}",
+            "mana_cost": "{2}{G}{G}",
+            "cmc": float(i % 8),
+            "type": "Creature — Frog",
+            "rarity": "common",
+            "text": "When this creature enters the battlefield, draw a card. " * 3,
+            "set_code": f"s{i % 50:02d}",
+            "set_name": f"Set {i % 50}",
+            "image_url": f"https://cards.example/{i}.jpg",
+            "image_url_small": f"https://cards.example/{i}-small.jpg",
+        })
+        colors[rows[-1]["id"]] = [COLORS[i % 5][0], COLORS[(i + 2) % 5][0]][: 1 + i % 2]
+    return rows, colors
+
+
+def measure(label, func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<36} {elapsed * 1000:8.2f} ms")
+
+
+def run(rows_count, limit, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        rows, colors = make_rows(rows_count)
+        upsert_sets(db, [{"code": f"s{i:02d}", "name": f"Set {i}"} for i in range(50)])
+        upsert_colors(db, [{"code": code, "name": name} for code, name in COLORS])
+        for start in range(0, len(rows), 5000):
+            upsert_cards(db, rows[start:start + 5000])
+        replace_card_colors(db, colors)
+        db.commit()
+
+        adapter = TypeAdapter(List[CardSchema])
+        ids = [card_id for card_id, in db.query(Card.id).order_by(Card.name, Card.id).limit(limit)]
+
+        def orm_pydantic():
+            # Bisheriger Weg: ORM-Objekte, Set/Farben per Lazy Load, Validierung je Feld
+            db.expunge_all()
+            cards = db.query(Card).order_by(Card.name, Card.id).limit(limit).all()
+            return adapter.dump_json(adapter.validate_python(cards, from_attributes=True))
+
+        def rows_cold():
+            card_payload_cache.clear()
+            return encode_cards(db, ids)
+
+        def rows_warm():
+            return encode_cards(db, ids)
+
+        measure(f"orm + pydantic (limit={limit})", orm_pydantic, repeat)
+        measure("tupel + orjson (leerer Cache)", rows_cold, repeat)
+        measure("tupel + orjson (Cache)", rows_warm, repeat)
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für die Serialisierung von Karten")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.rows, args.limit, args.repeat)
@@ -0,0 +1,109 @@
+"""
+Benchmark: Leselatenz während eines laufenden Syncs, SQLite-Standard gegen Profil
+
+Ein Schreib-Thread spielt einen Sync nach (Bulk-Upsert in Batches mit Commit),
+während ein Lese-Thread Kartenseiten abfragt. "default" verwendet die
+SQLite-Voreinstellungen (Rollback-Journal), "profile" WAL, synchronous=NORMAL,
+mmap/cache_size und einen schreibgeschützten Lesepool (siehe app.db.database).
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_sqlite_profile.py --cards 50000 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.bulk import upsert_cards
+from app.db.database import configure_sqlite
+from app.models.models import Base
+
+PAGE_QUERY = text("SELECT id, name, type, cmc FROM cards WHERE set_code = :set_code ORDER BY name, id LIMIT 50")
+
+
+def make_rows(count, generation):
+    return [
+        {
+            "id": f"card-{i:06d}", "name": f"Benchmark Card {i} v{generation}", "mana_cost": "{2}{U}",
+            "cmc": float(i % 8), "type": "Creature — Frog", "rarity": "common",
+            "text": f"Sync generation {generation}. " * 4, "set_code": f"s{i % 100:02d}", "set_name": f"Set {i % 100}",
+        }
+        for i in range(count)
+    ]
+
+
+def run(name, tuned, cards_count, batch_size, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        writer_engine = configure_sqlite(create_engine(url, pool_size=1, max_overflow=0), tuned=tuned)
+        read_engine = configure_sqlite(create_engine(url), read_only=tuned, tuned=tuned)
+        Base.metadata.create_all(bind=writer_engine)
+        Writer = sessionmaker(bind=writer_engine)
+        with Writer() as db:
+            upsert_cards(db, make_rows(cards_count, 0))
+            db.commit()
+
+        stop = threading.Event()
+        written = [0]
+
+        def sync_loop():
+            generation = 1
+            with Writer() as db:
+                while not stop.is_set():
+                    rows = make_rows(cards_count, generation)
+                    for start in range(0, len(rows), batch_size):
+                        if stop.is_set():
+                            break
+                        upsert_cards(db, rows[start:start + batch_size])
+                        db.commit()
+                        written[0] += batch_size
+                    generation += 1
+
+        writer = threading.Thread(target=sync_loop)
+        writer.start()
+        rng = random.Random(1)
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        with read_engine.connect() as conn:
+            while time.perf_counter() - started < seconds:
+                request_started = time.perf_counter()
+                try:
+                    conn.execute(PAGE_QUERY, {"set_code": f"s{rng.randrange(100):02d}"}).fetchall()
+                    conn.rollback()
+                except Exception:
+                    errors += 1
+                    conn.rollback()
+                latencies.append((time.perf_counter() - request_started) * 1000)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        writer.join()
+        writer_engine.dispose()
+        read_engine.dispose()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<8} Lesen {len(latencies) / elapsed:8.0f}/s  p50 {p50:7.2f} ms  p99 {p99:8.2f} ms  "
+        f"max {latencies[-1]:8.1f} ms  Fehler {errors:>3}  Sync {written[0] / elapsed:8.0f} Karten/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Leselatenz während eines Syncs")
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    run("default", False, args.cards, args.batch_size, args.seconds)
+    run("profile", True, args.cards, args.batch_size, args.seconds)
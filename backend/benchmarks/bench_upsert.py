@@ -0,0 +1,102 @@
+"""
+Benchmark: Schreiben von Karten pro Zeile (ORM) gegen Bulk-Upsert
+
+Aufruf aus dem backend-Verzeichnis:
+    python benchmarks/bench_upsert.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.bulk import replace_card_colors, upsert_cards, upsert_colors
+from app.models.models import Base, Card, Color
+
+COLORS = ["W", "U", "B", "R", "G"]
+
+
+def make_rows(count, generation):
+    """Erzeugt synthetische Karten; `generation` ändert den Inhalt für Update-Läufe"""
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": f"card-{i:06d}",
+            "name": f"Benchmark Card {i} v{generation}",
+            "mana_cost": "{2}{R}",
+            "cmc": float(i % 8),
+            "type": "Creature — Frog",
+            "rarity": ["common", "uncommon", "rare", "mythic"][i % 4],
+            "text": f"Benchmark text {generation}",
+            "set_code": f"s{i % 50:02d}",
+            "set_name": f"Set {i % 50}",
+            "image_url": f"https://example.com/{i}.jpg",
+            "image_url_small": f"https://example.com/{i}-small.jpg",
+        })
+    return rows
+
+
+def colors_for(i):
+    return list(dict.fromkeys([COLORS[i % 5], COLORS[(i * 3) % 5]]))
+
+
+def write_orm(db, rows, batch_size):
+    """Bisheriger Weg: eine Abfrage pro Karte, setattr pro Feld"""
+    colors = {color.code: color for color in db.query(Color).all()}
+    for start in range(0, len(rows), batch_size):
+        for i, row in enumerate(rows[start:start + batch_size], start):
+            db_card = db.query(Card).filter(Card.id == row["id"]).first()
+            if db_card:
+                for key, value in row.items():
+                    setattr(db_card, key, value)
+            else:
+                db_card = Card(**row)
+                db.add(db_card)
+            db_card.colors = []
+            for code in colors_for(i):
+                db_card.colors.append(colors[code])
+        db.commit()
+
+
+def write_bulk(db, rows, batch_size):
+    """Neuer Weg: Bulk-Upsert pro Batch"""
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        upsert_cards(db, batch)
+        replace_card_colors(db, {row["id"]: colors_for(i) for i, row in enumerate(batch, start)})
+        db.commit()
+
+
+def run(name, writer, rows_count, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        upsert_colors(db, [{"code": code, "name": code} for code in COLORS])
+        db.commit()
+
+        for label, generation in (("insert", 1), ("update", 2)):
+            rows = make_rows(rows_count, generation)
+            start = time.perf_counter()
+            writer(db, rows, batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<6} {label:<7} {rows_count:>8} Zeilen  {elapsed:8.2f} s  {rows_count / elapsed:>10.0f} Zeilen/s")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für den Bulk-Upsert")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    run("orm", write_orm, args.rows, args.batch_size)
+    run("bulk", write_bulk, args.rows, args.batch_size)
@@ -9,13 +9,26 @@ import logging
 load_dotenv()
 import uvicorn
 
-from app.db.database import engine, SessionLocal
+from app.db.database import engine, SessionLocal, catalog_pointer
+from app.db.pagination import NEXT_CURSOR_HEADER
+from app.services.catalog_swap import upgrade_database
+from app.services.autocomplete import name_index
+from app.services.columnar_catalog import catalog_store
+from app.services.catalog_events import catalog_generation, load_generation
 from app.models.models import Base, User, UserRole
 from app.api import cards, sets, decks, sync, users
+from app.api.http_cache import CatalogCacheMiddleware
+from app.auth.password_pool import password_pool
 from app.scripts.create_admin import create_admin_user
 
-# Datenbank-Tabellen erstellen
-Base.metadata.create_all(bind=engine)
+# Datenbank-Tabellen erstellen bzw. um neue Spalten ergänzen
+upgrade_database(engine, catalog_pointer)
+
+# Katalog-Generation, Index für die Autovervollständigung und Spaltenkatalog laden
+with SessionLocal() as db:
+    catalog_generation.set(load_generation(db))
+    name_index.rebuild(db)
+    catalog_store.rebuild(db)
 
 # Admin-Benutzer erstellen, wenn noch keiner existiert
 try:
@@ -34,6 +47,10 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# ETag/304 für Katalog-Endpunkte anhand der Katalog-Generation
+# (vor CORS registriert, damit auch 304-Antworten CORS-Header erhalten)
+app.add_middleware(CatalogCacheMiddleware)
+
 # CORS-Middleware hinzufügen, um Cross-Origin-Anfragen zu erlauben
 app.add_middleware(
     CORSMiddleware,
@@ -41,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # API-Routen einbinden
@@ -50,6 +68,11 @@ app.include_router(decks.router)
 app.include_router(sync.router)
 app.include_router(users.router)
 
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    """Threads des Passwort-Pools beenden"""
+    password_pool.shutdown()
+
 @app.get("/")
 def read_root():
     return {"message": "Willkommen zur Magic Frog API"}
@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.auth.auth import principal_cache
+from app.db.database import get_db, get_read_db
+from app.models.models import Base
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    """Eigene In-Memory-Datenbank je Testmodul"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def session_factory(db_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    """Liste der ausgeführten SQL-Anweisungen (vor dem Zählen mit clear() leeren)"""
+    queries = []
+
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", count_queries)
+    yield queries
+    event.remove(db_engine, "before_cursor_execute", count_queries)
+
+
+@pytest.fixture
+def client(session_factory):
+    """TestClient gegen die Datenbank des Moduls (Schreib- und Lesezugriffe)"""
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Angemeldete Benutzer gehören zur Datenbank eines anderen Moduls
+    principal_cache.clear()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
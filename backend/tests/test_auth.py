@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from app.auth import auth
+from app.auth.auth import create_access_token
+from app.auth.password_pool import PasswordPool, PasswordPoolBusy
+from app.models.models import User, UserRole
+
+def login(user):
+    token = create_access_token({"sub": user.username, "user_id": user.id, "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_principal_cache(client, session_factory, query_counter, monkeypatch):
+    """Test, dass Anmeldungen zwischengespeichert und bei Änderungen verworfen werden"""
+    db = session_factory()
+    admin = User(username="admin", email="admin@example.com", hashed_password="x", role=UserRole.ADMIN)
+    frog = User(username="frog", email="frog@example.com", hashed_password="x", role=UserRole.USER)
+    db.add_all([admin, frog])
+    db.commit()
+    admin_headers, frog_headers = login(admin), login(frog)
+    frog_id = frog.id
+    db.close()
+
+    # Token wird je Anfrage nur einmal dekodiert, der Benutzer nur beim ersten Mal gelesen
+    decodes = []
+    original_decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or original_decode(*args, **kwargs))
+    assert client.get(f"/users/{frog_id}", headers=admin_headers).status_code == 200
+    assert len(decodes) == 1
+
+    query_counter.clear()
+    assert client.get("/users/me", headers=frog_headers).json()["username"] == "frog"
+    first = len(query_counter)
+    query_counter.clear()
+    assert client.get("/users/me", headers=frog_headers).json()["username"] == "frog"
+    assert len(query_counter) == first - 1
+
+    assert client.get("/users/", headers=frog_headers).status_code == 403
+
+    # Deaktivieren wirkt sofort, nicht erst nach Ablauf des Caches
+    response = client.put(f"/users/{frog_id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/users/me", headers=frog_headers).status_code == 400
+
+    assert client.delete(f"/users/{frog_id}", headers=admin_headers).status_code == 200
+    assert client.get("/users/me", headers=frog_headers).status_code == 401
+    assert client.get("/users/me", headers={"Authorization": "Bearer kaputt"}).status_code == 401
+
+@pytest.fixture
+def fast_hashes(monkeypatch):
+    """pbkdf2 mit wenigen Runden statt bcrypt, damit die Tests schnell bleiben"""
+    context = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000, pbkdf2_sha256__min_rounds=1000)
+    monkeypatch.setattr(auth, "pwd_context", context)
+    return context
+
+def test_register_login_and_rehash(client, session_factory, fast_hashes, monkeypatch):
+    """Test von Registrierung und Anmeldung über den Passwort-Pool samt Erneuerung alter Hashes"""
+    data = {"username": "pond", "email": "pond@example.com", "password": "geheim123", "password_confirm": "geheim123"}
+    assert client.post("/users/register", json=data).status_code == 200
+    assert client.post("/users/register", json=data).status_code == 400
+
+    response = client.post("/users/token", data={"username": "pond", "password": "geheim123"})
+    assert response.status_code == 200
+    assert client.post("/users/token", data={"username": "pond", "password": "falsch"}).status_code == 401
+
+    # Höhere Rundenzahl: der Hash wird bei der nächsten Anmeldung erneuert
+    db = session_factory()
+    old_hash = db.query(User).filter(User.username == "pond").one().hashed_password
+    stronger = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=2000, pbkdf2_sha256__min_rounds=2000)
+    monkeypatch.setattr(auth, "pwd_context", stronger)
+    assert client.post("/users/token", data={"username": "pond", "password": "geheim123"}).status_code == 200
+    db.expire_all()
+    new_hash = db.query(User).filter(User.username == "pond").one().hashed_password
+    db.close()
+    assert new_hash != old_hash and not stronger.needs_update(new_hash)
+    assert stronger.verify("geheim123", new_hash)
+
+def test_password_pool_sheds_load(client, fast_hashes, monkeypatch):
+    """Test, dass ein ausgelasteter Pool sofort abweist statt Anfragen zu stauen"""
+    async def scenario():
+        pool = PasswordPool(workers=1, queue_size=1)
+        gate = threading.Event()
+        running = [asyncio.ensure_future(pool.run(gate.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordPoolBusy):
+            await pool.run(gate.wait)
+        gate.set()
+        await asyncio.gather(*running)
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["completed"], stats["rejected"], stats["pending"]) == (2, 1, 0)
+
+    busy = PasswordPool(workers=1, queue_size=0)
+    busy._pending = busy.capacity
+    monkeypatch.setattr(auth, "password_pool", busy)
+    response = client.post("/users/token", data={"username": "admin", "password": "egal1234"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.models.models import Base, Card
+from app.services.autocomplete import NameIndex, name_index, normalize
+from app.services.catalog_events import notify_catalog_changed
+
+client = TestClient(app)
+
+test_names = [
+    ("Lightning Bolt", "bolt-1"),
+    ("Lightning Helix", "helix"),
+    ("Chain Lightning", "chain"),
+    ("Jötun Grunt", "jotun"),
+    ("Fire // Ice", "fire-ice"),
+    ("Bolt of Keranos", "keranos"),
+]
+
+def test_normalize():
+    """Test der Normalisierung (Akzente, Groß-/Kleinschreibung, Satzzeichen)"""
+    assert normalize("  Jötun   Grunt ") == "jotun grunt"
+    assert normalize("Fire // Ice") == "fire ice"
+
+def test_suggestions():
+    """Test der Reihenfolge: Namensanfang vor Wortanfang"""
+    index = NameIndex()
+    index.build(test_names)
+
+    assert [s["name"] for s in index.suggest("light")] == ["Lightning Bolt", "Lightning Helix", "Chain Lightning"]
+    assert [s["name"] for s in index.suggest("bolt")] == ["Bolt of Keranos", "Lightning Bolt"]
+    assert [s["name"] for s in index.suggest("light bo")] == ["Lightning Bolt"]
+    assert [s["name"] for s in index.suggest("JOTUN")] == ["Jötun Grunt"]
+    assert index.suggest("ice") == [{"id": "fire-ice", "name": "Fire // Ice"}]
+    assert index.suggest("light", limit=1) == [{"id": "bolt-1", "name": "Lightning Bolt"}]
+    assert index.suggest("  ") == []
+
+def test_size_limit():
+    """Test der Größenbegrenzung und der Speicherangabe"""
+    index = NameIndex(max_names=3)
+    index.build(test_names)
+
+    stats = index.stats()
+    assert stats["names"] == 3
+    assert stats["truncated"]
+    assert stats["memory_bytes"] > 0
+
+def test_rebuild_after_sync():
+    """Test, dass der Index nach einer Katalogänderung neu aufgebaut wird"""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    for name, card_id in test_names + [("Lightning Bolt", "bolt-2")]:
+        db.add(Card(id=card_id, name=name, type="Instant", rarity="common", set_code="tst", set_name="Test Set"))
+    db.commit()
+
+    notify_catalog_changed(db)
+    db.close()
+    assert name_index.stats()["names"] == len(test_names)
+
+    response = client.get("/cards/autocomplete", params={"q": "lightning b"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": "bolt-1", "name": "Lightning Bolt"}]
+
+    response = client.get("/cards/autocomplete/stats")
+    assert response.json()["built"]
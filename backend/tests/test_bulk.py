@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.bulk import replace_card_colors, upsert_cards, upsert_colors, upsert_sets
+from app.models.models import Base, Card, Set, card_colors
+
+# Eigene In-Memory-Datenbank für die Bulk-Tests
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def make_card(card_id, name):
+    return {
+        "id": card_id,
+        "name": name,
+        "mana_cost": "{G}",
+        "cmc": 1.0,
+        "type": "Creature — Frog",
+        "rarity": "common",
+        "text": "",
+        "set_code": "tst",
+        "set_name": "Test Set",
+        "image_url": None,
+        "image_url_small": None,
+    }
+
+def test_upsert_cards_and_colors():
+    """Test zum Einfügen und Aktualisieren per Bulk-Upsert"""
+    db = TestingSessionLocal()
+    upsert_colors(db, [{"code": "G", "name": "Green"}, {"code": "U", "name": "Blue"}])
+    upsert_sets(db, [{"code": "tst", "name": "Test Set", "release_date": None,
+                      "set_type": "core", "card_count": 2, "icon_url": None}])
+    upsert_cards(db, [make_card("a", "Frog A"), make_card("b", "Frog B")])
+    replace_card_colors(db, {"a": ["G"], "b": ["G", "U"]})
+    db.commit()
+
+    # Zweiter Lauf aktualisiert bestehende Zeilen statt sie zu duplizieren
+    upsert_cards(db, [make_card("a", "Frog A Renamed")])
+    upsert_sets(db, [{"code": "tst", "name": "Renamed Set", "release_date": None,
+                      "set_type": "core", "card_count": 2, "icon_url": None}])
+    replace_card_colors(db, {"b": ["U"]})
+    db.commit()
+
+    assert db.query(Card).count() == 2
+    assert db.get(Card, "a").name == "Frog A Renamed"
+    assert db.get(Set, "tst").name == "Renamed Set"
+    rows = db.execute(select(card_colors.c.card_id, card_colors.c.color_code)).all()
+    assert sorted(rows) == [("a", "G"), ("b", "U")]
+    db.close()
@@ -0,0 +1,96 @@
+import io
+import json
+import os
+
+import pytest
+
+from app.services import bulk_data
+from app.services.bulk_data import BulkDataCache, JsonArrayReader, iter_bulk_file
+
+# Testdaten mit Umlauten und Sonderzeichen, damit Mehrbyte-Zeichen über Blockgrenzen laufen
+test_cards = [
+    {"id": f"card-{i}", "name": f"Karte {i} – Überraschung", "colors": ["R", "G"], "cmc": i * 1.0}
+    for i in range(50)
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024 * 1024])
+def test_json_array_reader(chunk_size):
+    """Test zum inkrementellen Lesen eines JSON-Arrays mit verschiedenen Blockgrößen"""
+    data = json.dumps(test_cards, indent=2, ensure_ascii=False).encode("utf-8")
+    reader = JsonArrayReader(io.BytesIO(data), chunk_size=chunk_size)
+
+    cards = list(reader)
+    assert cards == test_cards
+    assert reader.bytes_read == len(data)
+
+def test_json_array_reader_empty():
+    """Test mit leerem Array"""
+    assert list(JsonArrayReader(io.BytesIO(b" [ ] "))) == []
+
+def test_json_array_reader_truncated():
+    """Test mit abgeschnittener Datei"""
+    data = json.dumps(test_cards).encode("utf-8")[:-20]
+    with pytest.raises(ValueError):
+        list(JsonArrayReader(io.BytesIO(data), chunk_size=16))
+
+def test_bulk_data_cache(tmp_path, monkeypatch):
+    """Test des Bulk-Caches mit komprimierter Ablage und bedingten Anfragen"""
+    requests_made = []
+
+    def fake_download(url, dest_path, headers=None, progress=None):
+        requests_made.append(headers or {})
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return {"status": 304, "size": 0, "etag": '"v1"', "last_modified": None}
+        data = json.dumps(test_cards).encode("utf-8")
+        with open(dest_path, "wb") as f:
+            f.write(data)
+        return {"status": 200, "size": len(data), "etag": '"v1"', "last_modified": None}
+
+    monkeypatch.setattr(bulk_data, "download_bulk_file", fake_download)
+    cache = BulkDataCache(str(tmp_path), keep=1)
+    info = {"type": "default_cards", "updated_at": "2025-01-01T00:00:00+00:00", "download_uri": "https://example.com/a.json"}
+
+    # Erster Abruf lädt herunter und speichert gzip-komprimiert (mit Fortschritt beim Komprimieren)
+    monkeypatch.setattr(bulk_data, "PROGRESS_INTERVAL", 1)
+    progress = []
+    first = cache.fetch(info, progress=progress.append)
+    assert progress and progress[-1] == len(json.dumps(test_cards).encode("utf-8"))
+    assert not first.from_cache
+    assert first.path.endswith(".json.gz")
+    assert list(iter_bulk_file(first.path)) == test_cards
+
+    # Gleicher Stand: keine Anfrage
+    assert cache.fetch(info).from_cache
+    assert len(requests_made) == 1
+
+    # Neuer Stand mit gleichem ETag: 304, Datei wird weiterverwendet
+    newer = dict(info, updated_at="2025-01-02T00:00:00+00:00")
+    second = cache.fetch(newer)
+    assert second.from_cache
+    assert requests_made[-1]["If-None-Match"] == '"v1"'
+    assert cache.latest("default_cards").updated_at == newer["updated_at"]
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".json.gz")]) == 1
+
+def test_bulk_data_cache_unexpected_not_modified(tmp_path, monkeypatch):
+    """Test, dass ein 304 ohne gecachte Datei erneut ohne Cache angefragt wird"""
+    responses = [304, 200]
+    requests_made = []
+
+    def fake_download(url, dest_path, headers=None, progress=None):
+        requests_made.append(headers or {})
+        status = responses.pop(0) if responses else 304
+        if status == 304:
+            return {"status": 304, "size": 0, "etag": None, "last_modified": None}
+        with open(dest_path, "w") as f:
+            json.dump(test_cards, f)
+        return {"status": 200, "size": os.path.getsize(dest_path), "etag": '"v1"', "last_modified": None}
+
+    monkeypatch.setattr(bulk_data, "download_bulk_file", fake_download)
+    info = {"type": "default_cards", "updated_at": "2025-01-01T00:00:00+00:00", "download_uri": "https://example.com/a.json"}
+    bulk_file = BulkDataCache(str(tmp_path / "a")).fetch(info)
+    assert list(iter_bulk_file(bulk_file.path)) == test_cards
+    assert requests_made == [{}, {"Cache-Control": "no-cache"}]
+
+    # Bleibt es beim 304, gibt es eine klare Fehlermeldung statt FileNotFoundError
+    with pytest.raises(ValueError):
+        BulkDataCache(str(tmp_path / "b")).fetch(info)
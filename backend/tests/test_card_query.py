@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.bulk import upsert_colors
+from app.models.models import Base, Card
+from app.services.card_query import (
+    And, Not, Or, QuerySyntaxError, Term, cache_info, compile_query, normalize_query, parse_query
+)
+from app.services.catalog_sync import CardChangeTracker
+from app.services.search import ensure_search_index
+
+# Eigene In-Memory-Datenbank mit FTS-Index
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
+
+def make_card(card_id, name, type_line, text, cmc, rarity, set_code):
+    return {
+        "id": card_id, "name": name, "mana_cost": None, "cmc": cmc, "type": type_line,
+        "rarity": rarity, "text": text, "set_code": set_code, "set_name": set_code.upper(),
+        "image_url": None, "image_url_small": None,
+    }
+
+test_cards = [
+    (make_card("bolt", "Lightning Bolt", "Instant", "Lightning Bolt deals 3 damage to any target.", 1, "common", "lea"), ["R"]),
+    (make_card("huntmaster", "Huntmaster of the Fells", "Legendary Creature — Human Werewolf",
+               "When this creature enters, create a 2/2 green Wolf creature token and you gain 2 life.", 4, "mythic", "dka"), ["R", "G"]),
+    (make_card("seer", "Tireless Tracker", "Creature — Human Scout",
+               "Whenever you sacrifice a Clue, draw a card.", 3, "Rare", "soi"), ["G"]),
+    (make_card("ring", "Sol Ring", "Artifact", "{T}: Add {C}{C}.", 1, "uncommon", "lea"), []),
+    (make_card("bloodbraid", "Bloodbraid Elf", "Creature — Elf Berserker",
+               "Cascade. Haste. You may draw a card.", 4, "uncommon", "neo"), ["R", "G"]),
+]
+
+@pytest.fixture(scope="module")
+def db():
+    session = TestingSessionLocal()
+    upsert_colors(session, [{"code": code, "name": code} for code in "WUBRG"])
+    CardChangeTracker(session).write_batch(test_cards)
+    session.commit()
+    yield session
+    session.close()
+
+def search(db, query, use_fts=True):
+    condition = compile_query(normalize_query(query), use_fts)
+    return sorted(card.id for card in db.query(Card).filter(condition))
+
+def test_parse():
+    """Test des Parsers für Felder, Negation, Alternativen und Klammern"""
+    node = parse_query(normalize_query('T:Creature -c:w (bolt OR o:"draw a card")'))
+    assert node == And((
+        Term("type", ":", "creature"),
+        Not(Term("color", ":", "w")),
+        Or((Term("name", ":", "bolt"), Term("oracle", ":", "draw a card", True))),
+    ))
+    assert parse_query("") is None
+
+@pytest.mark.parametrize("query", ["foo:bar", "(t:creature", "t:creature)", "cmc>=drei", "c:xyz", "r:legendary", "()", "t>=elf"])
+def test_syntax_errors(query):
+    """Test, dass ungültige Anfragen mit QuerySyntaxError abgelehnt werden"""
+    with pytest.raises(QuerySyntaxError):
+        compile_query(normalize_query(query), True)
+
+@pytest.mark.parametrize("use_fts", [True, False])
+def test_search(db, use_fts):
+    """Test der übersetzten Bedingungen mit und ohne FTS-Index"""
+    assert search(db, "t:creature c:rg cmc>=3", use_fts) == ["bloodbraid", "huntmaster"]
+    assert search(db, 'o:"draw a card"', use_fts) == ["bloodbraid", "seer"]
+    assert search(db, "c=rg r:mythic", use_fts) == ["huntmaster"]
+    assert search(db, "c:c", use_fts) == ["ring"]
+    assert search(db, "c:m", use_fts) == ["bloodbraid", "huntmaster"]
+    assert search(db, "c<=r", use_fts) == ["bolt", "ring"]
+    assert search(db, "r>=rare", use_fts) == ["huntmaster", "seer"]
+    # Großgeschriebene Seltenheit wie beim Set-Import
+    assert search(db, "r:rare", use_fts) == ["seer"]
+    assert search(db, "r!=rare t:creature", use_fts) == ["bloodbraid", "huntmaster"]
+    assert search(db, "s:lea -t:artifact", use_fts) == ["bolt"]
+    assert search(db, "light or sol", use_fts) == ["bolt", "ring"]
+    assert search(db, "t:creature (c:g -c:r or mv<2)", use_fts) == ["seer"]
+
+def test_cache():
+    """Test, dass gleiche Anfragen nur einmal übersetzt werden"""
+    before = cache_info()["compile"]["hits"]
+    first = compile_query(normalize_query("t:elf  CMC>2"), True)
+    second = compile_query(normalize_query("T:Elf cmc>2"), True)
+    assert first is second
+    assert cache_info()["compile"]["hits"] == before + 1
@@ -0,0 +1,84 @@
+import json
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app.api import cards
+from app.models.models import Card, Color, Deck, DeckCard, Set
+from app.schemas import schemas
+from app.services.card_serializer import (
+    SET_COLUMNS, card_payload_cache, encode_card, encode_cards, encode_deck, encode_sets,
+)
+
+@pytest.fixture(scope="module", autouse=True)
+def catalog(session_factory):
+    db = session_factory()
+    db.add(Set(code="neo", name="Kamigawa: Neon Dynasty", release_date="2022-02-18", card_count=302))
+    red, green = Color(code="R", name="Red"), Color(code="G", name="Green")
+    db.add_all([red, green])
+    db.add(Card(id="c1", name="Jötun Grunt", mana_cost="{1}{R}{G}", cmc=3.0, type="Creature", rarity="rare",
+                text="Trample", set_code="neo", set_name="Kamigawa: Neon Dynasty", colors=[red, green]))
+    db.add(Card(id="c2", name="Island", cmc=0.0, type="Basic Land — Island", rarity="common",
+                set_code="zzz", set_name="Unbekannt"))
+    deck = Deck(name="Gruul", description=None)
+    deck.deck_cards = [DeckCard(card_id="c1", quantity=4), DeckCard(card_id="c2", quantity=1, is_sideboard=True)]
+    db.add(deck)
+    db.commit()
+    db.close()
+
+def sorted_colors(card):
+    """Farben ohne Reihenfolge vergleichen (die ORM-Beziehung hat keine feste Sortierung)"""
+    return {**card, "colors": sorted(card["colors"], key=lambda color: color["code"])}
+
+def test_same_json_as_schemas(session_factory):
+    """Test, dass der schnelle Weg dieselben Daten liefert wie die Pydantic-Schemas"""
+    card_payload_cache.clear()
+    db = session_factory()
+    cards = db.query(Card).order_by(Card.id).all()
+    adapter = TypeAdapter(List[schemas.Card])
+    expected = [sorted_colors(card) for card in json.loads(adapter.dump_json(adapter.validate_python(cards, from_attributes=True)))]
+    assert json.loads(encode_cards(db, ["c1", "c2", "fehlt"])) == expected
+    assert json.loads(encode_card(db, "c1")) == expected[0]
+    assert encode_card(db, "fehlt") is None
+
+    adapter = TypeAdapter(List[schemas.Set])
+    expected_sets = json.loads(adapter.dump_json(adapter.validate_python(db.query(Set).all(), from_attributes=True)))
+    assert json.loads(encode_sets(db.execute(select(*SET_COLUMNS)))) == expected_sets
+
+    deck = db.query(Deck).one()
+    expected_deck = json.loads(schemas.DeckWithCards.model_validate(deck, from_attributes=True).model_dump_json())
+    for deck_card in expected_deck["deck_cards"]:
+        deck_card["card"] = sorted_colors(deck_card["card"])
+    assert json.loads(encode_deck(db, deck.id)) == expected_deck
+    assert encode_deck(db, 999) is None
+    db.close()
+
+def test_payload_cache(session_factory, query_counter):
+    """Test, dass bereits kodierte Karten ohne Datenbankabfrage geliefert werden"""
+    card_payload_cache.clear()
+    db = session_factory()
+    first = encode_cards(db, ["c2", "c1"])
+    query_counter.clear()
+    assert encode_cards(db, ["c2", "c1"]) == first
+    assert query_counter == []
+    assert card_payload_cache.stats()["entries"] == 2
+    db.close()
+
+def test_card_batch_endpoint(client, query_counter):
+    """Test der Batch-Abfrage in Anfragereihenfolge mit Fehlzugriffen"""
+    card_payload_cache.clear()
+    ids = ["c2", "fehlt", "c1", "c2"] + [f"x{i}" for i in range(1200)]
+    query_counter.clear()
+    response = client.post("/cards/batch", json={"ids": ids})
+    assert response.status_code == 200
+    data = response.json()
+    assert [card and card["id"] for card in data["cards"][:4]] == ["c2", None, "c1", "c2"]
+    assert len(data["cards"]) == len(ids)
+    assert data["missing"][0] == "fehlt" and len(data["missing"]) == 1201
+    # Drei Blöcke mit je einer Abfrage für Karten und Farben
+    assert len(query_counter) == 6
+
+    too_many = client.post("/cards/batch", json={"ids": ["c1"] * (cards.CARD_BATCH_MAX_IDS + 1)})
+    assert too_many.status_code == 400
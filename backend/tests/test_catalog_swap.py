@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.catalog_attach import CatalogPointer, attach_catalog
+from app.db.database import configure_sqlite
+from app.models.models import Base, Card, Deck, DeckCard, SyncRun
+from app.scripts import sync_cards
+from app.services import bulk_data
+from app.services.bulk_data import BulkDataCache
+from app.services.catalog_swap import copy_catalog, prune_catalogs, upgrade_database
+from app.services.catalog_sync import CardChangeTracker
+from app.services.search import has_fts
+
+BULK_INFO = {
+    "type": "default_cards",
+    "updated_at": "2025-01-01T10:00:00.000+00:00",
+    "download_uri": "https://data.scryfall.io/default-cards/default-cards-20250101.json",
+}
+
+DECK_QUERY = text(
+    "SELECT cards.name FROM deck_cards JOIN cards ON cards.id = deck_cards.card_id ORDER BY cards.name"
+)
+
+def make_engines(tmp_path):
+    """Hauptdatenbank ohne und mit eingebundenem Katalog (wie writer_engine bzw. read_engine)"""
+    url = f"sqlite:///{tmp_path / 'main.db'}"
+    pointer = CatalogPointer(str(tmp_path / "main.db"))
+    plain = configure_sqlite(create_engine(url))
+    attached = attach_catalog(configure_sqlite(create_engine(url)), pointer.current)
+    return pointer, plain, attached
+
+def test_upgrade_moves_catalog_and_swaps(tmp_path):
+    """Test der Übernahme vorhandener Katalogdaten und des Austauschs beim nächsten Auschecken"""
+    pointer, plain, attached = make_engines(tmp_path)
+    Base.metadata.create_all(bind=plain)
+    with sessionmaker(bind=plain)() as db:
+        db.add(Card(id="frog", name="Frog", rarity="common", set_code="tst", set_name="Test"))
+        db.add(Deck(name="Frogs", deck_cards=[DeckCard(card_id="frog", quantity=4)]))
+        db.commit()
+
+    upgrade_database(plain, pointer)
+    first = pointer.current()
+    assert os.path.basename(first).startswith("catalog-initial-")
+    assert "cards" not in inspect(plain).get_table_names()
+    assert "deck_cards" in inspect(plain).get_table_names()
+
+    # Joins zwischen Hauptdatenbank und Katalog funktionieren unverändert
+    with sessionmaker(bind=attached)() as db:
+        assert db.execute(DECK_QUERY).scalars().all() == ["Frog"]
+        assert has_fts(db)
+
+    # Erneuter Start ändert nichts
+    upgrade_database(plain, pointer)
+    assert pointer.current() == first
+
+    # Neuer Katalog: laufende Verbindungen lesen weiter den alten Stand
+    second = pointer.catalog_path("catalog-run1-20250101000000000000.db")
+    copy_catalog(first, second)
+    catalog = create_engine(f"sqlite:///{second}")
+    with catalog.begin() as conn:
+        conn.execute(text("UPDATE cards SET name = 'Toad'"))
+    catalog.dispose()
+
+    with attached.connect() as conn:
+        pointer.publish(second)
+        assert conn.execute(DECK_QUERY).scalars().all() == ["Frog"]
+    with attached.connect() as conn:
+        assert conn.execute(DECK_QUERY).scalars().all() == ["Toad"]
+
+    # Nur der aktive Katalog bleibt bei keep=1
+    assert prune_catalogs(pointer, keep=1) == [first]
+    assert not os.path.exists(first) and os.path.exists(second)
+    attached.dispose()
+    plain.dispose()
+
+def test_upgrade_moves_catalog_once(tmp_path):
+    """Test, dass bei gleichzeitigem Start mehrerer Worker nur einer den Katalog übernimmt"""
+    url = f"sqlite:///{tmp_path / 'main.db'}"
+    setup = create_engine(url)
+    Base.metadata.create_all(bind=setup)
+    with sessionmaker(bind=setup)() as db:
+        db.add(Card(id="frog", name="Frog", rarity="common", set_code="tst", set_name="Test"))
+        db.commit()
+    setup.dispose()
+
+    engines = [configure_sqlite(create_engine(url)) for _ in range(4)]
+    errors = []
+
+    def start_worker(engine):
+        try:
+            upgrade_database(engine, CatalogPointer(str(tmp_path / "main.db")))
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=start_worker, args=(engine,)) for engine in engines]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert errors == []
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("catalog-")]) == 1
+    pointer = CatalogPointer(str(tmp_path / "main.db"))
+    with create_engine(f"sqlite:///{pointer.current()}").connect() as conn:
+        assert conn.execute(text("SELECT name FROM cards")).scalars().all() == ["Frog"]
+    for engine in engines:
+        engine.dispose()
+
+def test_prune_keeps_previous_catalog(tmp_path):
+    """Test, dass die Kopie eines abgebrochenen Laufs nicht den vorherigen Katalog verdrängt"""
+    pointer = CatalogPointer(str(tmp_path / "main.db"))
+    names = ["catalog-initial-1.db", "catalog-run1-2.db", "catalog-run2-3.db", "catalog-run3-4.db"]
+    for age, name in enumerate(names):
+        path = pointer.catalog_path(name)
+        open(path, "w").close()
+        os.utime(path, (time.time() - 100 + age, time.time() - 100 + age))
+    # Lauf 2 ist abgebrochen, Lauf 3 (neuester Katalog) wird aktiv
+    pointer.publish(pointer.catalog_path("catalog-run3-4.db"))
+
+    removed = prune_catalogs(pointer, keep=2, abandoned=[pointer.catalog_path("catalog-run2-3.db")])
+    assert sorted(os.path.basename(path) for path in removed) == ["catalog-initial-1.db", "catalog-run2-3.db"]
+    assert sorted(os.listdir(tmp_path)) == ["catalog-run1-2.db", "catalog-run3-4.db", "main.db.catalog"]
+
+@pytest.fixture
+def blue_green_sync(tmp_path, monkeypatch):
+    """Sync gegen eine Datei-Datenbank mit Blue/Green-Katalog und lokalen Testdaten"""
+    pointer, plain, attached = make_engines(tmp_path)
+    bulk_cards = [
+        {
+            "id": f"bulk-{i}", "name": f"Bulk Frog {i}", "layout": "normal", "mana_cost": "{G}", "cmc": 1.0,
+            "type_line": "Creature — Frog", "rarity": "common", "oracle_text": "", "set": "tst",
+            "set_name": "Test Set", "colors": ["G"], "image_uris": {"normal": "n.jpg", "small": "s.jpg"},
+        }
+        for i in range(10)
+    ]
+
+    def fake_download(url, dest_path, headers=None, progress=None):
+        with open(dest_path, "w") as f:
+            json.dump(bulk_cards, f)
+        return {"status": 200, "size": 0, "etag": None, "last_modified": None}
+
+    monkeypatch.setattr(sync_cards, "catalog_pointer", pointer)
+    monkeypatch.setattr(sync_cards, "writer_engine", plain)
+    monkeypatch.setattr(sync_cards, "WriterSessionLocal", sessionmaker(bind=plain))
+    monkeypatch.setattr(sync_cards, "bulk_cache", BulkDataCache(str(tmp_path / "bulk")))
+    monkeypatch.setattr(sync_cards, "get_bulk_data_info", lambda: dict(BULK_INFO))
+    monkeypatch.setattr(sync_cards, "fetch_json", lambda url, params=None: {"data": []})
+    monkeypatch.setattr(bulk_data, "download_bulk_file", fake_download)
+    yield pointer, sessionmaker(bind=attached)
+    attached.dispose()
+    plain.dispose()
+
+def test_blue_green_sync(blue_green_sync, monkeypatch):
+    """Test, dass ein Sync erst nach Abschluss sichtbar wird und abgebrochene Läufe ihre Kopie fortsetzen"""
+    pointer, ReadSession = blue_green_sync
+    original_write_batch = CardChangeTracker.write_batch
+    calls = []
+
+    def failing_write_batch(self, batch):
+        calls.append(len(batch))
+        if len(calls) == 3:
+            raise RuntimeError("Verbindung verloren")
+        return original_write_batch(self, batch)
+
+    monkeypatch.setattr(CardChangeTracker, "write_batch", failing_write_batch)
+    with pytest.raises(RuntimeError):
+        sync_cards.sync_database(batch_size=3)
+
+    # Die API sieht den unvollständigen Import nicht
+    with ReadSession() as db:
+        run = db.query(SyncRun).one()
+        assert run.status == "failed" and run.checkpoint_index == 6
+        assert db.query(Card).count() == 0
+        shadow = pointer.catalog_path(run.catalog_file)
+    assert shadow != pointer.current()
+    with create_engine(f"sqlite:///{shadow}").connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM cards")).scalar() == 6
+
+    # Fortsetzung schreibt in dieselbe Kopie und aktiviert sie
+    monkeypatch.setattr(CardChangeTracker, "write_batch", original_write_batch)
+    summary = sync_cards.sync_database(batch_size=3)
+    assert summary["added"] == 10
+    assert pointer.current() == shadow
+    with ReadSession() as db:
+        assert db.query(Card).count() == 10
+        assert db.query(SyncRun).one().status == "completed"
+        assert has_fts(db)
+
+    # Unveränderter Bulk-Stand: keine Kopie, kein Austausch
+    catalogs = sorted(os.listdir(pointer.directory))
+    assert sync_cards.sync_database(batch_size=3)["skipped"] is True
+    assert sorted(os.listdir(pointer.directory)) == catalogs
+    assert pointer.current() == shadow
+
+    # Jeder erzwungene Lauf baut eine neue Kopie; aufbewahrt werden aktive und vorherige Datei
+    sync_cards.sync_database(batch_size=3, force=True)
+    sync_cards.sync_database(batch_size=3, force=True)
+    catalogs = [name for name in os.listdir(pointer.directory) if name.startswith("catalog-")]
+    assert len(catalogs) == 2
+    assert os.path.basename(pointer.current()) in catalogs
+    with ReadSession() as db:
+        assert db.query(Card).count() == 10
+
+def test_update_database_rejected_in_blue_green(tmp_path, monkeypatch):
+    """Test, dass der Set-Import nicht am Blue/Green-Katalog vorbei in den aktiven Katalog schreibt"""
+    from fastapi.testclient import TestClient
+    from app.api import cards
+    from app.db.database import get_db
+    from main import app
+
+    monkeypatch.setattr(cards, "catalog_pointer", CatalogPointer(str(tmp_path / "main.db")))
+    monkeypatch.setattr(cards, "update_card_database", lambda db: pytest.fail("Import darf nicht starten"))
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        response = TestClient(app).post("/cards/update-database/")
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
+    assert response.status_code == 409
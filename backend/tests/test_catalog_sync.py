@@ -0,0 +1,93 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Base, Card, Deck, DeckCard
+from app.services.catalog_sync import CardChangeTracker
+
+# Eigene In-Memory-Datenbank für die Sync-Tests
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def make_card(card_id, text="Hop."):
+    return {
+        "id": card_id,
+        "name": f"Frog {card_id}",
+        "mana_cost": "{G}",
+        "cmc": 1.0,
+        "type": "Creature — Frog",
+        "rarity": "common",
+        "text": text,
+        "set_code": "tst",
+        "set_name": "Test Set",
+        "image_url": None,
+        "image_url_small": None,
+    }
+
+def test_incremental_sync():
+    """Test, dass nur geänderte Karten geschrieben und entfernte gelöscht werden"""
+    db = TestingSessionLocal()
+
+    # Erster Lauf: alles neu
+    tracker = CardChangeTracker(db)
+    written = tracker.write_batch([(make_card("a"), ["G"]), (make_card("b"), []), (make_card("c"), [])])
+    tracker.remove_missing()
+    db.commit()
+    assert written == 3
+    assert tracker.summary()["added"] == 3
+
+    # Karte "c" wird in einem Deck verwendet
+    deck = Deck(name="Frogs")
+    db.add(deck)
+    db.flush()
+    db.add(DeckCard(deck_id=deck.id, card_id="c", quantity=1))
+    db.commit()
+
+    # Zweiter Lauf: a unverändert, b mit neuem Text, c und d fehlen upstream
+    db.add(Card(**make_card("d")))
+    db.commit()
+    tracker = CardChangeTracker(db)
+    written = tracker.write_batch([(make_card("a"), ["G"]), (make_card("b", text="Croak."), [])])
+    tracker.remove_missing()
+    db.commit()
+
+    summary = tracker.summary()
+    assert written == 1
+    assert summary["unchanged"] == 1
+    assert summary["ids"]["updated"] == ["b"]
+    assert summary["ids"]["removed"] == ["d"]
+    assert db.get(Card, "b").text == "Croak."
+    assert db.get(Card, "c") is not None
+    assert db.get(Card, "d") is None
+
+    # Farbänderung zählt ebenfalls als Änderung
+    tracker = CardChangeTracker(db)
+    assert tracker.write_batch([(make_card("a"), ["G", "U"])]) == 1
+    db.close()
+
+def test_duplicate_ids_across_batches():
+    """Test, dass spätere Kopien einer Karte mit der ersten Kopie des Laufs verglichen werden"""
+    db = TestingSessionLocal()
+    tracker = CardChangeTracker(db)
+    tracker.write_batch([(make_card("dup"), [])])
+    db.commit()
+
+    # Erste Kopie unverändert, zweite geändert: Aktualisierung, keine neue Karte
+    tracker = CardChangeTracker(db)
+    assert tracker.write_batch([(make_card("dup"), [])]) == 0
+    assert tracker.write_batch([(make_card("dup", text="Croak."), [])]) == 1
+    # Weitere identische Kopie ist unverändert und wird nicht erneut gezählt
+    assert tracker.write_batch([(make_card("dup", text="Croak."), [])]) == 0
+    db.commit()
+
+    summary = tracker.summary()
+    assert summary["added"] == 0
+    assert summary["ids"]["updated"] == ["dup"]
+    assert summary["unchanged"] == 2
+    assert db.get(Card, "dup").text == "Croak."
+    db.close()
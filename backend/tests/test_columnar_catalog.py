@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.db.bulk import upsert_colors
+from app.db.database import get_db, get_read_db
+from app.models.models import Base
+from app.services.catalog_events import notify_catalog_changed
+from app.services.catalog_sync import CardChangeTracker
+from app.services.columnar_catalog import CatalogFilter, catalog_store, sql_facets
+
+np = pytest.importorskip("numpy")
+
+# Eigene In-Memory-Datenbank für den Katalog
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def make_card(card_id, name, type_line, cmc, rarity, set_code):
+    return {
+        "id": card_id, "name": name, "mana_cost": None, "cmc": cmc, "type": type_line,
+        "rarity": rarity, "text": None, "set_code": set_code, "set_name": set_code.upper(),
+        "image_url": None, "image_url_small": None,
+    }
+
+test_cards = [
+    (make_card("bolt", "Lightning Bolt", "Instant", 1.0, "common", "lea"), ["R"]),
+    (make_card("huntmaster", "Huntmaster of the Fells", "Legendary Creature — Human Werewolf", 4.0, "mythic", "dka"), ["R", "G"]),
+    (make_card("tracker", "Tireless Tracker", "Creature — Human Scout", 3.0, "rare", "soi"), ["G"]),
+    (make_card("ring", "Sol Ring", "Artifact", 1.0, "uncommon", "lea"), []),
+    (make_card("bloodbraid", "Bloodbraid Elf", "Creature — Elf Berserker", 4.0, "uncommon", "neo"), ["R", "G"]),
+    (make_card("emrakul", "Emrakul, the Aeons Torn", "Legendary Creature — Eldrazi", 15.0, "mythic", "roe"), []),
+    (make_card("land", "Forest", "Basic Land — Forest", None, "common", "lea"), []),
+]
+
+filters = [
+    CatalogFilter(),
+    CatalogFilter(card_type="creature"),
+    CatalogFilter(colors="rg"),
+    CatalogFilter(colors="rg", color_mode="exact"),
+    CatalogFilter(colors="r", color_mode="within"),
+    CatalogFilter(colors="c"),
+    CatalogFilter(rarity="mythic", cmc_min=4),
+    CatalogFilter(set_code="lea", cmc_max=1),
+    CatalogFilter(name="BOLT"),
+    CatalogFilter(set_name="NEO"),
+    CatalogFilter(rarity="unbekannt"),
+]
+
+@pytest.fixture(scope="module")
+def db():
+    session = TestingSessionLocal()
+    upsert_colors(session, [{"code": code, "name": code} for code in "WUBRG"])
+    CardChangeTracker(session).write_batch(test_cards)
+    session.commit()
+    notify_catalog_changed(session)
+    yield session
+    session.close()
+
+@pytest.mark.parametrize("catalog_filter", filters)
+def test_columnar_matches_sql(db, catalog_filter):
+    """Test, dass Spaltenkatalog und SQL-Fallback dieselben Ergebnisse und Facetten liefern"""
+    assert catalog_store.current is not None
+    assert catalog_store.current.search(catalog_filter, limit=3) == sql_facets(db, catalog_filter, limit=3)
+
+def test_facets(db):
+    """Test der Facetten für einen Filter"""
+    total, ids, facets = catalog_store.current.search(CatalogFilter(card_type="creature"))
+    assert total == 4
+    assert ids == ["bloodbraid", "emrakul", "huntmaster", "tracker"]
+    assert facets["rarity"] == {"mythic": 2, "rare": 1, "uncommon": 1}
+    assert facets["cmc"] == {"3": 1, "4": 2, "15": 1}
+    assert facets["color"] == {"R": 2, "G": 3, "C": 1, "M": 2}
+
+def test_facets_endpoint(db):
+    """Test des Endpunkts inkl. Fehlerbehandlung"""
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_read_db] = lambda: db
+    try:
+        client = TestClient(app)
+        response = client.get("/cards/facets", params={"colors": "g", "limit": 1})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["engine"] == "columnar"
+        assert data["total"] == 3
+        assert [card["id"] for card in data["cards"]] == ["bloodbraid"]
+        # Karten wie bei /cards/{id} kodiert
+        assert data["cards"][0] == client.get("/cards/bloodbraid").json()
+
+        response = client.get("/cards/facets", params={"colors": "x"})
+        assert response.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
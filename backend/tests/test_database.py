@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import database
+from app.db.database import async_database_url, configure_sqlite, get_read_db, is_sqlite_file, run_db
+from app.models.models import Base, Card
+from app.services.card_serializer import card_payload_cache, encode_card
+
+def make_card(db):
+    db.add(Card(id="frog", name="Frog", rarity="common", set_code="tst", set_name="Test"))
+    db.commit()
+
+def test_async_database_url():
+    """Test der Ableitung der Async-URL aus DATABASE_URL"""
+    assert async_database_url("sqlite:///./magic_cards.db") == "sqlite+aiosqlite:///./magic_cards.db"
+    assert async_database_url("postgresql://frog:pw@db/magic") == "postgresql+asyncpg://frog:pw@db/magic"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://frog@db/magic")
+
+def test_sqlite_profile(tmp_path):
+    """Test der PRAGMAs je Verbindung und des schreibgeschützten Lesepools"""
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    assert is_sqlite_file(url)
+    assert not is_sqlite_file("sqlite:///:memory:") and not is_sqlite_file("postgresql://db/magic")
+
+    writer = configure_sqlite(create_engine(url), tuned=True)
+    reader = configure_sqlite(create_engine(url), read_only=True, tuned=True)
+    Base.metadata.create_all(bind=writer)
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == database.SQLITE_BUSY_TIMEOUT
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == database.SQLITE_CACHE_SIZE
+    with sessionmaker(bind=writer)() as db:
+        make_card(db)
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT name FROM cards")).scalar() == "Frog"
+        with pytest.raises(OperationalError):
+            conn.execute(text("DELETE FROM cards"))
+    writer.dispose()
+    reader.dispose()
+
+def test_run_db_sync_session(tmp_path):
+    """Test, dass synchrone Sessions im Threadpool statt in der Event-Loop laufen"""
+    assert database.DB_ASYNC or get_read_db is database.get_read_only_db
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        make_card(db)
+        card_payload_cache.clear()
+        loop_thread = threading.get_ident()
+        thread, payload = asyncio.run(run_db(db, lambda session: (threading.get_ident(), encode_card(session, "frog"))))
+        assert thread != loop_thread
+        assert b'"name":"Frog"' in payload.replace(b" ", b"")
+    engine.dispose()
+
+def test_run_db_async_session(tmp_path):
+    """Test der AsyncSession über run_sync (nur mit installiertem aiosqlite)"""
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        make_card(db)
+    engine.dispose()
+
+    async def scenario():
+        async_engine = create_async_engine(async_database_url(url))
+        async with async_sessionmaker(async_engine)() as db:
+            card_payload_cache.clear()
+            payload = await run_db(db, encode_card, "frog")
+            missing = await run_db(db, encode_card, "toad")
+        await async_engine.dispose()
+        return payload, missing
+
+    payload, missing = asyncio.run(scenario())
+    assert b'"name":"Frog"' in payload.replace(b" ", b"")
+    assert missing is None
@@ -0,0 +1,46 @@
+import pytest
+
+from app.models.models import Card, Color, Deck, DeckCard, Set
+from app.services.card_serializer import card_payload_cache
+
+@pytest.fixture(scope="module", autouse=True)
+def catalog(session_factory):
+    db = session_factory()
+    db.add(Set(code="tst", name="Test Set"))
+    colors = [Color(code="R", name="Red"), Color(code="G", name="Green")]
+    db.add_all(colors)
+    for i in range(60):
+        db.add(Card(id=f"card-{i}", name=f"Card {i}", type="Creature", rarity="common",
+                    set_code="tst", set_name="Test Set", colors=colors[: i % 3]))
+    # Ein kleines und ein großes Deck
+    for name, size in (("Klein", 3), ("Groß", 60)):
+        deck = Deck(name=name)
+        deck.deck_cards = [DeckCard(card_id=f"card-{i}", quantity=1 + i % 4) for i in range(size)]
+        db.add(deck)
+    db.commit()
+    db.close()
+
+def test_deck_reads_constant_queries(client, query_counter):
+    """Test, dass die Zahl der Abfragen nicht von der Deckgröße abhängt"""
+    def count(func):
+        query_counter.clear()
+        response = func()
+        assert response.status_code < 300
+        return len(query_counter)
+
+    card_payload_cache.clear()
+    small, large = 1, 2
+    assert count(lambda: client.get(f"/decks/{small}")) == count(lambda: client.get(f"/decks/{large}"))
+    card_payload_cache.clear()
+    assert count(lambda: client.get(f"/decks/{large}")) <= 5
+
+    listing = count(lambda: client.get("/decks/"))
+    assert listing <= 5
+    decks = client.get("/decks/").json()
+    assert len(decks[1]["deck_cards"]) == 60
+    assert decks[1]["deck_cards"][2]["card"]["colors"]
+
+    # Schreibzugriffe liefern das Deck ebenfalls ohne Nachladen je Karte
+    small_write = count(lambda: client.post(f"/decks/{small}/cards/card-10"))
+    large_write = count(lambda: client.post(f"/decks/{large}/cards/card-10"))
+    assert small_write == large_write
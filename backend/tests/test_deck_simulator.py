@@ -0,0 +1,134 @@
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.db.database import get_db, get_read_db
+from app.models.models import Base, Card, Deck, DeckCard
+from app.services import deck_simulator
+from app.services.deck_simulator import DeckEntry, SimulationSettings, hypergeom_at_least, simulate_deck
+
+# Eigene In-Memory-Datenbank für die Simulation
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+DECK = [
+    DeckEntry("forest", "Forest", 24, 0.0, True),
+    DeckEntry("bear", "Grizzly Bears", 4, 2.0, False),
+    DeckEntry("giant", "Hill Giant", 32, 4.0, False),
+]
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def test_exact_odds():
+    """Test der hypergeometrischen Werte"""
+    result = simulate_deck(DECK, SimulationSettings(samples=0, targets=[("bear", 2)]))
+    assert result["opening_hand_lands"]["0"] == pytest.approx(0.021615, abs=1e-6)
+    assert sum(result["opening_hand_lands"].values()) == pytest.approx(1.0, abs=1e-5)
+    assert result["land_drops"]["2"] == pytest.approx(hypergeom_at_least(60, 24, 8, 2), abs=1e-6)
+    # Mindestens eines von vier Exemplaren unter 8 Karten
+    assert result["targets"][0]["seen"] == pytest.approx(1 - math.comb(56, 8) / math.comb(60, 8), abs=1e-6)
+
+def test_monte_carlo_matches_exact():
+    """Test, dass die Simulation ohne Mulligan den exakten Werten entspricht"""
+    pytest.importorskip("numpy")
+    settings = SimulationSettings(samples=40000, seed=7, max_mulligans=0, targets=[("bear", 3), ("giant", 4)])
+    result = simulate_deck(DECK, settings)
+    simulation = result["simulation"]
+    assert simulation["samples"] == 40000 and not simulation["truncated"]
+    assert simulation["mulligans"] == {"0": 1.0}
+    for turn, probability in result["land_drops"].items():
+        assert simulation["land_drops"][turn] == pytest.approx(probability, abs=0.01)
+    for target in result["targets"]:
+        assert target["castable"] <= target["seen"] + 0.01
+
+    # Mit Mulligans werden schlechte Hände seltener behalten
+    with_mulligans = simulate_deck(DECK, SimulationSettings(samples=40000, seed=7, max_mulligans=2))
+    assert with_mulligans["simulation"]["land_drops"]["2"] > simulation["land_drops"]["2"]
+
+def test_targets_after_turns():
+    """Test, dass Ziele nach `turns` mit ausreichend vielen gezogenen Karten simuliert werden"""
+    pytest.importorskip("numpy")
+    deck = DECK + [DeckEntry("elf", "Llanowar Elves", 4, 1.0, False)]
+    settings = SimulationSettings(turns=4, samples=40000, seed=3, max_mulligans=0, targets=[("elf", 10)])
+    target = simulate_deck(deck, settings)["targets"][0]
+    assert target["seen"] == pytest.approx(1 - math.comb(60, 16) / math.comb(64, 16), abs=1e-6)
+    assert target["castable"] == pytest.approx(target["seen"], abs=0.02)
+
+def test_large_deck_bounds(monkeypatch):
+    """Test, dass große Decks kleinere Blöcke ergeben und die Deckgröße begrenzt ist"""
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(deck_simulator, "SIMULATION_BATCH_ELEMENTS", 60000)
+    big = [DeckEntry("forest", "Forest", 240, 0.0, True), DeckEntry("giant", "Hill Giant", 360, 4.0, False)]
+    result = simulate_deck(big, SimulationSettings(samples=10 ** 6, time_limit=0.01))
+    assert result["simulation"]["truncated"]
+    assert result["simulation"]["samples"] < 10 ** 6
+    assert result["simulation"]["elapsed_ms"] < 1000
+
+    monkeypatch.setattr(deck_simulator, "SIMULATION_MAX_DECK_SIZE", 500)
+    with pytest.raises(deck_simulator.SimulationError):
+        simulate_deck(big, SimulationSettings(samples=0))
+
+def test_time_limit_and_fallback(monkeypatch):
+    """Test des Zeitlimits und der exakten Werte ohne NumPy"""
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(deck_simulator, "SIMULATION_BATCH_SIZE", 1000)
+    result = simulate_deck(DECK, SimulationSettings(samples=10 ** 7, time_limit=0.01))
+    assert result["simulation"]["truncated"]
+    assert result["simulation"]["samples"] < 10 ** 7
+
+    monkeypatch.setattr(deck_simulator, "np", None)
+    result = simulate_deck(DECK, SimulationSettings(targets=[("bear", 2)]))
+    assert result["engine"] == "exact"
+    assert result["simulation"] is None
+    assert result["targets"][0]["castable"] is None
+
+def test_simulate_endpoint():
+    """Test des Endpunkts mit Hauptdeck aus der Datenbank"""
+    db = TestingSessionLocal()
+    for entry in DECK:
+        db.add(Card(id=entry.card_id, name=entry.name, cmc=entry.cmc, rarity="common", set_code="tst",
+                    set_name="Test", type="Basic Land — Forest" if entry.is_land else "Creature"))
+    deck = Deck(name="Grün")
+    deck.deck_cards = [DeckCard(card_id=entry.card_id, quantity=entry.quantity) for entry in DECK]
+    deck.deck_cards.append(DeckCard(card_id="bear", quantity=2, is_sideboard=True))
+    small = Deck(name="Klein", deck_cards=[DeckCard(card_id="bear", quantity=4)])
+    db.add_all([deck, small])
+    db.commit()
+    deck_id, small_id = deck.id, small.id
+    db.close()
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post(f"/decks/{deck_id}/simulate",
+                               json={"samples": 2000, "seed": 1, "targets": [{"card_id": "bear", "turn": 2}]})
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["deck_size"], data["lands"]) == (60, 24)
+        assert data["targets"][0]["name"] == "Grizzly Bears"
+
+        assert client.post(f"/decks/{deck_id}/simulate",
+                           json={"targets": [{"card_id": "giant-x", "turn": 2}]}).status_code == 400
+        assert client.post(f"/decks/{small_id}/simulate", json={}).status_code == 400
+        assert client.post(f"/decks/{deck_id}/simulate", json={"keep_min_lands": 6}).status_code == 400
+        assert client.post("/decks/999/simulate", json={}).status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
@@ -0,0 +1,62 @@
+from app.models.models import Card, Color, Deck, DeckCard
+from app.services.deck_stats import count_pips
+
+def test_count_pips():
+    """Test der Zählung farbiger Mana-Symbole"""
+    assert dict(count_pips("{2}{W}{W}")) == {"W": 2}
+    assert dict(count_pips("{W/U}{G/P}{2/R}{X}{C}")) == {"W": 1, "U": 1, "G": 1, "R": 1}
+    assert count_pips(None) == ()
+
+def test_deck_stats(client, session_factory, query_counter):
+    """Test der Kennzahlen und des Caches je Deck-Stand"""
+    db = session_factory()
+    red, green = Color(code="R", name="Red"), Color(code="G", name="Green")
+    db.add_all([
+        Card(id="bolt", name="Lightning Bolt", mana_cost="{R}", cmc=1.0, type="Instant",
+             rarity="common", set_code="tst", set_name="Test", colors=[red]),
+        Card(id="titan", name="Titan", mana_cost="{6}{G}{G}", cmc=8.0, type="Creature — Giant",
+             rarity="rare", set_code="tst", set_name="Test", colors=[green]),
+        Card(id="charm", name="Charm", mana_cost="{R/G}{R}", cmc=2.0, type="Instant",
+             rarity="uncommon", set_code="tst", set_name="Test", colors=[red, green]),
+        Card(id="mountain", name="Mountain", cmc=0.0, type="Basic Land — Mountain",
+             rarity="common", set_code="tst", set_name="Test"),
+        Card(id="golem", name="Golem", mana_cost="{3}", cmc=3.0, type="Artifact Creature — Golem",
+             rarity="common", set_code="tst", set_name="Test"),
+    ])
+    deck = Deck(name="Gruul")
+    deck.deck_cards = [
+        DeckCard(card_id="bolt", quantity=4),
+        DeckCard(card_id="titan", quantity=1),
+        DeckCard(card_id="charm", quantity=2),
+        DeckCard(card_id="mountain", quantity=10),
+        DeckCard(card_id="golem", quantity=3, is_sideboard=True),
+    ]
+    db.add(deck)
+    db.commit()
+    deck_id = deck.id
+    db.close()
+
+    query_counter.clear()
+    stats = client.get(f"/decks/{deck_id}/stats").json()
+    computed = len(query_counter)
+    assert stats["total_cards"] == 17
+    assert stats["mana_curve"] == {"0": 0, "1": 4, "2": 2, "3": 0, "4": 0, "5": 0, "6": 0, "7+": 1}
+    assert stats["average_cmc"] == round((4 * 1 + 8 + 2 * 2) / 7, 2)
+    assert stats["colors"] == {"W": 0, "U": 0, "B": 0, "R": 6, "G": 3, "C": 10}
+    assert stats["pips"] == {"W": 0, "U": 0, "B": 0, "R": 8, "G": 4}
+    assert stats["types"] == {"Instant": 6, "Creature": 1, "Land": 10}
+
+    # Unverändertes Deck: nur der Zeitstempel wird gelesen
+    query_counter.clear()
+    assert client.get(f"/decks/{deck_id}/stats").json() == stats
+    assert len(query_counter) == 1 < computed
+
+    with_sideboard = client.get(f"/decks/{deck_id}/stats", params={"include_sideboard": True}).json()
+    assert with_sideboard["types"]["Artifact"] == 3
+    assert with_sideboard["colors"]["C"] == 13
+
+    # Nach einer Änderung wird neu berechnet
+    client.post(f"/decks/{deck_id}/cards/bolt")
+    assert client.get(f"/decks/{deck_id}/stats").json()["mana_curve"]["1"] == 5
+
+    assert client.get("/decks/999/stats").status_code == 404
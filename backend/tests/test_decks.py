@@ -4,7 +4,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.db.database import Base, get_db
+from app.db.database import Base, get_db, get_read_db
+from app.db.migrations import upgrade_schema
 from app.models.models import Card, Deck, DeckCard
 from main import app
 
@@ -34,6 +35,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 # Testdaten
 test_card = {
@@ -132,3 +134,105 @@ def test_create_deck(create_test_data):
     # Überprüfen, ob das Deck gelöscht wurde
     response = client.get(f"/decks/{deck_id}")
     assert response.status_code == 404
+
+def test_create_deck_unknown_card(create_test_data):
+    """Test, dass bei unbekannten Karten kein leeres Deck angelegt wird"""
+    deck = {**test_deck, "cards": [*test_deck["cards"], {"card_id": "gibt-es-nicht", "quantity": 1}]}
+    response = client.post("/decks/", json=deck)
+    assert response.status_code == 404
+    assert "gibt-es-nicht" in response.json()["detail"]
+
+    db = TestingSessionLocal()
+    assert db.query(Deck).count() == 0
+    db.close()
+
+def test_update_deck_diff(create_test_data):
+    """Test, dass beim Aktualisieren nur geänderte Einträge geschrieben werden"""
+    db = TestingSessionLocal()
+    db.add(Card(**{**test_card, "id": "test-card-2", "name": "Second Card"}))
+    db.commit()
+
+    deck_id = client.post("/decks/", json=test_deck).json()["id"]
+    original = db.query(DeckCard).filter(DeckCard.deck_id == deck_id).one()
+
+    cards = [
+        {"card_id": "test-card-1", "quantity": 3},
+        {"card_id": "test-card-2", "quantity": 1, "is_sideboard": True},
+    ]
+    response = client.put(f"/decks/{deck_id}", json={"cards": cards})
+    assert response.status_code == 200
+
+    db.expire_all()
+    rows = db.query(DeckCard).filter(DeckCard.deck_id == deck_id).order_by(DeckCard.id).all()
+    # Der vorhandene Eintrag bleibt erhalten und erhält nur die neue Anzahl
+    assert [(row.id, row.card_id, row.quantity) for row in rows] == [
+        (original.id, "test-card-1", 3),
+        (rows[1].id, "test-card-2", 1),
+    ]
+    db.close()
+
+def test_patch_deck_cards(create_test_data):
+    """Test der schrittweisen Änderungen am Deck-Inhalt"""
+    deck_id = client.post("/decks/", json=test_deck).json()["id"]
+
+    operations = [
+        {"op": "add", "card_id": "test-card-1", "quantity": 2},
+        {"op": "add", "card_id": "test-card-1", "is_sideboard": True},
+        {"op": "remove", "card_id": "test-card-1", "quantity": 1},
+    ]
+    response = client.patch(f"/decks/{deck_id}/cards", json=operations)
+    assert response.status_code == 200
+    contents = {(card["card_id"], card["is_sideboard"]): card["quantity"] for card in response.json()["deck_cards"]}
+    assert contents == {("test-card-1", False): 5, ("test-card-1", True): 1}
+
+    response = client.patch(f"/decks/{deck_id}/cards", json=[{"op": "replace", "card_id": "test-card-1", "quantity": 0}])
+    assert [card["is_sideboard"] for card in response.json()["deck_cards"]] == [True]
+
+    # Fehlerhafte Operationen ändern nichts
+    response = client.patch(f"/decks/{deck_id}/cards", json=[
+        {"op": "remove", "card_id": "test-card-1", "is_sideboard": True},
+        {"op": "add", "card_id": "gibt-es-nicht"},
+    ])
+    assert response.status_code == 404
+    response = client.patch(f"/decks/{deck_id}/cards", json=[{"op": "remove", "card_id": "test-card-1"}])
+    assert response.status_code == 404
+    assert len(client.get(f"/decks/{deck_id}").json()["deck_cards"]) == 1
+
+def test_add_card_upsert(create_test_data):
+    """Test, dass wiederholtes Hinzufügen dieselbe Zeile erhöht und nur die Änderung liefert"""
+    deck_id = client.post("/decks/", json=test_deck).json()["id"]
+
+    first = client.post(f"/decks/{deck_id}/cards/{test_card['id']}?quantity=2&is_sideboard=true").json()
+    second = client.post(f"/decks/{deck_id}/cards/{test_card['id']}?quantity=1&is_sideboard=true").json()
+    assert first["id"] == second["id"]
+    assert (second["quantity"], second["added"], second["is_sideboard"]) == (3, 1, True)
+
+    response = client.post(f"/decks/{deck_id}/cards/{test_card['id']}")
+    assert response.json()["quantity"] == 5
+
+    assert client.post(f"/decks/{deck_id}/cards/gibt-es-nicht").status_code == 404
+    assert client.post(f"/decks/999/cards/{test_card['id']}").status_code == 404
+    assert client.post(f"/decks/{deck_id}/cards/{test_card['id']}?quantity=0").status_code == 422
+
+    db = TestingSessionLocal()
+    assert db.query(DeckCard).filter(DeckCard.deck_id == deck_id).count() == 2
+    db.close()
+
+def test_merge_duplicate_deck_cards():
+    """Test, dass die Migration doppelte Einträge vor dem Unique-Index zusammenführt"""
+    legacy = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    with legacy.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE deck_cards (id INTEGER PRIMARY KEY, deck_id INTEGER NOT NULL,"
+            " card_id VARCHAR NOT NULL, quantity INTEGER, is_sideboard BOOLEAN)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO deck_cards (deck_id, card_id, quantity, is_sideboard) VALUES"
+            " (1, 'a', 2, 0), (1, 'a', 3, 0), (1, 'a', 1, 1), (2, 'a', 1, NULL), (2, 'a', 1, 0)"
+        )
+    upgrade_schema(legacy)
+    with legacy.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT deck_id, card_id, quantity, is_sideboard FROM deck_cards ORDER BY id"
+        ).fetchall()
+    assert [tuple(row) for row in rows] == [(1, "a", 5, 0), (1, "a", 1, 1), (2, "a", 2, 0)]
@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.api.http_cache import etag_matches
+from app.db.database import get_db, get_read_db
+from app.models.models import Base, Set, SyncRun
+from app.services import catalog_events
+from app.services.catalog_events import CatalogGeneration, catalog_generation
+
+# Eigene In-Memory-Datenbank für Generation und Sets
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def test_etag_matches():
+    """Test des If-None-Match-Vergleichs"""
+    assert etag_matches('"a", W/"c1-x"', '"c1-x"')
+    assert etag_matches("*", '"c1-x"')
+    assert not etag_matches('"c2-x"', '"c1-x"')
+    assert not etag_matches(None, '"c1-x"')
+
+def test_not_modified():
+    """Test von ETag, 304 ohne Endpunktaufruf und neuem ETag nach einem Sync"""
+    calls = []
+
+    def override_get_db():
+        calls.append(1)
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    db = TestingSessionLocal()
+    db.add(Set(code="neo", name="Kamigawa: Neon Dynasty"))
+    db.commit()
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    try:
+        client = TestClient(app)
+        catalog_generation.set(7)
+
+        response = client.get("/sets/neo")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.startswith('"c7-')
+        assert "max-age" in response.headers["cache-control"]
+        assert client.get("/sets/").headers["etag"] != etag
+
+        # Gleiche Generation: 304 ohne Datenbankzugriff
+        calls.clear()
+        response = client.get("/sets/neo", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert calls == []
+
+        # Neue Generation: vollständige Antwort mit neuem ETag
+        catalog_generation.set(8)
+        response = client.get("/sets/neo", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+        # Fehler und Nicht-Katalog-Endpunkte erhalten kein ETag
+        assert "etag" not in client.get("/sets/xyz").headers
+        assert "etag" not in client.get("/").headers
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
+    db.close()
+
+def test_external_sync_detected(monkeypatch):
+    """Test, dass ein Sync eines anderen Prozesses die Listener auslöst"""
+    monkeypatch.setattr(catalog_events, "_listeners", [])
+    seen = []
+    catalog_events.on_catalog_changed(lambda db: seen.append(catalog_events.load_generation(db)))
+
+    generation = CatalogGeneration(check_interval=0)
+    assert generation.refresh(TestingSessionLocal) == 0
+    assert seen == []
+
+    db = TestingSessionLocal()
+    # Läufe ohne Kartenänderungen (z.B. übersprungen) lassen die Generation unverändert
+    db.add(SyncRun(status="completed", source="cli"))
+    db.commit()
+    assert catalog_events.load_generation(db) == 0
+    db.add(SyncRun(status="completed", source="cli", cards_added=1))
+    db.commit()
+    expected = catalog_events.load_generation(db)
+    db.close()
+
+    assert expected > 0
+    assert generation.refresh(TestingSessionLocal) == expected
+    assert seen == [expected]
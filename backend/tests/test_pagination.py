@@ -0,0 +1,105 @@
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.db.database import get_db, get_read_db
+from app.db.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, paginate
+from app.models.models import Base, Card, Deck
+from app.services.result_cache import result_cache
+
+# Eigene In-Memory-Datenbank für die Paginierungs-Tests
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def client():
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    result_cache.clear()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
+
+def test_cursor_roundtrip():
+    """Test der Kodierung und Prüfung von Cursorn"""
+    cursor = encode_cursor(["Jötun Grunt", "abc"])
+    assert decode_cursor(cursor, 2) == ["Jötun Grunt", "abc"]
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
+    with pytest.raises(ValueError):
+        decode_cursor("kein-cursor!", 2)
+
+def walk(client, url, limit):
+    """Liest alle Seiten über den Cursor-Header"""
+    pages = []
+    response = client.get(url, params={"limit": limit})
+    while True:
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        response = client.get(url, params={"limit": limit, "cursor": cursor})
+
+def test_card_pagination(client):
+    """Test, dass Cursor-Seiten bei gleichen Namen lückenlos nach (Name, ID) sortiert sind"""
+    db = TestingSessionLocal()
+    for i in range(7):
+        db.add(Card(id=f"card-{i}", name="Forest" if i % 2 else f"Card {i}", type="Land",
+                    rarity="common", set_code="tst", set_name="Test Set"))
+    db.commit()
+    db.close()
+
+    pages = walk(client, "/cards/", 3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [card["id"] for page in pages for card in page]
+    assert ids == ["card-0", "card-2", "card-4", "card-6", "card-1", "card-3", "card-5"]
+
+    # Offset-Paginierung bleibt erhalten und nutzt dieselbe Sortierung
+    response = client.get("/cards/", params={"skip": 4, "limit": 2})
+    assert [card["id"] for card in response.json()] == ["card-1", "card-3"]
+
+    response = client.get("/cards/", params={"cursor": "kaputt", "limit": 2})
+    assert response.status_code == 400
+
+    # limit ist nach unten und oben begrenzt, limit=0 liefert eine leere Seite
+    for limit in (-1, 100000):
+        assert client.get("/cards/", params={"limit": limit}).status_code == 422
+        assert client.get("/decks/", params={"limit": limit}).status_code == 422
+    for path in ("/cards/", "/decks/"):
+        response = client.get(path, params={"limit": 0})
+        assert response.status_code == 200
+        assert response.json() == []
+        assert NEXT_CURSOR_HEADER not in response.headers
+    db = TestingSessionLocal()
+    assert paginate(db.query(Card), (Card.id,), Response(), limit=0) == []
+    db.close()
+
+def test_deck_pagination(client):
+    """Test der Cursor-Paginierung für Decks"""
+    db = TestingSessionLocal()
+    for i in range(5):
+        db.add(Deck(name=f"Deck {i}"))
+    db.commit()
+    db.close()
+
+    pages = walk(client, "/decks/", 2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [deck["name"] for page in pages for deck in page] == [f"Deck {i}" for i in range(5)]
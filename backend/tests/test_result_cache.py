@@ -0,0 +1,70 @@
+import time
+
+from app.models.models import Card
+from app.services.catalog_events import notify_catalog_changed
+from app.services.result_cache import CachedResult, LocalResultCache, result_cache
+
+def test_lru_eviction():
+    """Test der Verdrängung nach Anzahl und Größe sowie der TTL"""
+    cache = LocalResultCache(max_entries=2, max_bytes=800, ttl=60)
+    cache.set("a", CachedResult(b"a" * 10))
+    cache.set("b", CachedResult(b"b" * 10))
+    assert cache.get("a") is not None
+    cache.set("c", CachedResult(b"c" * 10))
+    # "b" war am längsten unbenutzt
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    # Größenbudget: zu große Einträge werden nicht gespeichert, sonst verdrängt der neue den ältesten
+    sized = LocalResultCache(max_entries=100, max_bytes=400, ttl=60)
+    assert not sized.set("huge", CachedResult(b"x" * 60))
+    for key in "abcdefgh":
+        sized.set(key, CachedResult(b"x" * 45))
+    assert sized.stats()["evictions"] == 0
+    sized.set("i", CachedResult(b"x" * 30, {"X-Next-Cursor": "abc"}))
+    assert sized.get("a") is None
+    assert sized.stats()["bytes"] <= 400
+    assert sized.stats()["evictions"] == 1
+
+    expiring = LocalResultCache(ttl=0.01)
+    expiring.set("a", CachedResult(b"a"))
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+    assert expiring.stats()["expirations"] == 1
+
+def test_card_search_cache(client, session_factory, query_counter):
+    """Test, dass wiederholte Suchen ohne Datenbankabfrage beantwortet werden"""
+    db = session_factory()
+    for i in range(3):
+        db.add(Card(id=f"card-{i}", name=f"Frog {i}", type="Creature — Frog", rarity="common",
+                    set_code="tst", set_name="Test Set"))
+    db.commit()
+
+    try:
+        result_cache.clear()
+        first = client.get("/cards/", params={"rarity": "common", "limit": 2})
+        assert first.status_code == 200
+        assert len(first.json()) == 2
+
+        # Gleiche Anfrage (andere Schreibweise des Namens): aus dem Cache inkl. Cursor-Header
+        query_counter.clear()
+        hits = result_cache.stats()["hits"]
+        second = client.get("/cards/", params={"rarity": "common", "limit": 2})
+        assert query_counter == []
+        assert second.content == first.content
+        assert second.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+        assert result_cache.stats()["hits"] == hits + 1
+
+        # Nach einem Sync wird neu gelesen
+        db.add(Card(id="card-a", name="Axolotl", type="Creature", rarity="common",
+                    set_code="tst", set_name="Test Set"))
+        db.commit()
+        notify_catalog_changed(db)
+        third = client.get("/cards/", params={"rarity": "common", "limit": 2})
+        assert third.json()[0]["name"] == "Axolotl"
+
+        stats = client.get("/cards/cache/stats").json()
+        assert stats["entries"] >= 1
+        assert stats["misses"] >= 2
+    finally:
+        db.close()
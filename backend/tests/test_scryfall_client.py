@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Base, Card, SyncRun
+from app.services import catalog_events, scryfall_client
+from app.services.scryfall_client import ScryfallClient, TokenBucket, fetch_cards_for_sets
+from app.services.search import FTS_TABLE, ensure_search_index, has_fts, text_filter
+
+# Eigene In-Memory-Datenbank für die Client-Tests
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+SET_CODES = ["s0", "s1", "s2", "s3"]
+PAGES_PER_SET = 2
+CARDS_PER_PAGE = 3
+
+
+class StubScryfallHandler(BaseHTTPRequestHandler):
+    """Lokaler Ersatz für die Scryfall-API mit 429- und 503-Antworten"""
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_times.append(time.monotonic())
+
+        url = urlparse(self.path)
+        if url.path == "/sets":
+            return self.send_json(200, {"data": [
+                {"code": code, "name": f"Set {code}", "released_at": "2025-01-01",
+                 "set_type": "core", "card_count": PAGES_PER_SET * CARDS_PER_PAGE}
+                for code in SET_CODES + ["empty"]
+            ]})
+
+        query = parse_qs(url.query)
+        set_code = query["q"][0].split(":", 1)[1]
+        page = int(query.get("page", ["1"])[0])
+
+        if set_code == "empty":
+            return self.send_json(404, {"object": "error"})
+
+        # Erste Anfrage für s1 wird gedrosselt, für s2 schlägt sie fehl
+        key = (set_code, page)
+        with server.lock:
+            first_attempt = key not in server.seen
+            server.seen.add(key)
+        if first_attempt and set_code == "s1" and page == 1:
+            return self.send_json(429, {"object": "error"}, {"Retry-After": "0"})
+        if first_attempt and set_code == "s2" and page == 1:
+            return self.send_json(503, {"object": "error"})
+
+        cards = [
+            {"id": f"{set_code}-{page}-{i}", "name": f"Card {set_code} {page} {i}", "type_line": "Creature",
+             "rarity": "common", "set": set_code, "set_name": f"Set {set_code}", "colors": ["G"]}
+            for i in range(CARDS_PER_PAGE)
+        ]
+        has_more = page < PAGES_PER_SET
+        payload = {"data": cards, "has_more": has_more}
+        if has_more:
+            payload["next_page"] = f"{server.base_url}/cards/search?q=set:{set_code}&unique=prints&page={page + 1}"
+        self.send_json(200, payload)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubScryfallHandler)
+    server.lock = threading.Lock()
+    server.request_times = []
+    server.seen = set()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_bucket_limits_rate():
+    """Test, dass der Token-Bucket auch bei mehreren Threads das Budget einhält"""
+    bucket = TokenBucket(rate=100)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 Tokens bei 100/s und Kapazität 1: mindestens 19 Intervalle
+    assert time.monotonic() - start >= 0.18
+
+
+def test_fetch_cards_for_sets_with_retries(stub_server):
+    """Test zum parallelen Abrufen mehrerer Sets gegen den lokalen Stub-Server"""
+    client = ScryfallClient(base_url=stub_server.base_url, requests_per_second=50, backoff_base=0.01)
+    results = {code: (cards, error) for code, cards, error in
+               fetch_cards_for_sets(SET_CODES + ["empty"], client=client, max_workers=4)}
+
+    for code in SET_CODES:
+        cards, error = results[code]
+        assert error is None
+        assert len(cards) == PAGES_PER_SET * CARDS_PER_PAGE
+    assert results["empty"] == ([], None)
+
+    # Das globale Budget gilt über alle Worker hinweg
+    times = sorted(stub_server.request_times)
+    assert (times[-1] - times[0]) >= (len(times) - 1) / 50 * 0.8
+
+
+def test_fetch_cards_for_sets_bounded(monkeypatch):
+    """Test, dass höchstens max_workers * 2 Sets gleichzeitig abgerufen bzw. gehalten werden"""
+    started = []
+    monkeypatch.setattr(scryfall_client, "fetch_cards_by_set",
+                        lambda set_code, client: started.append(set_code) or [{"id": set_code}])
+    set_codes = [f"s{i}" for i in range(20)]
+    in_flight = []
+    for consumed, (code, cards, error) in enumerate(
+        fetch_cards_for_sets(set_codes, client=object(), max_workers=2), start=1
+    ):
+        time.sleep(0.01)
+        in_flight.append(len(started) - consumed)
+    assert sorted(started) == sorted(set_codes)
+    assert max(in_flight) <= 4
+
+
+def test_get_json_retries_timeouts(stub_server, monkeypatch):
+    """Test, dass Zeitüberschreitungen (ReadTimeout) wie Verbindungsfehler wiederholt werden"""
+    client = ScryfallClient(base_url=stub_server.base_url, requests_per_second=50, backoff_base=0.01)
+    original_get = client.session.get
+    calls = []
+
+    def slow_get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            raise requests.ReadTimeout("Read timed out")
+        return original_get(url, **kwargs)
+
+    monkeypatch.setattr(client.session, "get", slow_get)
+    assert client.get_json("/sets")["data"]
+    assert len(calls) == 2
+
+
+def test_update_card_database_against_stub(stub_server, monkeypatch):
+    """Test des kompletten Set-Imports gegen den lokalen Stub-Server"""
+    client = ScryfallClient(base_url=stub_server.base_url, requests_per_second=100, backoff_base=0.01)
+    monkeypatch.setattr(scryfall_client, "_default_client", client)
+
+    monkeypatch.setattr(catalog_events, "_listeners", [])
+    notified = []
+    catalog_events.on_catalog_changed(lambda db: notified.append(catalog_events.load_generation(db)))
+
+    db = TestingSessionLocal()
+    stats = scryfall_client.update_card_database(db, max_workers=4)
+    assert stats["added"] == len(SET_CODES) * PAGES_PER_SET * CARDS_PER_PAGE
+    assert db.query(Card).count() == stats["added"]
+
+    # Der Import zählt als Sync-Lauf: neue Katalog-Generation, Listener werden aufgerufen
+    run = db.query(SyncRun).one()
+    assert run.status == "completed" and run.cards_added == stats["added"]
+    assert notified == [catalog_events.load_generation(db)] and notified[0] > 0
+
+    # Zweiter Lauf findet keine Änderungen, die Generation bleibt
+    stats = scryfall_client.update_card_database(db, max_workers=4)
+    assert stats["added"] == stats["updated"] == 0
+    assert catalog_events.load_generation(db) == notified[0]
+    db.close()
+
+
+def test_update_card_database_updates_search_index(stub_server, monkeypatch, tmp_path):
+    """Test, dass per Set-Import geschriebene Karten über den Volltextindex gefunden werden"""
+    client = ScryfallClient(base_url=stub_server.base_url, requests_per_second=100, backoff_base=0.01)
+    monkeypatch.setattr(scryfall_client, "_default_client", client)
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'fts.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    ensure_search_index(file_engine)
+
+    db = sessionmaker(bind=file_engine)()
+    assert has_fts(db)
+    scryfall_client.update_card_database(db, max_workers=4)
+    assert db.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE}")).scalar() == db.query(Card).count()
+    found = [card_id for (card_id,) in db.query(Card.id).filter(text_filter(db, {"name": "card s1 2"}))]
+    assert "s1-2-0" in found and all(card_id.startswith("s1-") for card_id in found)
+    db.close()
+    file_engine.dispose()
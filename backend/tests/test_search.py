@@ -0,0 +1,104 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.db.database import get_db, get_read_db
+from app.models.models import Base, Card
+from app.services.result_cache import result_cache
+from app.services.catalog_sync import CardChangeTracker
+from app.services.search import ensure_search_index, fts_match_expression, has_fts, ranked_search, text_filter
+
+# Eigene In-Memory-Datenbank mit FTS-Index
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def make_card(card_id, name, type_line, text):
+    return {
+        "id": card_id, "name": name, "mana_cost": "{R}", "cmc": 1.0, "type": type_line,
+        "rarity": "common", "text": text, "set_code": "tst", "set_name": "Test Set",
+        "image_url": None, "image_url_small": None,
+    }
+
+test_cards = [
+    make_card("bolt", "Lightning Bolt", "Instant", "Lightning Bolt deals 3 damage to any target."),
+    make_card("helix", "Lightning Helix", "Instant", "Lightning Helix deals 3 damage to any target and you gain 3 life."),
+    make_card("shock", "Shock", "Instant", "Shock deals 2 damage to any target."),
+    make_card("seer", "Lightning Seer", "Creature — Human Wizard", "Flying"),
+    make_card("jotun", "Jötun Grunt", "Creature — Giant Soldier", "Cumulative upkeep."),
+]
+
+def test_match_expression():
+    """Test der Umwandlung von Eingaben in FTS5-Ausdrücke (Sonderzeichen werden verworfen)"""
+    assert fts_match_expression({"name": 'light "bo'}) == '{name}: ("light"* AND "bo"*)'
+    assert fts_match_expression({"*": "3 damage", "type": ""}) == '("3"* AND "damage"*)'
+    assert fts_match_expression({"name": "!!"}) is None
+
+def test_search_index():
+    """Test von Indexpflege, Wortpräfix-Filter und Relevanz-Sortierung"""
+    db = TestingSessionLocal()
+    tracker = CardChangeTracker(db)
+    tracker.write_batch([(card, []) for card in test_cards[:3]])
+    db.commit()
+
+    # Nachträglich angelegter Index wird aus dem Bestand aufgebaut
+    ensure_search_index(engine)
+    assert has_fts(db)
+
+    # Weitere Karten gelangen über den Import in den Index
+    tracker = CardChangeTracker(db)
+    tracker.write_batch([(card, []) for card in test_cards])
+    db.commit()
+
+    def names(terms):
+        return sorted(card.name for card in db.query(Card).filter(text_filter(db, terms)))
+
+    assert names({"name": "light bo"}) == ["Lightning Bolt"]
+    assert names({"name": "lightning", "type": "creature"}) == ["Lightning Seer"]
+    assert names({"name": "jotun"}) == ["Jötun Grunt"]
+    # Präfixsuche je Wort, kein Teilstring in der Wortmitte
+    assert names({"name": "ghtning"}) == []
+
+    # Namenstreffer vor Treffern im Regeltext
+    ranked = [card.id for card in ranked_search(db, "shock")]
+    assert ranked == ["shock"]
+    ranked = [card.id for card in ranked_search(db, "lightning")]
+    assert set(ranked) == {"bolt", "helix", "seer"}
+    assert ranked_search(db, "  ") is None
+
+    # Entfernte Karten verschwinden aus dem Index
+    tracker = CardChangeTracker(db)
+    tracker.write_batch([(card, []) for card in test_cards if card["id"] != "bolt"])
+    tracker.remove_missing()
+    db.commit()
+    assert names({"name": "bolt"}) == []
+
+    # Endpunkt
+    def override_get_db():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    result_cache.clear()
+    try:
+        client = TestClient(app)
+        response = client.get("/cards/search", params={"q": "3 damage"})
+        assert response.status_code == 200
+        assert [card["id"] for card in response.json()] == ["helix"]
+        response = client.get("/cards/", params={"name": "helix"})
+        assert [card["id"] for card in response.json()] == ["helix"]
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
+    db.close()
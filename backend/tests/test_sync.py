@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.sync import describe_run
+from app.models.models import Base, Card, SyncRun
+from app.scripts import sync_cards
+from app.services import bulk_data
+from app.services.bulk_data import BulkDataCache
+from app.services.catalog_events import catalog_generation
+from app.services.catalog_sync import CardChangeTracker
+
+# Eigene In-Memory-Datenbank für die Sync-Tests
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+BULK_INFO = {
+    "type": "default_cards",
+    "updated_at": "2025-01-01T10:00:00.000+00:00",
+    "download_uri": "https://data.scryfall.io/default-cards/default-cards-20250101.json",
+}
+
+def make_bulk_card(i):
+    return {
+        "id": f"bulk-{i}",
+        "name": f"Bulk Frog {i}",
+        "layout": "normal",
+        "mana_cost": "{G}",
+        "cmc": 1.0,
+        "type_line": "Creature — Frog",
+        "rarity": "common",
+        "oracle_text": "",
+        "set": "tst",
+        "set_name": "Test Set",
+        "colors": ["G"],
+        "image_uris": {"normal": "n.jpg", "small": "s.jpg"},
+    }
+
+@pytest.fixture
+def fake_scryfall(tmp_path, monkeypatch):
+    """Ersetzt Scryfall und die Datenbank durch lokale Testdaten"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    bulk_cards = [make_bulk_card(i) for i in range(10)]
+
+    def fake_download(url, dest_path, headers=None, progress=None):
+        with open(dest_path, "w") as f:
+            json.dump(bulk_cards, f)
+        return {"status": 200, "size": 0, "etag": None, "last_modified": None}
+
+    monkeypatch.setattr(sync_cards, "WriterSessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(sync_cards, "writer_engine", engine)
+    monkeypatch.setattr(sync_cards, "bulk_cache", BulkDataCache(str(tmp_path)))
+    monkeypatch.setattr(sync_cards, "get_bulk_data_info", lambda: dict(BULK_INFO))
+    monkeypatch.setattr(sync_cards, "fetch_json", lambda url, params=None: {"data": []})
+    monkeypatch.setattr(bulk_data, "download_bulk_file", fake_download)
+    return bulk_cards
+
+def test_sync_resumes_from_checkpoint(fake_scryfall, monkeypatch):
+    """Test, dass ein abgebrochener Sync ab dem letzten Checkpoint fortgesetzt wird"""
+    original_write_batch = CardChangeTracker.write_batch
+    calls = []
+
+    def failing_write_batch(self, batch):
+        calls.append(len(batch))
+        if len(calls) == 3:
+            raise RuntimeError("Verbindung verloren")
+        return original_write_batch(self, batch)
+
+    monkeypatch.setattr(CardChangeTracker, "write_batch", failing_write_batch)
+    catalog_generation.set(0)
+    with pytest.raises(RuntimeError):
+        sync_cards.sync_database(batch_size=3)
+
+    db = TestingSessionLocal()
+    run = db.query(SyncRun).one()
+    assert run.status == "failed"
+    assert run.stage == "cards"
+    assert run.checkpoint_index == 6
+    assert db.query(Card).count() == 6
+    assert describe_run(run)["cards_processed"] == 6
+    db.close()
+
+    # Die committeten Batches sind sichtbar: neue Katalog-Generation trotz Abbruch
+    failed_generation = catalog_generation.value
+    assert failed_generation > 0
+
+    # Zweiter Lauf setzt fort statt neu zu beginnen
+    monkeypatch.setattr(CardChangeTracker, "write_batch", original_write_batch)
+    summary = sync_cards.sync_database(batch_size=3)
+
+    db = TestingSessionLocal()
+    run = db.query(SyncRun).one()
+    assert run.status == "completed"
+    assert run.checkpoint_index == 10
+    assert summary["added"] == 10
+    assert summary["removed"] == 0
+    assert db.query(Card).count() == 10
+    assert describe_run(run)["percent"] == 100.0
+    db.close()
+    completed_generation = catalog_generation.value
+    assert completed_generation > failed_generation
+
+    # Unveränderte Bulk-Datei: Kartenphase wird übersprungen
+    summary = sync_cards.sync_database(batch_size=3)
+    assert summary["skipped"] is True
+
+    # Erzwungener Lauf ohne Änderungen schreibt nichts
+    summary = sync_cards.sync_database(batch_size=3, force=True)
+    assert summary["unchanged"] == 10
+    assert summary["added"] == summary["updated"] == 0
+
+    # Beide Läufe ändern den Katalog nicht, Caches bleiben gültig
+    assert catalog_generation.value == completed_generation
+
+def test_heartbeat_during_download(fake_scryfall, monkeypatch):
+    """Test, dass ein langer Download den Lauf aktiv hält (kein zweiter Sync parallel)"""
+    active_during_download = []
+
+    def slow_download(url, dest_path, headers=None, progress=None):
+        # Download dauert länger als STALE_RUN_AFTER
+        db = TestingSessionLocal()
+        run = db.query(SyncRun).one()
+        run.updated_at = datetime.utcnow() - sync_cards.STALE_RUN_AFTER - timedelta(minutes=1)
+        db.commit()
+        progress(bulk_data.PROGRESS_INTERVAL)
+        active_during_download.append(sync_cards.get_active_run(db) is not None)
+        db.close()
+        with open(dest_path, "w") as f:
+            json.dump(fake_scryfall, f)
+        return {"status": 200, "size": 0, "etag": None, "last_modified": None}
+
+    monkeypatch.setattr(bulk_data, "download_bulk_file", slow_download)
+    sync_cards.sync_database(batch_size=5)
+    assert active_during_download == [True]
@@ -76,6 +76,18 @@ export const cardsApi = {
    */
   getCard: (cardId) => {
     return fetchApi(`/cards/${cardId}`);
+  },
+  
+  /**
+   * Viele Karten mit einer Anfrage abrufen
+   * @param {string[]} cardIds - Die IDs der Karten (höchstens 5000)
+   * @returns {Promise<Object>} Karten in Reihenfolge der IDs (null bei unbekannter ID) und fehlende IDs
+   */
+  getCardsBatch: (cardIds) => {
+    return fetchApi('/cards/batch', {
+      method: 'POST',
+      body: JSON.stringify({ ids: cardIds })
+    });
   }
 };
 
@@ -153,7 +165,7 @@ export const decksApi = {
    * @param {string} cardId - Die ID der Karte
    * @param {number} quantity - Die Anzahl der Karten
    * @param {boolean} isSideboard - Ob die Karte im Sideboard ist
-   * @returns {Promise<Object>} Das aktualisierte Deck
+   * @returns {Promise<Object>} Der geänderte Eintrag mit neuer Anzahl (quantity) und added
    */
   addCardToDeck: (deckId, cardId, quantity = 1, isSideboard = false) => {
     const queryParams = new URLSearchParams();